@@ -0,0 +1,152 @@
+"""Resource-use accounting
+
+Lamp electricity, boiler heat, CO2 dosing, fogging water and ventilation losses of recorded trajectories.
+All functions are array operations: the fields of the Setpoints, ClimateStates, Weather and AirExchange passed in are
+arrays of shape (..., n_steps), e.g. (lanes, n_steps) for a batch of scenarios, and the time axis is the last axis.
+as_setpoints, as_climate_states and as_weather turn recorded arrays with the fields on the last axis into this layout.
+
+All quantities are per square meter greenhouse floor.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from climate.CO2_fluxes import external_co2_added
+from climate.electrical_input import lamp_electrical_input, inter_lamp_electrical_input
+from climate.heat_fluxes import heat_flux_to_heating_pipe, sensible_heat_flux_between_boiler_and_grow_pipe
+from climate.utils import AirExchange, air_exchange_rates
+from climate.vapor_fluxes import fogging_system_to_greenhouse_air_latent_vapor_flux, general_vapor_flux
+from coefficients import Coefficients
+from constants import *
+from data_models import Setpoints, ClimateStates, Weather, climate_states_from_vector
+
+# Conversion factor from J to kWh.
+# Unit: kWh J^-1
+J_TO_KWH = 1 / 3.6E6
+
+# Conversion factor from mg to kg.
+# Unit: kg mg^-1
+MG_TO_KG = 1E-6
+
+
+class ResourceUse(NamedTuple):
+    lamp_electricity: np.ndarray  # top-lights and inter-lights [W m^-2], [J m^-2] per step
+    boiler_heat: np.ndarray  # boiler to heating and grow pipes [W m^-2], [J m^-2] per step
+    co2_dosing: np.ndarray  # external CO2 source [mg m^-2 s^-1], [mg m^-2] per step
+    fogging_water: np.ndarray  # fogging system [kg m^-2 s^-1], [kg m^-2] per step
+    ventilation_heat_loss: np.ndarray  # sensible heat to the outdoor air [W m^-2], [J m^-2] per step
+    ventilation_co2_loss: np.ndarray  # CO2 to the outdoor air [mg m^-2 s^-1], [mg m^-2] per step
+    ventilation_vapor_loss: np.ndarray  # vapor to the outdoor air [kg m^-2 s^-1], [kg m^-2] per step
+
+
+class Tariffs(NamedTuple):
+    # Prices per unit, scalars or time series broadcastable to the trajectories
+    electricity: float = 0  # [currency kWh^-1]
+    heat: float = 0  # [currency kWh^-1]
+    co2: float = 0  # [currency kg^-1]
+    water: float = 0  # [currency kg^-1]
+
+
+class ResourceCosts(NamedTuple):
+    electricity: np.ndarray  # [currency m^-2]
+    heat: np.ndarray  # [currency m^-2]
+    co2: np.ndarray  # [currency m^-2]
+    water: np.ndarray  # [currency m^-2]
+
+    @property
+    def total(self):
+        return self.electricity + self.heat + self.co2 + self.water
+
+
+def as_setpoints(recorded) -> Setpoints:
+    """
+    Returns: the setpoints of recorded setpoints of shape (..., n_steps, n_setpoints)
+    """
+    return Setpoints(*np.moveaxis(np.asarray(recorded, dtype=float), -1, 0))
+
+
+def as_climate_states(recorded) -> ClimateStates:
+    """
+    Returns: the climate states of recorded states of shape (..., n_steps, n_states),
+    in which t_Soil becomes an array of shape (..., n_steps, n_layers)
+    """
+    return climate_states_from_vector(recorded)
+
+
+def as_weather(recorded) -> Weather:
+    """
+    Returns: the weather of recorded weather of shape (..., n_steps, n_weather_variables)
+    """
+    return Weather(*np.moveaxis(np.asarray(recorded, dtype=float), -1, 0))
+
+
+def resource_rates(setpoints: Setpoints, states: ClimateStates = None, weather: Weather = None,
+                   air_exchange: AirExchange = None) -> ResourceUse:
+    """
+    The rate of use of each resource at each step.
+    The ventilation losses need the states and the weather, they are None otherwise. Without recorded air exchange
+    rates, they are computed from the setpoints, the states and the weather, see air_exchange_rates.
+    Returns: the resource-use rates, each of the shape of the setpoints
+    """
+    floor_area = Coefficients.Construction.floor_area
+    lamp_electricity = lamp_electrical_input(setpoints) + inter_lamp_electrical_input(setpoints)
+    boiler_heat = heat_flux_to_heating_pipe(setpoints.U_Boil, Coefficients.ActiveClimateControl.heat_cap_Boil,
+                                            floor_area) \
+        + sensible_heat_flux_between_boiler_and_grow_pipe(setpoints)
+    co2_dosing = external_co2_added(setpoints)
+    fogging_water = fogging_system_to_greenhouse_air_latent_vapor_flux(setpoints)
+
+    ventilation_heat_loss = ventilation_co2_loss = ventilation_vapor_loss = None
+    if states is not None and weather is not None:
+        if air_exchange is None:
+            air_exchange = air_exchange_rates(setpoints, states, weather)
+        f_AirOut = air_exchange.f_AirOut
+        f_TopOut = air_exchange.f_TopOut
+        ventilation_heat_loss = air_exchange.density_air * C_PAIR \
+            * (f_AirOut * (states.t_Air - weather.t_Outdoor) + f_TopOut * (states.t_AboveThScr - weather.t_Outdoor))
+        ventilation_co2_loss = f_AirOut * (states.co2_Air - weather.co2_outdoor) \
+            + f_TopOut * (states.co2_AboveThScr - weather.co2_outdoor)
+        ventilation_vapor_loss = general_vapor_flux(f_AirOut, states.vapor_pressure_Air,
+                                                    weather.vapor_pressure_outdoor, states.t_Air, weather.t_Outdoor) \
+            + general_vapor_flux(f_TopOut, states.vapor_pressure_AboveThScr, weather.vapor_pressure_outdoor,
+                                 states.t_AboveThScr, weather.t_Outdoor)
+
+    return ResourceUse(lamp_electricity=np.asarray(lamp_electricity, dtype=float),
+                       boiler_heat=np.asarray(boiler_heat, dtype=float),
+                       co2_dosing=np.asarray(co2_dosing, dtype=float),
+                       fogging_water=np.asarray(fogging_water, dtype=float),
+                       ventilation_heat_loss=ventilation_heat_loss,
+                       ventilation_co2_loss=ventilation_co2_loss,
+                       ventilation_vapor_loss=ventilation_vapor_loss)
+
+
+def resource_use(rates: ResourceUse, dt) -> ResourceUse:
+    """
+    Args:
+        rates: the resource-use rates of each step
+        dt: the length of the steps, a scalar or a series along the time axis [s]
+
+    Returns: the resource use of each step
+    """
+    return ResourceUse(*(None if rate is None else rate * dt for rate in rates))
+
+
+def cumulative_resource_use(use: ResourceUse) -> ResourceUse:
+    """
+    Returns: the resource use accumulated along the time axis
+    """
+    return ResourceUse(*(None if amount is None else np.cumsum(amount, axis=-1) for amount in use))
+
+
+def resource_costs(use: ResourceUse, tariffs: Tariffs) -> ResourceCosts:
+    """
+    Args:
+        use: the resource use of each step
+        tariffs: the prices, scalars or series along the time axis
+
+    Returns: the costs of each step, sum them along the last axis for the cost of a trajectory
+    """
+    return ResourceCosts(electricity=use.lamp_electricity * J_TO_KWH * tariffs.electricity,
+                         heat=use.boiler_heat * J_TO_KWH * tariffs.heat,
+                         co2=use.co2_dosing * MG_TO_KG * tariffs.co2,
+                         water=use.fogging_water * tariffs.water)
@@ -1,7 +1,8 @@
-from ..constants import *
-from ..data_models import ClimateStates, Weather
+from constants import *
+from data_models import ClimateStates, Weather
 from .lumped_cover_layers import *
-from .utils import air_density, saturation_vapor_pressure
+from .parameters import model_parameters
+from .utils import saturation_vapor_pressure, smooth_switch
 
 
 def canopy_transpiration(states: ClimateStates, setpoints: Setpoints, weather: Weather) -> float:
@@ -19,7 +20,7 @@ def canopy_transpiration_vapor_transfer_coefficient(states: ClimateStates, setpo
     Equation 8.48
     :return: The vapor transfer coefficient of the canopy transpiration [kg m^-2  Pa^-1 s^-1]
     """
-    density_air = air_density()
+    density_air = model_parameters().density_air
     stomatal_resistance = canopy_stomatal_resistance(states, setpoints, weather)
     return 2 * density_air * C_PAIR * states.leaf_area_index / \
            (EVAPORATION_LATENT_HEAT * GAMMA * (BOUNDARY_LAYER_RESISTANCE + stomatal_resistance))
@@ -89,7 +90,7 @@ def greenhouse_co2_resistance_factor(states: ClimateStates, setpoints: Setpoints
     :return: The resistance factors [W m^-2]
     """
     c_evap3 = smoothed_transpiration_parameters(nth=3, setpoints=setpoints, weather=weather)
-    return 1 + c_evap3(ETA_MG_PPM * states.co2_Air - 200) ** 2
+    return 1 + c_evap3 * (ETA_MG_PPM * states.co2_Air - 200) ** 2
 
 
 def vapor_pressure_resistance_factor(states: ClimateStates, setpoints: Setpoints, weather: Weather) -> float:
@@ -100,7 +101,7 @@ def vapor_pressure_resistance_factor(states: ClimateStates, setpoints: Setpoints
     """
     c_evap4 = smoothed_transpiration_parameters(nth=4, setpoints=setpoints, weather=weather)
     canopy_vp = saturation_vapor_pressure(states.t_Canopy)
-    return 1 + c_evap4(canopy_vp - states.vapor_pressure_Air) ** 2
+    return 1 + c_evap4 * (canopy_vp - states.vapor_pressure_Air) ** 2
 
 
 def differentiable_switch(setpoints: Setpoints, weather: Weather):
@@ -141,7 +142,7 @@ def differentiable_switch(setpoints: Setpoints, weather: Weather):
                  (RATIO_GLOBALPAR * cover_PAR_transmission_coef + RATIO_GLOBALNIR * cover_NIR_transmission_coef)
     # Global radiation above the canopy
     above_canopy_global_radiation = rCanopySun  # Note: line 338 / setGlAux / GreenLight
-    return 1 / (1 + math.exp(S_R_S * (above_canopy_global_radiation - RAD_CANOPY_SETPOINT)))
+    return smooth_switch(S_R_S * (above_canopy_global_radiation - RAD_CANOPY_SETPOINT))
 
 
 def smoothed_transpiration_parameters(nth: int, setpoints: Setpoints, weather: Weather):
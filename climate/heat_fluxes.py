@@ -4,36 +4,16 @@ Based on section 8.6
 """
 
 # 8.6.1 Global, PAR and NIR heat fluxes
+import numpy as np
+
 from climate.canopy_transpiration import *
+from climate.parameters import model_parameters
 from climate.radiation_fluxes import *
 from climate.utils import *
-from climate.vapor_fluxes import fogging_system_to_greenhouse_air_latent_vapor_flux, differentiable_air_to_obj_vapor_flux
+from climate.vapor_fluxes import fogging_system_to_greenhouse_air_latent_vapor_flux, condensation_fluxes
 from constants import *
 
 
-# TODO: inline these
-def lumped_cover_virtual_NIR_transmission_coefficients(cover_NIR_reflection_coef):
-    # Equation 8.30
-    return 1 - cover_NIR_reflection_coef
-
-
-def floor_virtual_NIR_transmission_coefficients():
-    # Equation 8.30
-    floor_NIR_reflection_coef = Coefficients.Floor.floor_NIR_reflection_coefficient
-    return 1 - floor_NIR_reflection_coef
-
-
-def canopy_virtual_NIR_transmission_coefficient(states: ClimateStates):
-    # Equation 8.31
-    return math.exp(-CANOPY_NIR_EXTINCTION_COEF * states.leaf_area_index)
-
-
-def canopy_virtual_NIR_reflection_coefficient(states: ClimateStates):
-    # Equation 8.32
-    virtual_NIR_transmission_canopy_coef = canopy_virtual_NIR_transmission_coefficient(states)
-    return CANOPY_NIR_REFLECTION_COEF * (1 - virtual_NIR_transmission_canopy_coef)
-
-
 def construction_elements_global_radiation(states: ClimateStates, setpoints: Setpoints, weather: Weather):
     """
     Equation 8.36
@@ -128,15 +108,6 @@ def lamp_radiation(states, setpoints):
            - radiation_flux_PAR_LampCanopy - radiation_flux_NIR_LampCanopy - radiation_flux_PAR_LampFlr - radiation_flux_NIR_LampFlr
 
 
-def thermal_screen_FIR_transmission_coefficient(setpoints: Setpoints):
-    # Equation 8.39
-    return 1 - setpoints.U_ThScr * (1 - Coefficients.Thermalscreen.thScr_FIR_transmission_coefficient)
-
-
-def blackout_screen_FIR_transmission_coefficient(setpoints: Setpoints):
-    return 1 - setpoints.U_BlScr * (1 - Coefficients.Blackoutscreen.blScr_FIR_transmission_coef)
-
-
 # 8.6.3 Convection and conduction
 def convective_and_conductive_heat_fluxes(HEC, T1, T2) -> float:
     """Convective and conductive heat fluxes
@@ -175,8 +146,7 @@ def sensible_heat_flux_between_mechanical_cooling_and_greenhouse_air(setpoints:
 
 
 def sensible_heat_flux_between_heating_pipe_and_greenhouse_air(states: ClimateStates):
-    HEC_PipeAir = 1.99 * math.pi * Coefficients.Heating.phi_external_pipe * Coefficients.Heating.pipe_length \
-                  * abs(states.t_Pipe - states.t_Air) ** 0.32
+    HEC_PipeAir = 1.99 * model_parameters().A_Pipe * smooth_abs(states.t_Pipe - states.t_Air) ** 0.32
     return convective_and_conductive_heat_fluxes(HEC_PipeAir, states.t_Pipe, states.t_Air)
 
 
@@ -187,35 +157,34 @@ def sensible_heat_flux_between_direct_air_heater_and_greenhouse_air(setpoints: S
 
 def sensible_heat_flux_between_buffer_and_greenhouse_air(states: ClimateStates):
     # Equation 8.57
-    soil_3_t = states.t_Soil[2]  # third layer
+    soil_3_t = np.asarray(states.t_Soil)[..., 2]  # third layer
     return Coefficients.ActiveClimateControl.HEC_PasAir * (soil_3_t - states.t_Air)
 
 
 def sensible_heat_flux_between_floor_and_greenhouse_air(states: ClimateStates):
-    if states.t_Floor > states.t_Air:
-        HEC_AirFlr = 1.7 * (states.t_Floor - states.t_Air) ** 0.33
-    else:
-        HEC_AirFlr = 1.3 * (states.t_Air - states.t_Floor) ** 0.25
+    t_difference = smooth_abs(states.t_Floor - states.t_Air)
+    HEC_AirFlr = np.where(states.t_Floor > states.t_Air, 1.7 * t_difference ** 0.33, 1.3 * t_difference ** 0.25)
     return convective_and_conductive_heat_fluxes(HEC_AirFlr, states.t_Air, states.t_Floor)
 
 
 def sensible_heat_flux_between_thermal_screen_and_greenhouse_air(states: ClimateStates, setpoints: Setpoints):
-    HEC_AirThScr = 1.7 * setpoints.U_ThScr * abs(states.t_Air - states.t_ThScr) ** 0.33
+    HEC_AirThScr = greenhouse_air_to_thermal_screen_heat_exchange_coefficient(setpoints, states)
     return convective_and_conductive_heat_fluxes(HEC_AirThScr, states.t_Air, states.t_ThScr)
 
 
-def sensible_heat_flux_between_outdoor_and_greenhouse_air(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    density_air = air_density()
-    total_side_vent_rate = total_side_vents_ventilation_rates(setpoints, states, weather)
-    f_VentForced = 0  # According to GreenLight, forced ventilation doesn't exist in this greenhouse
-    HEC_AirOut = density_air * C_PAIR * (total_side_vent_rate + f_VentForced)
+def sensible_heat_flux_between_outdoor_and_greenhouse_air(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                                          air_exchange: AirExchange = None):
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    HEC_AirOut = air_exchange.density_air * C_PAIR * air_exchange.f_AirOut
     return convective_and_conductive_heat_fluxes(HEC_AirOut, states.t_Air, weather.t_Outdoor)
 
 
-def sensible_heat_flux_between_above_thermal_screen_and_greenhouse_air(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    density_air = air_density()
-    thScr_air_flux_rate = thermal_screen_air_flux_rate(setpoints, states, weather)
-    HEC_AirTop = density_air * C_PAIR * thScr_air_flux_rate
+def sensible_heat_flux_between_above_thermal_screen_and_greenhouse_air(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                                                       air_exchange: AirExchange = None):
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    HEC_AirTop = air_exchange.density_air * C_PAIR * air_exchange.f_ThScr
     return convective_and_conductive_heat_fluxes(HEC_AirTop, states.t_Air, states.t_AboveThScr)
 
 
@@ -225,54 +194,41 @@ def latent_heat_flux_between_fogging_and_greenhouse_air(setpoints: Setpoints):
 
 
 def sensible_heat_flux_between_floor_and_first_layer_soil(states: ClimateStates):
-    floor_thickness = Coefficients.Floor.floor_thickness
-    floor_heat_conductivity = Coefficients.Floor.floor_heat_conductivity
-    soil_heat_conductivity = Coefficients.Soil.soil_heat_conductivity
-    h_So1 = Coefficients.Soil.soil_thicknesses[0]
-    HEC_FlrSo1 = 2 / (floor_thickness / floor_heat_conductivity + h_So1 / soil_heat_conductivity)
-    soil_1_t = states.t_Soil[0]  # first layer
+    HEC_FlrSo1 = model_parameters().HEC_FlrSo1
+    soil_1_t = np.asarray(states.t_Soil)[..., 0]  # first layer
     return convective_and_conductive_heat_fluxes(HEC_FlrSo1, states.t_Floor, soil_1_t)
 
 
 def latent_heat_flux_between_greenhouse_air_and_thermal_screen(states: ClimateStates, setpoints: Setpoints):
-    vapor_pressure_ThScr = saturation_vapor_pressure(states.t_ThScr)
-    HEC_AirThScr = 1.7 * setpoints.U_ThScr * abs(states.t_Air - states.t_ThScr) ** 0.33
-    mass_vapor_flux_AirThScr = differentiable_air_to_obj_vapor_flux(states.vapor_pressure_Air,
-                                                                    vapor_pressure_ThScr,
-                                                                    HEC_AirThScr)
-    return latent_heat_fluxes(mass_vapor_flux_AirThScr)
+    # Equation 8.42, see condensation_fluxes
+    return condensation_fluxes(setpoints, states, ('ThScr',)).latent_heat_flux_AirThScr
 
 
 def sensible_heat_flux_between_thermal_screen_and_above_thermal_screen(states: ClimateStates, setpoints: Setpoints):
-    HEC_ThScrTop = 1.7 * setpoints.U_ThScr * abs(states.t_ThScr - states.t_AboveThScr) ** 0.33
+    HEC_ThScrTop = 1.7 * setpoints.U_ThScr * smooth_abs(states.t_ThScr - states.t_AboveThScr) ** 0.33
     return convective_and_conductive_heat_fluxes(HEC_ThScrTop, states.t_ThScr, states.t_AboveThScr)
 
 
 def sensible_heat_flux_between_above_thermal_screen_and_internal_cover(states: ClimateStates):
-    HEC_TopCov_in = Coefficients.Construction.c_HECin * (states.t_AboveThScr - states.t_Cov_internal) ** 0.33 \
-                    * Coefficients.Construction.cover_area / Coefficients.Construction.floor_area
+    HEC_TopCov_in = above_thermal_screen_to_internal_cover_heat_exchange_coefficient(states)
     return convective_and_conductive_heat_fluxes(HEC_TopCov_in, states.t_AboveThScr, states.t_Cov_internal)
 
 
-def sensible_heat_flux_between_above_thermal_screen_and_outdoor(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    density_air = air_density()
-    total_roof_vent_rate = total_roof_ventilation_rates(setpoints, states, weather)
-    HEC_TopOut = density_air * C_PAIR * total_roof_vent_rate
+def sensible_heat_flux_between_above_thermal_screen_and_outdoor(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                                                air_exchange: AirExchange = None):
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    HEC_TopOut = air_exchange.density_air * C_PAIR * air_exchange.f_TopOut
     return convective_and_conductive_heat_fluxes(HEC_TopOut, states.t_AboveThScr, weather.t_Outdoor)
 
 
 def latent_heat_flux_between_above_thermal_screen_and_internal_cover(states: ClimateStates):
-    vapor_pressure_Cov_internal = saturation_vapor_pressure(states.t_Cov_internal)
-    HEC_TopCov_in = Coefficients.Construction.c_HECin * (states.t_AboveThScr - states.t_Cov_internal) ** 0.33 \
-                    * Coefficients.Construction.cover_area / Coefficients.Construction.floor_area
-    mass_vapor_flux_TopCov_in = differentiable_air_to_obj_vapor_flux(states.vapor_pressure_AboveThScr,
-                                                                     vapor_pressure_Cov_internal,
-                                                                     HEC_TopCov_in)
-    return latent_heat_fluxes(mass_vapor_flux_TopCov_in)
+    # Equation 8.42, see condensation_fluxes
+    return condensation_fluxes(None, states, ('Cov_in',)).latent_heat_flux_TopCov_in
 
 
 def sensible_heat_flux_between_internal_cover_and_external_cover(states: ClimateStates):
-    HEC_Cov_in_Cov_e = lumped_cover_conductive_heat_flux()  # Note: line 819 / setGlAux / GreenLight
+    HEC_Cov_in_Cov_e = model_parameters().HEC_Cov_in_Cov_e  # Note: line 819 / setGlAux / GreenLight
     return convective_and_conductive_heat_fluxes(HEC_Cov_in_Cov_e, states.t_Cov_internal, states.t_Cov_external)
 
 
@@ -297,7 +253,7 @@ def sensible_heat_flux_between_greenhouse_air_and_blackout_screen(states: Climat
         states:
     Returns: Between air in main compartment and blackout screen [W m^{-2}]
     """
-    HEC_AirBlScr = 1.7 * setpoints.U_BlScr * abs(states.t_Air - states.t_BlScr) ** 0.33
+    HEC_AirBlScr = greenhouse_air_to_blackout_screen_heat_exchange_coefficient(setpoints, states)
     return convective_and_conductive_heat_fluxes(HEC_AirBlScr, states.t_Air, states.t_BlScr)
 
 
@@ -331,25 +287,21 @@ def sensible_heat_flux_between_grow_pipe_and_greenhouse_air(states: ClimateState
 
     Returns: Between grow pipes and air in main compartment [W m^{-2}]
     """
-    HEC_GroPipeAir = 1.99 * math.pi * Coefficients.GrowPipe.phi_external_pipe * Coefficients.GrowPipe.pipe_length * (abs(states.t_GrowPipe - states.t_Air)) ** 0.33
+    HEC_GroPipeAir = 1.99 * model_parameters().A_GroPipe * smooth_abs(states.t_GrowPipe - states.t_Air) ** 0.33
     return convective_and_conductive_heat_fluxes(HEC_GroPipeAir, states.t_GrowPipe, states.t_Air)
 
 
 def sensible_heat_flux_between_above_thermal_screen_and_blackout_screen(states: ClimateStates, setpoints: Setpoints):
-    HEC_ThScrBlScr = 1.7 * setpoints.U_BlScr * abs(states.t_BlScr - states.t_AboveThScr) ** 0.33
+    HEC_ThScrBlScr = 1.7 * setpoints.U_BlScr * smooth_abs(states.t_BlScr - states.t_AboveThScr) ** 0.33
     return convective_and_conductive_heat_fluxes(HEC_ThScrBlScr, states.t_BlScr, states.t_AboveThScr)
 
 
 def latent_heat_flux_between_greenhouse_air_and_blackout_screen(states: ClimateStates, setpoints: Setpoints):
-    blScr_vapor_pressure = saturation_vapor_pressure(states.t_BlScr)
-    HEC_AirBlScr = 1.7 * setpoints.U_BlScr * abs(states.t_Air - states.t_BlScr) ** 0.33
     """
     % Condensation from main compartment on blackout screen [kg m^{-2} s^{-1}]
-    % Equation A39 [2]
+    % Equation A39 [2], see condensation_fluxes
     """
-    mass_vapor_flux_AirBlScr = differentiable_air_to_obj_vapor_flux(states.vapor_pressure_Air,
-                                                                    blScr_vapor_pressure, HEC_AirBlScr)
-    return latent_heat_fluxes(mass_vapor_flux_AirBlScr)
+    return condensation_fluxes(setpoints, states, ('BlScr',)).latent_heat_flux_AirBlScr
 
 
 def sensible_heat_flux_between_boiler_and_grow_pipe(setpoints: Setpoints):
@@ -0,0 +1,161 @@
+"""Flux ledger
+
+An opt-in record of every named flux of the heat, vapor and CO2 balances in climate.state_variables.
+While a FluxLedger is active, each balance writes its fluxes into preallocated NumPy accumulators. Without an active
+ledger a balance only pays one comparison with None: the named fluxes are not even collected.
+
+The ledger does not know the time step: the integrator calls step(dt) after each accepted step, which adds the fluxes
+of the last evaluation to the integrals and stores every decimation-th step in the time series. Given the states
+before and after the step, step also checks the closure of each balance: the fluxes integrated over the step must
+equal capacity * (state after - state before). This holds up to round-off for an explicit Euler step, which evaluates
+the fluxes at the start of the step; other solvers add their truncation error. A flux which the ledger records but
+the derivative misses, or the other way round, shows up as a closure error.
+
+    with FluxLedger(n_steps=288, decimation=12) as ledger:
+        for _ in range(288):
+            next_states = solver_step(states, dt)
+            ledger.step(dt, states, next_states)
+            states = next_states
+    ledger.integral('t_Air', 'sensible_heat_flux_CanopyAir')  # [J m^-2]
+    ledger.check_closure()
+
+The ledger records scalar evaluations, i.e. one greenhouse at a time.
+"""
+import numpy as np
+
+# Number of flux slots allocated up front. The balances of state_variables use about 150.
+DEFAULT_MAX_FLUXES = 256
+
+
+class FluxLedger(object):
+    def __init__(self, n_steps: int = 0, decimation: int = 0, max_fluxes: int = DEFAULT_MAX_FLUXES):
+        """
+        Args:
+            n_steps: the number of steps of the run, used to size the time series
+            decimation: store the fluxes of every decimation-th step in the time series, 0 to store no time series
+            max_fluxes: the number of flux slots
+        """
+        self.names = []  # (compartment, flux name) of each slot
+        self._index = {}
+        self._current = np.zeros(max_fluxes)
+        self.integrals = np.zeros(max_fluxes)
+        self.decimation = decimation
+        n_samples = n_steps // decimation + 1 if decimation else 0
+        self.series = np.zeros((n_samples, max_fluxes))
+        self.series_time = np.zeros(n_samples)
+        self.n_samples = 0
+        self.n_steps = 0
+        self.time = 0.0
+        self.closure_errors = {}  # largest relative closure error of each compartment over the checked steps
+        self._balances = {}  # capacity and slots of each compartment in the last evaluation
+        self._previous_ledger = None
+
+    def __enter__(self):
+        global _active_ledger
+        self._previous_ledger = _active_ledger
+        _active_ledger = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_ledger
+        _active_ledger = self._previous_ledger
+        self._previous_ledger = None
+
+    def _slot(self, compartment: str, name: str) -> int:
+        key = (compartment, name)
+        index = self._index.get(key)
+        if index is None:
+            index = len(self.names)
+            if index == len(self._current):
+                raise ValueError(f'The ledger has no free slot for {key}, increase max_fluxes')
+            self._index[key] = index
+            self.names.append(key)
+        return index
+
+    def record_balance(self, compartment: str, capacity, gains: dict, losses: dict):
+        """
+        Record the fluxes of one balance capacity * derivative = sum(gains) - sum(losses)
+        Args:
+            compartment: the name of the state of the balance, a field of ClimateStates or t_Soil_<layer>
+            capacity: the capacity of the compartment
+            gains: the fluxes into the compartment by name
+            losses: the fluxes out of the compartment by name, recorded with a negative sign
+        """
+        current = self._current
+        slots = []
+        for sign, fluxes in ((1, gains), (-1, losses)):
+            for name, flux in fluxes.items():
+                if np.ndim(flux):
+                    raise ValueError(f'The ledger records one greenhouse at a time, the flux {name} of {compartment} '
+                                     f'has the shape {np.shape(flux)}')
+                slot = self._slot(compartment, name)
+                current[slot] = sign * flux
+                slots.append(slot)
+        if np.ndim(capacity):
+            raise ValueError(f'The ledger records one greenhouse at a time, the capacity of {compartment} '
+                             f'has the shape {np.shape(capacity)}')
+        self._balances[compartment] = (capacity, slots)
+
+    def step(self, dt: float, states_before=None, states_after=None):
+        """
+        Integrate the fluxes of the last evaluation over an accepted step of dt seconds
+        Args:
+            dt: the step [s]
+            states_before: the ClimateStates at the start of the step, the states of the last evaluation
+            states_after: the ClimateStates at the end of the step, to check the closure of the balances
+        """
+        if states_before is not None and states_after is not None:
+            self._check_step(dt, states_before, states_after)
+        self.integrals += self._current * dt
+        self.time += dt
+        if self.decimation and self.n_steps % self.decimation == 0 and self.n_samples < len(self.series):
+            self.series[self.n_samples] = self._current
+            self.series_time[self.n_samples] = self.time
+            self.n_samples += 1
+        self.n_steps += 1
+
+    def _check_step(self, dt: float, states_before, states_after):
+        current = self._current
+        for compartment, (capacity, slots) in self._balances.items():
+            change = capacity * (_state_value(states_after, compartment) - _state_value(states_before, compartment))
+            integrated = dt * current[slots].sum()
+            scale = dt * np.abs(current[slots]).sum()
+            error = abs(integrated - change) / scale if scale > 0 else abs(change)
+            if error > self.closure_errors.get(compartment, 0.0):
+                self.closure_errors[compartment] = error
+
+    def integral(self, compartment: str, name: str) -> float:
+        """
+        Returns: the time integral of a flux, e.g. [J m^-2] for a heat flux
+        """
+        return self.integrals[self._index[(compartment, name)]]
+
+    def time_series(self, compartment: str, name: str) -> np.ndarray:
+        """
+        Returns: the decimated time series of a flux, a view on the ledger storage
+        """
+        return self.series[:self.n_samples, self._index[(compartment, name)]]
+
+    def check_closure(self, tolerance: float = 1e-9) -> dict:
+        """
+        Returns: the compartments whose fluxes, integrated over the steps checked by step, don't sum to
+                 capacity * the change of their state, with their relative error
+        """
+        return {compartment: error for compartment, error in self.closure_errors.items() if error > tolerance}
+
+
+_active_ledger = None
+
+
+def active_ledger() -> FluxLedger:
+    """
+    Returns: the ledger of the enclosing `with FluxLedger(...)` block, None when no ledger is active
+    """
+    return _active_ledger
+
+
+def _state_value(states, compartment: str):
+    # The state of a compartment, the soil layers are t_Soil_1, t_Soil_2, ...
+    if compartment.startswith('t_Soil_'):
+        return np.asarray(states.t_Soil)[int(compartment[len('t_Soil_'):]) - 1]
+    return getattr(states, compartment)
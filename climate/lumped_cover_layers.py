@@ -9,7 +9,7 @@ The default model contains three cover layers, i.e.
     - The greenhouse roof (Rf)
     - A movable indoor thermal screen (ThScr).
 """
-import math
+import numpy as np
 
 from coefficients import Coefficients
 from data_models import Setpoints
@@ -105,7 +105,7 @@ def lumped_cover_heat_capacity():
     roof_thickness = Coefficients.Roof.roof_thickness
     roof_density = Coefficients.Roof.roof_density
     c_p_Rf = Coefficients.Roof.c_p_Rf
-    return math.cos(mean_greenhouse_cover_slope)*(roof_thickness*roof_density*c_p_Rf)
+    return np.cos(mean_greenhouse_cover_slope)*(roof_thickness*roof_density*c_p_Rf)
 
 
 def lumped_cover_conductive_heat_flux():
@@ -0,0 +1,160 @@
+"""Compiled model parameters
+
+Many quantities of the climate model only depend on the greenhouse design, e.g. the air density, the heat capacities,
+the pipe surfaces and the FIR coefficients of the lumped cover. compile_parameters evaluates them once from the
+coefficients into a frozen ModelParameters, which is used by the flux and state functions on the hot path.
+
+The compiled parameters are not refreshed automatically:
+call rebuild_model_parameters() after changing the coefficients.
+design_parameters caches the compiled parameters of immutable designs (see design.GreenhouseDesign) by their key.
+"""
+import functools
+from typing import NamedTuple
+
+import numpy as np
+
+from coefficients import Coefficients
+from climate.lumped_cover_layers import double_layer_cover_transmission_coefficient, \
+    double_layer_cover_reflection_coefficient
+from constants import *
+
+# Depth of the lower boundary below the last soil layer.
+# Unit: m
+# Ref: Assumed by GreenLight's authors, line 83, setGlParams
+SOIL_LOWER_BOUNDARY_THICKNESS = 1.28
+
+
+class ModelParameters(NamedTuple):
+    density_air: float  # Equation 8.24 [kg m^-3]
+    pressure: float  # air pressure at the elevation of the greenhouse [Pa]
+    cap_Air: float  # heat capacity of the greenhouse air, Equation 8.23 [J K^-1 m^-2]
+    h_Top: float  # height of the compartment above the thermal screen [m]
+    cap_Top_kelvin: float  # heat capacity of the top compartment air times its absolute temperature [J m^-2]
+    cap_Flr: float  # heat capacity of the floor [J K^-1 m^-2]
+    cap_ThScr: float  # heat capacity of the thermal screen [J K^-1 m^-2]
+    cap_BlScr: float  # heat capacity of the blackout screen [J K^-1 m^-2]
+    cap_Cov: float  # heat capacity of the internal and of the external cover, Equation 8.21 [J K^-1 m^-2]
+    cap_Pipe: float  # heat capacity of the heating pipes, Equation 8.22 [J K^-1 m^-2]
+    cap_GroPipe: float  # heat capacity of the grow pipes [J K^-1 m^-2]
+    cap_Soil: tuple  # heat capacities of the soil layers [J K^-1 m^-2]
+    HEC_Soil: tuple  # heat exchange coefficients floor-layer 1, ..., last layer-lower boundary [W m^-2 K^-1]
+    HEC_FlrSo1: float  # heat exchange coefficient between the floor and the first soil layer [W m^-2 K^-1]
+    HEC_Cov_in_Cov_e: float  # conductive heat exchange coefficient of the cover, Equation 8.19 [W m^-2 K^-1]
+    c_HEC_TopCov_in: float  # c_HECin * cover_area / floor_area [W m^-2 K^-1.33]
+    A_Pipe: float  # surface of the heating pipes per square meter greenhouse floor [m^2 m^-2]
+    A_GroPipe: float  # surface of the grow pipes per square meter greenhouse floor [m^2 m^-2]
+    F_Flr: float  # the part of the floor which is not shaded by the heating pipes [-]
+    cover_FIR_transmission_coef: float  # line 255 / setGlAux / GreenLight
+    cover_FIR_reflection_coef: float  # line 260 / setGlAux / GreenLight
+    epsilon_Cov: float  # FIR emission coefficient of the lumped cover, = a_CovFIR, line 271 / setGlAux
+
+
+def compile_parameters(coefficients=Coefficients) -> ModelParameters:
+    """
+    Evaluate all design-dependent quantities once
+    Args:
+        coefficients: the greenhouse design
+
+    Returns: the compiled parameters
+    """
+    construction = coefficients.Construction
+    density_air = DENSITY_AIR0 * np.exp(GRAVITY * M_AIR * construction.elevation_height / (293.15 * M_GAS))
+    pressure = 101325 * (1 - 2.5577e-5 * construction.elevation_height) ** 5.25588
+
+    heating = coefficients.Heating
+    grow_pipe = coefficients.GrowPipe
+    cap_Pipe = 0.25 * np.pi * heating.pipe_length \
+        * ((heating.phi_external_pipe ** 2 - heating.phi_internal_pipe ** 2) * STEEL_DENSITY * C_PSTEEL
+           + heating.phi_internal_pipe ** 2 * WATER_DENSITY * C_PWATER)
+    cap_GroPipe = 0.25 * np.pi * grow_pipe.pipe_length \
+        * ((grow_pipe.phi_external_pipe ** 2 - grow_pipe.phi_internal_pipe ** 2) * STEEL_DENSITY * C_PSTEEL
+           + grow_pipe.phi_internal_pipe ** 2 * WATER_DENSITY * C_PWATER)
+
+    roof = coefficients.Roof
+    cap_Cov = 0.1 * np.cos(construction.mean_greenhouse_cover_slope) \
+        * (roof.roof_thickness * roof.roof_density * roof.c_p_Rf)
+
+    floor = coefficients.Floor
+    soil = coefficients.Soil
+    # One entry per layer, the layers are on the last axis of swept thicknesses
+    soil_thicknesses = list(np.moveaxis(np.asarray(soil.soil_thicknesses, dtype=float), -1, 0))
+    boundaries = [floor.floor_thickness] + soil_thicknesses + [SOIL_LOWER_BOUNDARY_THICKNESS]
+    HEC_Soil = tuple(2 * soil.soil_heat_conductivity / (h_upper + h_lower)
+                     for h_upper, h_lower in zip(boundaries[:-1], boundaries[1:]))
+
+    shadow_screen = coefficients.Shadowscreen
+    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(
+        shadow_screen.shScr_FIR_transmission_coefficient, roof.roof_FIR_transmission_coefficient,
+        shadow_screen.shScr_FIR_reflection_coefficient, roof.roof_FIR_reflection_coefficient)
+    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(
+        shadow_screen.shScr_FIR_transmission_coefficient, shadow_screen.shScr_FIR_reflection_coefficient,
+        roof.roof_FIR_reflection_coefficient)
+
+    # The density of the top compartment air is M_AIR * pressure / (T * M_GAS), line 704 / setGlAux / GreenLight
+    h_Top = construction.greenhouse_height - construction.air_height
+    cap_Top_kelvin = h_Top * C_PAIR * M_AIR * pressure / M_GAS
+
+    thermal_screen = coefficients.Thermalscreen
+    blackout_screen = coefficients.Blackoutscreen
+    return ModelParameters(
+        density_air=density_air,
+        pressure=pressure,
+        cap_Air=construction.air_height * density_air * C_PAIR,
+        h_Top=h_Top,
+        cap_Top_kelvin=cap_Top_kelvin,
+        cap_Flr=floor.floor_thickness * floor.floor_density * floor.c_pFlr,
+        cap_ThScr=thermal_screen.thScr_thickness * thermal_screen.thScr_density * thermal_screen.c_pThScr,
+        cap_BlScr=blackout_screen.blScr_thickness * blackout_screen.blScr_density * blackout_screen.c_pBlScr,
+        cap_Cov=cap_Cov,
+        cap_Pipe=cap_Pipe,
+        cap_GroPipe=cap_GroPipe,
+        cap_Soil=tuple(h * soil.rho_c_p_So for h in soil_thicknesses),
+        HEC_Soil=HEC_Soil,
+        HEC_FlrSo1=2 / (floor.floor_thickness / floor.floor_heat_conductivity
+                        + soil_thicknesses[0] / soil.soil_heat_conductivity),
+        HEC_Cov_in_Cov_e=roof.roof_heat_conductivity / roof.roof_thickness,
+        c_HEC_TopCov_in=construction.c_HECin * construction.cover_area / construction.floor_area,
+        A_Pipe=np.pi * heating.pipe_length * heating.phi_external_pipe,
+        A_GroPipe=np.pi * grow_pipe.pipe_length * grow_pipe.phi_external_pipe,
+        F_Flr=1 - 0.49 * np.pi * heating.pipe_length * heating.phi_external_pipe,
+        cover_FIR_transmission_coef=cover_FIR_transmission_coef,
+        cover_FIR_reflection_coef=cover_FIR_reflection_coef,
+        epsilon_Cov=1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef)
+
+
+# The number of designs whose compiled parameters are kept by design_parameters
+DESIGN_PARAMETERS_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=DESIGN_PARAMETERS_CACHE_SIZE)
+def design_parameters(design) -> ModelParameters:
+    """
+    Args:
+        design: a GreenhouseDesign, equal designs share one entry of the cache
+
+    Returns: the compiled parameters of the design
+    """
+    return compile_parameters(design)
+
+
+_model_parameters = None
+
+
+def model_parameters() -> ModelParameters:
+    """
+    Returns: the compiled parameters of Coefficients, compiled on first use
+    """
+    global _model_parameters
+    if _model_parameters is None:
+        _model_parameters = compile_parameters(Coefficients)
+    return _model_parameters
+
+
+def rebuild_model_parameters(coefficients=Coefficients) -> ModelParameters:
+    """
+    Recompile the parameters used by the hot path, e.g. after the coefficients have been changed
+    Returns: the new compiled parameters
+    """
+    global _model_parameters
+    _model_parameters = compile_parameters(coefficients)
+    return _model_parameters
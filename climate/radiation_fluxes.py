@@ -4,11 +4,45 @@ Note:
     FIR: Far infrared radiation
     NIR: Near infrared radiation
 """
+import numpy as np
+
 from climate.electrical_input import lamp_electrical_input
-from climate.heat_fluxes import *
 from climate.lumped_cover_layers import *
+from climate.parameters import model_parameters
 from constants import *
-from data_models import ClimateStates, Weather
+from coefficients import Coefficients
+from data_models import ClimateStates, Setpoints, Weather
+
+
+def lumped_cover_virtual_NIR_transmission_coefficients(cover_NIR_reflection_coef):
+    # Equation 8.30
+    return 1 - cover_NIR_reflection_coef
+
+
+def floor_virtual_NIR_transmission_coefficients():
+    # Equation 8.30
+    floor_NIR_reflection_coef = Coefficients.Floor.floor_NIR_reflection_coefficient
+    return 1 - floor_NIR_reflection_coef
+
+
+def canopy_virtual_NIR_transmission_coefficient(states: ClimateStates):
+    # Equation 8.31
+    return np.exp(-CANOPY_NIR_EXTINCTION_COEF * states.leaf_area_index)
+
+
+def canopy_virtual_NIR_reflection_coefficient(states: ClimateStates):
+    # Equation 8.32
+    virtual_NIR_transmission_canopy_coef = canopy_virtual_NIR_transmission_coefficient(states)
+    return CANOPY_NIR_REFLECTION_COEF * (1 - virtual_NIR_transmission_canopy_coef)
+
+
+def thermal_screen_FIR_transmission_coefficient(setpoints: Setpoints):
+    # Equation 8.39
+    return 1 - setpoints.U_ThScr * (1 - Coefficients.Thermalscreen.thScr_FIR_transmission_coefficient)
+
+
+def blackout_screen_FIR_transmission_coefficient(setpoints: Setpoints):
+    return 1 - setpoints.U_BlScr * (1 - Coefficients.Blackoutscreen.blScr_FIR_transmission_coef)
 
 
 def canopy_total_PAR_absorbed(states: ClimateStates, setpoints: Setpoints, weather: Weather):
@@ -34,16 +68,16 @@ def canopy_PAR_absorbed_from_greenhouse_cover(states: ClimateStates, setpoints:
     # Equation 8.27
     radiation_flux_PARGh = PAR_above_canopy_from_sun(setpoints, weather)
     return radiation_flux_PARGh * (1 - CANOPY_PAR_REFLECTION_COEF) * \
-           (1 - math.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index))
+           (1 - np.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index))
 
 
 def canopy_PAR_absorbed_from_greenhouse_floor(states: ClimateStates, setpoints: Setpoints, weather: Weather):
     # Equation 8.29
     radiation_flux_PARGh = PAR_above_canopy_from_sun(setpoints, weather)
     floor_PAR_reflection_coef = Coefficients.Floor.floor_PAR_reflection_coefficient
-    return radiation_flux_PARGh * (1 - math.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index)) * \
+    return radiation_flux_PARGh * (1 - np.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index)) * \
            floor_PAR_reflection_coef * (1 - CANOPY_PAR_REFLECTION_COEF) * \
-           (1 - math.exp(-FLOOR_PAR_EXTINCTION_COEF * states.leaf_area_index))
+           (1 - np.exp(-FLOOR_PAR_EXTINCTION_COEF * states.leaf_area_index))
 
 
 def floor_NIR_absorbed(states: ClimateStates, setpoints: Setpoints, weather: Weather):
@@ -93,7 +127,7 @@ def floor_PAR_absorbed(states: ClimateStates, setpoints: Setpoints, weather: Wea
     canopy_PAR_extinction_coef = CANOPY_PAR_EXTINCTION_COEF
     radiation_flux_PARGh = PAR_above_canopy_from_sun(setpoints, weather)
     return (1 - floor_PAR_reflection_coef) * \
-           math.exp(-canopy_PAR_extinction_coef * states.leaf_area_index) * radiation_flux_PARGh
+           np.exp(-canopy_PAR_extinction_coef * states.leaf_area_index) * radiation_flux_PARGh
 
 
 def PAR_above_canopy_from_sun(setpoints: Setpoints, weather: Weather):
@@ -201,7 +235,7 @@ def canopy_PAR_absorbed_from_lamp_Down(states: ClimateStates, setpoints: Setpoin
     radiation_flux_PARGh_Lamp = PAR_above_canopy_from_lamp(setpoints)
 
     return radiation_flux_PARGh_Lamp * (1 - CANOPY_PAR_REFLECTION_COEF) \
-           * (1 - math.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index))
+           * (1 - np.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index))
 
 
 def PAR_above_canopy_from_lamp(setpoints: Setpoints):
@@ -222,9 +256,9 @@ def canopy_PAR_absorbed_from_lamp_reflected_by_floor_Up(states: ClimateStates, s
     """
     radiation_flux_PARGh_Lamp = PAR_above_canopy_from_lamp(setpoints)
     floor_PAR_reflection_coef = Coefficients.Floor.floor_PAR_reflection_coefficient
-    return radiation_flux_PARGh_Lamp * math.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index) \
+    return radiation_flux_PARGh_Lamp * np.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index) \
            * floor_PAR_reflection_coef * (1 - CANOPY_PAR_REFLECTION_COEF) \
-           * (1 - math.exp(-FLOOR_PAR_EXTINCTION_COEF * states.leaf_area_index))
+           * (1 - np.exp(-FLOOR_PAR_EXTINCTION_COEF * states.leaf_area_index))
 
 
 def canopy_NIR_absorbed_from_lamp(states: ClimateStates, setpoints: Setpoints):
@@ -237,15 +271,15 @@ def canopy_NIR_absorbed_from_lamp(states: ClimateStates, setpoints: Setpoints):
     Returns: NIR from the lamps absorbed by the canopy [W m^{-2}]
 
     """
-    radiation_flux_PARGh_Lamp = PAR_above_canopy_from_lamp(setpoints)
-    return Coefficients.Lamp.lamp_electrical_input_NIR_conversion * radiation_flux_PARGh_Lamp \
-           * (1 - CANOPY_NIR_REFLECTION_COEF) * (1 - math.exp(-CANOPY_NIR_EXTINCTION_COEF * states.leaf_area_index))
+    electrical_input_lamp = lamp_electrical_input(setpoints)
+    return Coefficients.Lamp.lamp_electrical_input_NIR_conversion * electrical_input_lamp \
+           * (1 - CANOPY_NIR_REFLECTION_COEF) * (1 - np.exp(-CANOPY_NIR_EXTINCTION_COEF * states.leaf_area_index))
 
 
 def FIR_from_lamp_to_canopy(states: ClimateStates):
     A_Lamp = Coefficients.Lamp.A_Lamp
     lamp_bottom_FIR_emission_coef = Coefficients.Lamp.bottom_lamp_emission
-    F_LampCanopy = 1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_LampCanopy = 1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Lamp, lamp_bottom_FIR_emission_coef, CANOPY_FIR_EMISSION_COEF,
                                              F_LampCanopy, states.t_Lamp, states.t_Canopy)
 
@@ -293,7 +327,7 @@ def floor_PAR_absorbed_from_lamp(states: ClimateStates, setpoints: Setpoints):
     radiation_flux_PARGh_Lamp = PAR_above_canopy_from_lamp(setpoints)
 
     return (1-Coefficients.Floor.floor_PAR_reflection_coefficient) \
-           * math.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index)\
+           * np.exp(-CANOPY_PAR_EXTINCTION_COEF * states.leaf_area_index)\
            * radiation_flux_PARGh_Lamp
 
 
@@ -308,13 +342,13 @@ def floor_NIR_absorbed_from_lamp(states: ClimateStates, setpoints: Setpoints):
     """
     electrical_input_lamp = lamp_electrical_input(setpoints)
     return (1 - Coefficients.Floor.floor_NIR_reflection_coefficient) \
-           * math.exp(-CANOPY_NIR_EXTINCTION_COEF * states.leaf_area_index) \
+           * np.exp(-CANOPY_NIR_EXTINCTION_COEF * states.leaf_area_index) \
            * Coefficients.Lamp.lamp_electrical_input_NIR_conversion * electrical_input_lamp
 
 
 def FIR_from_lamp_to_floor(states: ClimateStates):
-    F_LampFlr = (1 - 0.49 * math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe) \
-                * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_LampFlr = model_parameters().F_Flr \
+                * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(Coefficients.Lamp.A_Lamp,
                                              Coefficients.Lamp.bottom_lamp_emission,
                                              Coefficients.Floor.floor_FIR_emission_coefficient,
@@ -322,27 +356,16 @@ def FIR_from_lamp_to_floor(states: ClimateStates):
 
 
 def FIR_from_pipe_to_canopy(states: ClimateStates):
-    A_Pipe = math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe
-    F_PipeCanopy = 0.49 * (1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index))
+    A_Pipe = model_parameters().A_Pipe
+    F_PipeCanopy = 0.49 * (1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index))
     return net_far_infrared_radiation_fluxes(A_Pipe,
                                              Coefficients.Heating.pipe_FIR_emission_coefficient, CANOPY_FIR_EMISSION_COEF,
                                              F_PipeCanopy, states.t_Pipe, states.t_Canopy)
 
 
 def FIR_from_canopy_to_internal_cover(states: ClimateStates, setpoints: Setpoints):
-    A_Canopy = 1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coef,
-                                                                          shScr_FIR_reflection_coef,
-                                                                          roof_FIR_reflection_coef)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef  # = a_CovFIR, line 271 / setGlAux
+    A_Canopy = 1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
     F_CanopyCov_in = tau_U_ThScrFIR
     return net_far_infrared_radiation_fluxes(A_Canopy, CANOPY_FIR_EMISSION_COEF, epsilon_Cov, F_CanopyCov_in,
@@ -350,26 +373,17 @@ def FIR_from_canopy_to_internal_cover(states: ClimateStates, setpoints: Setpoint
 
 
 def FIR_from_canopy_to_floor(states: ClimateStates):
-    pipe_length = Coefficients.Heating.pipe_length
-    phi_external_pipe = Coefficients.Heating.phi_external_pipe
-    A_Canopy = 1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
-    F_CanopyFlr = 1 - 0.49 * math.pi * pipe_length * phi_external_pipe
+    A_Canopy = 1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_CanopyFlr = model_parameters().F_Flr
     return net_far_infrared_radiation_fluxes(A_Canopy, CANOPY_FIR_EMISSION_COEF,
                                              Coefficients.Floor.floor_FIR_emission_coefficient, F_CanopyFlr,
                                              states.t_Canopy, states.t_Floor)
 
 
 def FIR_from_canopy_to_sky(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    A_Canopy = 1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    A_Canopy = 1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
+    cover_FIR_transmission_coef = model_parameters().cover_FIR_transmission_coef  # line 255 / setGlAux / GreenLight
     F_CanopySky = cover_FIR_transmission_coef * tau_U_ThScrFIR
     return net_far_infrared_radiation_fluxes(A_Canopy, CANOPY_FIR_EMISSION_COEF, SKY_FIR_EMISSION_COEF, F_CanopySky,
                                              states.t_Canopy, weather.t_Sky)
@@ -377,14 +391,14 @@ def FIR_from_canopy_to_sky(states: ClimateStates, setpoints: Setpoints, weather:
 
 def FIR_from_canopy_to_thermal_screen(states: ClimateStates, setpoints: Setpoints):
     F_CanopyThScr = setpoints.U_ThScr
-    A_Canopy = 1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    A_Canopy = 1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Canopy,
                                              CANOPY_FIR_EMISSION_COEF, Coefficients.Thermalscreen.thScr_FIR_emission_coefficient,
                                              F_CanopyThScr, states.t_Canopy, states.t_ThScr)
 
 
 def FIR_from_heating_pipe_to_floor(states: ClimateStates):
-    A_Pipe = math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe
+    A_Pipe = model_parameters().A_Pipe
     F_PipeFlr = 0.49
     return net_far_infrared_radiation_fluxes(A_Pipe,
                                              Coefficients.Heating.pipe_FIR_emission_coefficient,
@@ -394,23 +408,10 @@ def FIR_from_heating_pipe_to_floor(states: ClimateStates):
 
 def FIR_from_floor_to_internal_cover(states: ClimateStates, setpoints: Setpoints):
     A_Flr = 1
-    pipe_length = Coefficients.Heating.pipe_length
-    phi_external_pipe = Coefficients.Heating.phi_external_pipe
-    shScr_FIR_transmission_coefficient = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coefficient = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coefficient = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coefficient = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coefficient = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coefficient,
-                                                                                     roof_FIR_transmission_coefficient,
-                                                                                     shScr_FIR_reflection_coefficient,
-                                                                                     roof_FIR_reflection_coefficient)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coefficient = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coefficient,
-                                                                                 shScr_FIR_reflection_coefficient,
-                                                                                 roof_FIR_reflection_coefficient)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coefficient - cover_FIR_reflection_coefficient  # = a_CovFIR, line 271 / setGlAux
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
-    F_FlrCov_in = tau_U_ThScrFIR * (1 - 0.49 * math.pi * pipe_length * phi_external_pipe) \
-                  * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_FlrCov_in = tau_U_ThScrFIR * model_parameters().F_Flr \
+                  * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Flr,
                                              Coefficients.Floor.floor_FIR_emission_coefficient,
                                              epsilon_Cov,
@@ -419,20 +420,11 @@ def FIR_from_floor_to_internal_cover(states: ClimateStates, setpoints: Setpoints
 
 def FIR_from_floor_to_sky(states: ClimateStates, setpoints: Setpoints, weather: Weather):
     A_Flr = 1
-    pipe_length = Coefficients.Heating.pipe_length
-    phi_external_pipe = Coefficients.Heating.phi_external_pipe
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
-    shScr_FIR_transmission_coefficient = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coefficient = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coefficient = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coefficient = Coefficients.Roof.roof_FIR_reflection_coefficient
-    tau_CovFIR = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coefficient,
-                                                             roof_FIR_transmission_coefficient,
-                                                             shScr_FIR_reflection_coefficient,
-                                                             roof_FIR_reflection_coefficient)  # line 255 / setGlAux / GreenLight
-
-    F_FlrSky = tau_CovFIR * tau_U_ThScrFIR * (1 - 0.49 * math.pi * pipe_length * phi_external_pipe) * \
-               math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    tau_CovFIR = model_parameters().cover_FIR_transmission_coef  # line 255 / setGlAux / GreenLight
+
+    F_FlrSky = tau_CovFIR * tau_U_ThScrFIR * model_parameters().F_Flr * \
+               np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Flr,
                                              Coefficients.Floor.floor_FIR_emission_coefficient,
                                              SKY_FIR_EMISSION_COEF,
@@ -441,10 +433,8 @@ def FIR_from_floor_to_sky(states: ClimateStates, setpoints: Setpoints, weather:
 
 def FIR_from_floor_to_thermal_screen(states: ClimateStates, setpoints: Setpoints):
     A_Flr = 1
-    pipe_length = Coefficients.Heating.pipe_length
-    phi_external_pipe = Coefficients.Heating.phi_external_pipe
-    F_FlrThScr = setpoints.U_ThScr * (1 - 0.49 * math.pi * pipe_length * phi_external_pipe) * \
-                 math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_FlrThScr = setpoints.U_ThScr * model_parameters().F_Flr * \
+                 np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Flr,
                                              Coefficients.Floor.floor_FIR_emission_coefficient,
                                              Coefficients.Thermalscreen.thScr_FIR_emission_coefficient, F_FlrThScr,
@@ -452,8 +442,8 @@ def FIR_from_floor_to_thermal_screen(states: ClimateStates, setpoints: Setpoints
 
 
 def FIR_from_heating_pipe_to_thermal_screen(states: ClimateStates, setpoints: Setpoints):
-    A_Pipe = math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe
-    F_PipeThScr = setpoints.U_ThScr * 0.49 * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    A_Pipe = model_parameters().A_Pipe
+    F_PipeThScr = setpoints.U_ThScr * 0.49 * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Pipe,
                                              Coefficients.Heating.pipe_FIR_emission_coefficient,
                                              Coefficients.Thermalscreen.thScr_FIR_emission_coefficient, F_PipeThScr,
@@ -462,18 +452,7 @@ def FIR_from_heating_pipe_to_thermal_screen(states: ClimateStates, setpoints: Se
 
 def FIR_from_thermal_screen_to_internal_cover(states: ClimateStates, setpoints: Setpoints):
     A_ThScr = 1
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coef,
-                                                                          shScr_FIR_reflection_coef,
-                                                                          roof_FIR_reflection_coef)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef  # = a_CovFIR, line 271 / setGlAux
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
     F_ThScrCov_in = setpoints.U_ThScr
     return net_far_infrared_radiation_fluxes(A_ThScr,
                                              Coefficients.Thermalscreen.thScr_FIR_emission_coefficient, epsilon_Cov,
@@ -482,14 +461,7 @@ def FIR_from_thermal_screen_to_internal_cover(states: ClimateStates, setpoints:
 
 def FIR_from_thermal_screen_to_sky(states: ClimateStates, setpoints: Setpoints, weather: Weather):
     A_ThScr = 1
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
+    cover_FIR_transmission_coef = model_parameters().cover_FIR_transmission_coef  # line 255 / setGlAux / GreenLight
     F_ThScrSky = cover_FIR_transmission_coef * setpoints.U_ThScr
     return net_far_infrared_radiation_fluxes(A_ThScr,
                                              Coefficients.Thermalscreen.thScr_FIR_emission_coefficient,
@@ -498,21 +470,10 @@ def FIR_from_thermal_screen_to_sky(states: ClimateStates, setpoints: Setpoints,
 
 
 def FIR_from_heating_pipe_to_internal_cover(states: ClimateStates, setpoints: Setpoints):
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coef,
-                                                                          shScr_FIR_reflection_coef,
-                                                                          roof_FIR_reflection_coef)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef  # = a_CovFIR, line 271 / setGlAux
-    A_Pipe = math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
+    A_Pipe = model_parameters().A_Pipe
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
-    F_PipeCov_in = tau_U_ThScrFIR * 0.49 * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_PipeCov_in = tau_U_ThScrFIR * 0.49 * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Pipe,
                                              Coefficients.Heating.pipe_FIR_emission_coefficient, epsilon_Cov,
                                              F_PipeCov_in, states.t_Pipe, states.t_Cov_internal)
@@ -565,44 +526,26 @@ def cover_global_radiation(setpoints: Setpoints, weather: Weather):
 
 def FIR_from_external_cover_to_sky(states: ClimateStates, weather: Weather):
     A_Cov_e = 1
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coef,
-                                                                          shScr_FIR_reflection_coef,
-                                                                          roof_FIR_reflection_coef)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef  # = a_CovFIR, line 271 / setGlAux
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
     F_Cov_e_Sky = 1
     return net_far_infrared_radiation_fluxes(A_Cov_e, epsilon_Cov, SKY_FIR_EMISSION_COEF, F_Cov_e_Sky,
                                              states.t_Cov_external, weather.t_Sky)
 
 
 def FIR_from_heating_pipe_to_sky(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    A_Pipe = math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
+    A_Pipe = model_parameters().A_Pipe
+    cover_FIR_transmission_coef = model_parameters().cover_FIR_transmission_coef  # line 255 / setGlAux / GreenLight
 
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
     F_PipeSky = cover_FIR_transmission_coef * tau_U_ThScrFIR * 0.49 \
-                * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+                * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Pipe,
                                              Coefficients.Heating.pipe_FIR_emission_coefficient, SKY_FIR_EMISSION_COEF,
                                              F_PipeSky, states.t_Pipe, weather.t_Sky)
 
 
 def FIR_from_canopy_to_blackout_screen(states: ClimateStates, setpoints: Setpoints):
-    A_Canopy = 1 - math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    A_Canopy = 1 - np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     F_CanopyBlScr = Coefficients.Lamp.lamp_FIR_transmission_coef * setpoints.U_BlScr
 
     return net_far_infrared_radiation_fluxes(A_Canopy, CANOPY_FIR_EMISSION_COEF,
@@ -611,7 +554,7 @@ def FIR_from_canopy_to_blackout_screen(states: ClimateStates, setpoints: Setpoin
 
 
 def FIR_from_grow_pipe_to_canopy(states: ClimateStates):
-    A_GroPipe = math.pi * Coefficients.GrowPipe.pipe_length * Coefficients.GrowPipe.phi_external_pipe  # Surface area of pipes for floor area
+    A_GroPipe = model_parameters().A_GroPipe  # Surface area of pipes for floor area
     F_GroPipeCanopy = 1
     return net_far_infrared_radiation_fluxes(A_GroPipe, Coefficients.GrowPipe.groPipe_FIR_emission_coef,
                                              CANOPY_FIR_EMISSION_COEF, F_GroPipeCanopy, states.t_GrowPipe, states.t_Canopy)
@@ -619,7 +562,7 @@ def FIR_from_grow_pipe_to_canopy(states: ClimateStates):
 
 def FIR_from_floor_to_blackout_screen(states: ClimateStates, setpoints: Setpoints):
     A_Flr = 1
-    F_FloorBlScr = Coefficients.Lamp.lamp_FIR_transmission_coef * setpoints.U_BlScr * (1 - 0.49 * math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe) * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_FloorBlScr = Coefficients.Lamp.lamp_FIR_transmission_coef * setpoints.U_BlScr * model_parameters().F_Flr * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Flr,
                                              Coefficients.Floor.floor_FIR_emission_coefficient,
                                              Coefficients.Blackoutscreen.blScr_FIR_emission_coef,
@@ -643,53 +586,31 @@ def FIR_from_lamp_to_thermal_screen(states: ClimateStates, setpoints: Setpoints)
 
 
 def FIR_from_blackout_screen_to_internal_cover(states: ClimateStates, setpoints: Setpoints):
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coef,
-                                                                          shScr_FIR_reflection_coef,
-                                                                          roof_FIR_reflection_coef)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef  # = a_CovFIR, line 271 / setGlAux
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
     F_BlScrCov_in = setpoints.U_BlScr*thermal_screen_FIR_transmission_coefficient(setpoints)
     return net_far_infrared_radiation_fluxes(1, Coefficients.Blackoutscreen.blScr_FIR_emission_coef, epsilon_Cov,
                                              F_BlScrCov_in, states.t_BlScr, states.t_Cov_internal)
 
 
 def FIR_from_lamp_to_internal_cover(states: ClimateStates, setpoints: Setpoints):
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
-    cover_FIR_reflection_coef = double_layer_cover_reflection_coefficient(shScr_FIR_transmission_coef,
-                                                                          shScr_FIR_reflection_coef,
-                                                                          roof_FIR_reflection_coef)  # line 260 / setGlAux / GreenLight
-    epsilon_Cov = 1 - cover_FIR_transmission_coef - cover_FIR_reflection_coef  # = a_CovFIR, line 271 / setGlAux
-    F_LampCov_in = thermal_screen_FIR_transmission_coefficient(setpoints).blackout_screen_FIR_transmission_coefficient(setpoints)
+    epsilon_Cov = model_parameters().epsilon_Cov  # = a_CovFIR, line 271 / setGlAux
+    F_LampCov_in = thermal_screen_FIR_transmission_coefficient(setpoints) * blackout_screen_FIR_transmission_coefficient(setpoints)
     return net_far_infrared_radiation_fluxes(Coefficients.Lamp.A_Lamp, Coefficients.Lamp.top_lamp_emission, epsilon_Cov,
                                              F_LampCov_in, states.t_Lamp, states.t_Cov_internal)
 
 
 def FIR_from_heating_pipe_to_blackout_screen(states: ClimateStates, setpoints: Setpoints):
-    A_Pipe = math.pi * Coefficients.Heating.pipe_length * Coefficients.Heating.phi_external_pipe
+    A_Pipe = model_parameters().A_Pipe
     F_PipeBlScr = Coefficients.Lamp.lamp_FIR_transmission_coef * setpoints.U_BlScr * 0.49 \
-                  * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+                  * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(A_Pipe, Coefficients.Heating.pipe_FIR_emission_coefficient,
                                              Coefficients.Blackoutscreen.blScr_FIR_emission_coef,
                                              F_PipeBlScr, states.t_Pipe, states.t_BlScr)
 
 
 def FIR_from_lamp_to_heating_pipe(states: ClimateStates):
-    F_LampPipe = 0.49*math.pi*Coefficients.Heating.pipe_length*Coefficients.Heating.phi_external_pipe \
-                 * math.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
+    F_LampPipe = 0.49 * model_parameters().A_Pipe \
+                 * np.exp(-CANOPY_FIR_EXTINCTION_COEF * states.leaf_area_index)
     return net_far_infrared_radiation_fluxes(Coefficients.Lamp.A_Lamp,
                                              Coefficients.Lamp.bottom_lamp_emission,
                                              Coefficients.Heating.pipe_FIR_emission_coefficient,
@@ -697,14 +618,7 @@ def FIR_from_lamp_to_heating_pipe(states: ClimateStates):
 
 
 def FIR_from_lamp_to_sky(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
+    cover_FIR_transmission_coef = model_parameters().cover_FIR_transmission_coef  # line 255 / setGlAux / GreenLight
     F_LampSky = cover_FIR_transmission_coef\
                 * thermal_screen_FIR_transmission_coefficient(setpoints)\
                 * blackout_screen_FIR_transmission_coefficient(setpoints)
@@ -715,14 +629,7 @@ def FIR_from_lamp_to_sky(states: ClimateStates, setpoints: Setpoints, weather: W
 
 def FIR_from_blackout_screen_to_sky(states: ClimateStates, setpoints: Setpoints, weather: Weather):
     tau_U_ThScrFIR = thermal_screen_FIR_transmission_coefficient(setpoints)
-    shScr_FIR_transmission_coef = Coefficients.Shadowscreen.shScr_FIR_transmission_coefficient
-    shScr_FIR_reflection_coef = Coefficients.Shadowscreen.shScr_FIR_reflection_coefficient
-    roof_FIR_transmission_coef = Coefficients.Roof.roof_FIR_transmission_coefficient
-    roof_FIR_reflection_coef = Coefficients.Roof.roof_FIR_reflection_coefficient
-    cover_FIR_transmission_coef = double_layer_cover_transmission_coefficient(shScr_FIR_transmission_coef,
-                                                                              roof_FIR_transmission_coef,
-                                                                              shScr_FIR_reflection_coef,
-                                                                              roof_FIR_reflection_coef)  # line 255 / setGlAux / GreenLight
+    cover_FIR_transmission_coef = model_parameters().cover_FIR_transmission_coef  # line 255 / setGlAux / GreenLight
     F_BlScrSky = cover_FIR_transmission_coef*setpoints.U_BlScr*tau_U_ThScrFIR
     return net_far_infrared_radiation_fluxes(1, Coefficients.Blackoutscreen.blScr_FIR_emission_coef,
                                              SKY_FIR_EMISSION_COEF,
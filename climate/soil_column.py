@@ -0,0 +1,178 @@
+"""Soil column
+
+The soil below the floor is a column of layers exchanging heat by conduction (Equation 2.4 / 8.4).
+The upper boundary of the column is the floor, the lower boundary is the deep soil temperature t_Soil_Out.
+The layers are numbered from the top, the last axis of the temperature arrays is the layer axis.
+
+The heat balance of the column is a tridiagonal linear operator:
+    cap_Soil * dT/dt = A T + b
+where b only contains the boundary terms of the first and the last layer.
+soil_column_derivatives evaluates it explicitly with array operations, implicit_soil_column_step advances it
+with a backward Euler step solved by scipy.linalg.solve_banded, so that thin layers don't limit the time step.
+"""
+from typing import NamedTuple
+
+import numpy as np
+from scipy.linalg import solve_banded
+
+from coefficients import Coefficients
+from climate.parameters import SOIL_LOWER_BOUNDARY_THICKNESS
+
+
+class SoilColumn(NamedTuple):
+    # The layer axis is the last axis, leading axes are the lanes of a design sweep (see design.GreenhouseDesign)
+    thicknesses: np.ndarray  # thickness of the layers [m]
+    cap_Soil: np.ndarray  # heat capacity of the layers [J K^-1 m^-2]
+    HEC_Soil: np.ndarray  # heat exchange coefficients floor-layer 1, ..., last layer-lower boundary [W m^-2 K^-1]
+
+    @property
+    def n_layers(self) -> int:
+        return self.thicknesses.shape[-1]
+
+    @property
+    def depths(self) -> np.ndarray:
+        """The depth of the centre of each layer below the floor [m]"""
+        return np.cumsum(self.thicknesses, axis=-1) - self.thicknesses / 2
+
+
+def soil_column(thicknesses, coefficients=Coefficients,
+                lower_boundary_thickness: float = SOIL_LOWER_BOUNDARY_THICKNESS) -> SoilColumn:
+    """
+    Build a soil column from the thicknesses of its layers
+    Args:
+        thicknesses: the thickness of each layer from the top, shape (..., n_layers) for swept designs [m]
+        coefficients: provides the floor thickness and the soil properties
+        lower_boundary_thickness: the depth of the lower boundary below the last layer [m]
+
+    Returns: the soil column
+    """
+    soil = coefficients.Soil
+    floor_thickness = np.asarray(coefficients.Floor.floor_thickness, dtype=float)
+    # Swept soil properties get a layer axis
+    rho_c_p_So = np.asarray(soil.rho_c_p_So, dtype=float)[..., np.newaxis]
+    soil_heat_conductivity = np.asarray(soil.soil_heat_conductivity, dtype=float)[..., np.newaxis]
+    thicknesses = np.asarray(thicknesses, dtype=float)
+    if thicknesses.ndim == 0 or thicknesses.shape[-1] == 0 or np.any(thicknesses <= 0):
+        raise ValueError('The soil column needs at least one layer of positive thickness')
+    batch_shape = np.broadcast_shapes(thicknesses.shape[:-1], floor_thickness.shape, rho_c_p_So.shape[:-1],
+                                      soil_heat_conductivity.shape[:-1])
+    thicknesses = np.broadcast_to(thicknesses, batch_shape + thicknesses.shape[-1:])
+    boundaries = np.concatenate((np.broadcast_to(floor_thickness, batch_shape)[..., np.newaxis], thicknesses,
+                                 np.full(batch_shape + (1,), lower_boundary_thickness)), axis=-1)
+    return SoilColumn(thicknesses=thicknesses,
+                      cap_Soil=thicknesses * rho_c_p_So,
+                      HEC_Soil=2 * soil_heat_conductivity / (boundaries[..., :-1] + boundaries[..., 1:]))
+
+
+def uniform_soil_column(n_layers: int, depth: float, coefficients=Coefficients,
+                        lower_boundary_thickness: float = SOIL_LOWER_BOUNDARY_THICKNESS) -> SoilColumn:
+    """
+    Build a soil column of n_layers layers of equal thickness
+    Args:
+        n_layers: the number of layers
+        depth: the total depth of the layers [m]
+
+    Returns: the soil column
+    """
+    return soil_column(np.full(n_layers, depth / n_layers), coefficients, lower_boundary_thickness)
+
+
+def default_soil_column() -> SoilColumn:
+    """
+    Returns: the soil column of Coefficients.Soil.soil_thicknesses of the active design, the same layers as
+    soil_temperature
+    """
+    return soil_column(Coefficients.Soil.soil_thicknesses)
+
+
+def soil_column_heat_fluxes(column: SoilColumn, t_Soil, t_Floor, t_Soil_Out):
+    """
+    The conductive heat fluxes through the boundaries of the layers, positive downwards
+    Args:
+        t_Soil: the layer temperatures, shape (..., n_layers) [°C]
+        t_Floor: the floor temperature, shape (...) [°C]
+        t_Soil_Out: the deep soil temperature, shape (...) [°C]
+
+    Returns: the fluxes floor-layer 1, ..., last layer-lower boundary, shape (..., n_layers + 1) [W m^-2]
+    """
+    t_Soil = np.asarray(t_Soil, dtype=float)
+    if t_Soil.ndim == 0 or t_Soil.shape[-1] != column.n_layers:
+        raise ValueError(f'The soil column has {column.n_layers} layers, t_Soil has the shape {t_Soil.shape}')
+    batch_shape = t_Soil.shape[:-1]
+    upper = np.broadcast_to(t_Floor, batch_shape)[..., np.newaxis]
+    lower = np.broadcast_to(t_Soil_Out, batch_shape)[..., np.newaxis]
+    temperatures = np.concatenate((upper, t_Soil, lower), axis=-1)
+    return column.HEC_Soil * (temperatures[..., :-1] - temperatures[..., 1:])
+
+
+def soil_column_derivatives(column: SoilColumn, t_Soil, t_Floor, t_Soil_Out):
+    """
+    Equation 2.4 / 8.4 for all layers at once
+    cap_soil_j * t_Soil_j = sensible_heat_flux_soil_j_minus_soil_j - sensible_heat_flux_soil_j_soil_j_plus
+    Returns: the derivatives of the layer temperatures, shape (..., n_layers) [K s^-1]
+    """
+    fluxes = soil_column_heat_fluxes(column, t_Soil, t_Floor, t_Soil_Out)
+    return (fluxes[..., :-1] - fluxes[..., 1:]) / column.cap_Soil
+
+
+def single_design_column(column: SoilColumn) -> SoilColumn:
+    """
+    Returns: the column without its lane axes, the column of a sweep of one design is accepted
+    Raises: ValueError for the column of a sweep of several designs
+    """
+    batch_shape = column.thicknesses.shape[:-1]
+    if int(np.prod(batch_shape)) != 1:
+        raise ValueError(f'The implicit soil step needs the soil column of a single design, got a column of the '
+                         f'lanes {batch_shape} of a design sweep: step each lane with the column of its design, '
+                         f'see design.GreenhouseDesign.lane')
+    return SoilColumn(*(np.reshape(field, field.shape[-1:]) for field in column))
+
+
+def soil_column_banded_operator(column: SoilColumn) -> np.ndarray:
+    """
+    The operator A / cap_Soil of the column in the banded storage of scipy.linalg.solve_banded with (l, u) = (1, 1):
+    row 0 is the upper diagonal, row 1 the main diagonal and row 2 the lower diagonal.
+    Args:
+        column: the column of a single design, see single_design_column
+
+    Returns: the banded operator, shape (3, n_layers) [s^-1]
+    """
+    column = single_design_column(column)
+    HEC_Soil = column.HEC_Soil
+    cap_Soil = column.cap_Soil
+    operator = np.zeros((3, column.n_layers))
+    operator[0, 1:] = HEC_Soil[1:-1] / cap_Soil[:-1]
+    operator[1] = -(HEC_Soil[:-1] + HEC_Soil[1:]) / cap_Soil
+    operator[2, :-1] = HEC_Soil[1:-1] / cap_Soil[1:]
+    return operator
+
+
+def implicit_soil_column_step(column: SoilColumn, t_Soil, t_Floor, t_Soil_Out, dt: float):
+    """
+    Advance the layer temperatures by one backward Euler step, the boundary temperatures are held over the step:
+    (I - dt A / cap_Soil) T(t + dt) = T(t) + dt b / cap_Soil
+    The step is unconditionally stable and costs O(n_layers) per column.
+    Args:
+        column: the column of a single design, the states of all lanes share it
+        t_Soil: the layer temperatures, shape (..., n_layers) [°C]
+        t_Floor: the floor temperature, shape (...) [°C]
+        t_Soil_Out: the deep soil temperature, shape (...) [°C]
+        dt: the time step [s]
+
+    Returns: the layer temperatures at the end of the step, shape (..., n_layers) [°C]
+    """
+    column = single_design_column(column)
+    t_Soil = np.asarray(t_Soil, dtype=float)
+    batch_shape = t_Soil.shape[:-1]
+    n_layers = column.n_layers
+    if t_Soil.ndim == 0 or t_Soil.shape[-1] != n_layers:
+        raise ValueError(f'The soil column has {n_layers} layers, t_Soil has the shape {t_Soil.shape}')
+
+    matrix = -dt * soil_column_banded_operator(column)
+    matrix[1] += 1
+
+    # The columns of the right-hand side are the batch members
+    rhs = t_Soil.reshape(-1, n_layers).T.copy()
+    rhs[0] += dt * column.HEC_Soil[0] / column.cap_Soil[0] * np.broadcast_to(t_Floor, batch_shape).ravel()
+    rhs[-1] += dt * column.HEC_Soil[-1] / column.cap_Soil[-1] * np.broadcast_to(t_Soil_Out, batch_shape).ravel()
+    return solve_banded((1, 1), matrix, rhs).T.reshape(t_Soil.shape)
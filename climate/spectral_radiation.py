@@ -0,0 +1,332 @@
+"""Multi-band spectral radiation mode
+
+The default radiation model (section 8.6.1) lumps the sun into two fixed ratios (RATIO_GLOBALPAR, RATIO_GLOBALNIR)
+and the lamps into PAR/NIR conversion factors. In the spectral mode every radiation quantity carries a band axis
+(always the last axis), e.g. blue, green, red, far-red and NIR. Cover, screen, canopy and floor absorption are
+evaluated for all bands by the same NumPy expressions, so adding bands widens the arrays instead of adding calls.
+
+By default every band inherits the PAR or NIR coefficients of the lumped model, so the band sums reproduce the
+two-band model. LED recipes and spectrally selective materials are described by overriding the per-band arrays
+of SpectralProperties and the lamp spectrum.
+
+The energy balances in climate.state_variables accept the ShortwaveAbsorption of the current evaluation, so the
+radiation mode is selected by passing either lumped_shortwave_absorption or spectral_shortwave_absorption
+(see shortwave_absorption and GreenhouseClimateModel.spectral_radiation).
+
+Note:
+    The lumped cover contains the shading screen, the roof and the thermal screen (see lumped_cover_layers.py)
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from climate.electrical_input import lamp_electrical_input
+from climate.heat_fluxes import construction_elements_global_radiation, lamp_radiation
+from climate.lumped_cover_layers import double_layer_cover_transmission_coefficient, \
+    double_layer_cover_reflection_coefficient, two_layers_transmission_coefficient, two_layers_reflection_coefficient
+from coefficients import Coefficients
+from constants import *
+from climate.radiation_fluxes import canopy_PAR_absorbed_from_sun, canopy_NIR_absorbed_from_sun, floor_PAR_absorbed, \
+    floor_NIR_absorbed, cover_global_radiation, canopy_PAR_absorbed_from_lamp, canopy_NIR_absorbed_from_lamp, \
+    floor_PAR_absorbed_from_lamp, floor_NIR_absorbed_from_lamp
+from data_models import ClimateStates, Setpoints, Weather
+
+# Energy of one µmol of photons times the wavelength.
+# Unit: J nm µmol^-1 {photons}.
+# Ref: Planck constant * speed of light * Avogadro constant
+PHOTON_ENERGY_WAVELENGTH_PRODUCT = 119.63
+
+
+class SpectralBands(NamedTuple):
+    names: tuple  # band names
+    lower_wavelength: np.ndarray  # lower bound of the bands [nm]
+    upper_wavelength: np.ndarray  # upper bound of the bands [nm]
+    global_ratio: np.ndarray  # ratio between the band and the outside global radiation [-]
+
+    @property
+    def is_PAR(self) -> np.ndarray:
+        """
+        Returns: True for the bands inside the photosynthetically active range (400-700 nm)
+        """
+        return (self.lower_wavelength >= 400) & (self.upper_wavelength <= 700)
+
+    @property
+    def photons_per_joule(self) -> np.ndarray:
+        """
+        Returns: the amount of photons per joule at the centre wavelength of each band [µmol{photons} J^-1]
+        """
+        return (self.lower_wavelength + self.upper_wavelength) / 2 / PHOTON_ENERGY_WAVELENGTH_PRODUCT
+
+
+# Blue, green, red, far-red and NIR (UV is attributed to NIR as in Monteith (1973)).
+# The visible and the remaining bands add up to RATIO_GLOBALPAR and RATIO_GLOBALNIR respectively.
+DEFAULT_BANDS = SpectralBands(names=('blue', 'green', 'red', 'far_red', 'NIR'),
+                              lower_wavelength=np.array([400., 500., 600., 700., 800.]),
+                              upper_wavelength=np.array([500., 600., 700., 800., 3000.]),
+                              global_ratio=np.array([0.15, 0.18, 0.17, 0.08, 0.42]))
+
+
+class SpectralProperties(NamedTuple):
+    shScr_transmission_coef: np.ndarray
+    shScr_reflection_coef: np.ndarray
+    roof_transmission_coef: np.ndarray
+    roof_reflection_coef: np.ndarray
+    thScr_transmission_coef: np.ndarray
+    thScr_reflection_coef: np.ndarray
+    floor_reflection_coef: np.ndarray
+    canopy_reflection_coef: np.ndarray
+    canopy_extinction_coef: np.ndarray
+    floor_extinction_coef: np.ndarray  # extinction of the radiation reflected by the floor
+
+
+class SpectralAbsorption(NamedTuple):
+    cover: np.ndarray  # absorbed by the lumped cover [W m^-2]
+    air: np.ndarray  # absorbed by the construction elements and released to the greenhouse air [W m^-2]
+    canopy: np.ndarray  # absorbed by the canopy [W m^-2]
+    floor: np.ndarray  # absorbed by the floor [W m^-2]
+
+
+class ShortwaveAbsorption(NamedTuple):
+    radiation_flux_PAR_SunCanopy: np.ndarray  # [W m^-2]
+    radiation_flux_NIR_SunCanopy: np.ndarray  # [W m^-2]
+    radiation_flux_PAR_SunFlr: np.ndarray  # [W m^-2]
+    radiation_flux_NIR_SunFlr: np.ndarray  # [W m^-2]
+    radiation_flux_Glob_SunAir: np.ndarray  # [W m^-2]
+    radiation_flux_Glob_SunCov_e: np.ndarray  # [W m^-2]
+    radiation_flux_PAR_LampCanopy: np.ndarray  # [W m^-2]
+    radiation_flux_NIR_LampCanopy: np.ndarray  # [W m^-2]
+    radiation_flux_PAR_LampFlr: np.ndarray  # [W m^-2]
+    radiation_flux_NIR_LampFlr: np.ndarray  # [W m^-2]
+    radiation_flux_LampAir: np.ndarray  # [W m^-2]
+
+
+def band_coefficients(bands: SpectralBands, PAR_value, NIR_value) -> np.ndarray:
+    """
+    Spread a PAR and a NIR coefficient of the lumped model over the bands
+    Args:
+        bands: the spectral bands
+        PAR_value: the value used for the bands inside the PAR range
+        NIR_value: the value used for the other bands
+
+    Returns: the per-band coefficients, the band axis is appended to the shape of the values
+    """
+    return np.where(bands.is_PAR, np.asarray(PAR_value)[..., np.newaxis], np.asarray(NIR_value)[..., np.newaxis])
+
+
+def default_spectral_properties(bands: SpectralBands = DEFAULT_BANDS) -> SpectralProperties:
+    """
+    Returns: the per-band properties inherited from the PAR and NIR coefficients of the lumped model
+    """
+    return SpectralProperties(
+        shScr_transmission_coef=band_coefficients(bands, Coefficients.Shadowscreen.shScr_PAR_transmission_coefficient,
+                                                  Coefficients.Shadowscreen.shScr_NIR_transmission_coefficient),
+        shScr_reflection_coef=band_coefficients(bands, Coefficients.Shadowscreen.shScr_PAR_reflection_coefficient,
+                                                Coefficients.Shadowscreen.shScr_NIR_reflection_coefficient),
+        roof_transmission_coef=band_coefficients(bands, Coefficients.Roof.roof_PAR_transmission_coefficient,
+                                                 Coefficients.Roof.roof_NIR_transmission_coefficient),
+        roof_reflection_coef=band_coefficients(bands, Coefficients.Roof.roof_PAR_reflection_coefficient,
+                                               Coefficients.Roof.roof_NIR_reflection_coefficient),
+        thScr_transmission_coef=band_coefficients(bands, Coefficients.Thermalscreen.thScr_PAR_transmission_coefficient,
+                                                  Coefficients.Thermalscreen.thScr_NIR_transmission_coefficient),
+        thScr_reflection_coef=band_coefficients(bands, Coefficients.Thermalscreen.thScr_PAR_reflection_coefficient,
+                                                Coefficients.Thermalscreen.thScr_NIR_reflection_coefficient),
+        floor_reflection_coef=band_coefficients(bands, Coefficients.Floor.floor_PAR_reflection_coefficient,
+                                                Coefficients.Floor.floor_NIR_reflection_coefficient),
+        canopy_reflection_coef=band_coefficients(bands, CANOPY_PAR_REFLECTION_COEF, CANOPY_NIR_REFLECTION_COEF),
+        canopy_extinction_coef=band_coefficients(bands, CANOPY_PAR_EXTINCTION_COEF, CANOPY_NIR_EXTINCTION_COEF),
+        floor_extinction_coef=band_coefficients(bands, FLOOR_PAR_EXTINCTION_COEF, CANOPY_NIR_EXTINCTION_COEF))
+
+
+def default_lamp_spectrum(bands: SpectralBands = DEFAULT_BANDS) -> np.ndarray:
+    """
+    The lamp PAR and NIR conversion rates spread over the bands proportionally to the band widths
+    Returns: the conversion rate from electrical input to the radiation output of each band [J J^-1]
+    """
+    width = bands.upper_wavelength - bands.lower_wavelength
+    PAR_width = np.sum(np.where(bands.is_PAR, width, 0))
+    NIR_width = np.sum(np.where(bands.is_PAR, 0, width))
+    return np.where(bands.is_PAR,
+                    Coefficients.Lamp.lamp_electrical_input_PAR_conversion * width / PAR_width,
+                    Coefficients.Lamp.lamp_electrical_input_NIR_conversion * width / NIR_width)
+
+
+def cover_spectral_coefficients(setpoints: Setpoints, properties: SpectralProperties):
+    """
+    Equations 8.14 - 8.17 for all bands
+    Returns: the transmission and reflection coefficients of the lumped cover [-]
+    """
+    U_Roof = np.asarray(setpoints.U_Roof)[..., np.newaxis]
+    U_ThScr = np.asarray(setpoints.U_ThScr)[..., np.newaxis]
+    roof_thScr_transmission_coef = two_layers_transmission_coefficient(U_Roof, U_ThScr,
+                                                                       properties.roof_transmission_coef,
+                                                                       properties.thScr_transmission_coef,
+                                                                       properties.roof_reflection_coef,
+                                                                       properties.thScr_reflection_coef)
+    roof_thScr_reflection_coef = two_layers_reflection_coefficient(U_Roof, U_ThScr,
+                                                                   properties.roof_transmission_coef,
+                                                                   properties.roof_reflection_coef,
+                                                                   properties.thScr_reflection_coef)
+    cover_transmission_coef = double_layer_cover_transmission_coefficient(properties.shScr_transmission_coef,
+                                                                          roof_thScr_transmission_coef,
+                                                                          properties.shScr_reflection_coef,
+                                                                          roof_thScr_reflection_coef)
+    cover_reflection_coef = double_layer_cover_reflection_coefficient(properties.shScr_transmission_coef,
+                                                                      properties.shScr_reflection_coef,
+                                                                      roof_thScr_reflection_coef)
+    return cover_transmission_coef, cover_reflection_coef
+
+
+def spectral_sun_absorption(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                            bands: SpectralBands = DEFAULT_BANDS, properties: SpectralProperties = None):
+    """
+    Equations 8.26 - 8.37 for all bands at once.
+    The bands inside the PAR range follow the extinction approach of equations 8.27 - 8.29 and 8.35, the other bands
+    follow the virtual layer approach of equations 8.30 - 8.34 for NIR.
+    Returns: SpectralAbsorption of the sun radiation [W m^-2], the band axis is the last axis
+    """
+    if properties is None:
+        properties = default_spectral_properties(bands)
+    ratio_GlobAir = Coefficients.Construction.ratio_GlobAir
+    leaf_area_index = np.asarray(states.leaf_area_index)[..., np.newaxis]
+    outdoor_band_rad = np.asarray(weather.outdoor_global_rad)[..., np.newaxis] * bands.global_ratio
+    cover_transmission_coef, cover_reflection_coef = cover_spectral_coefficients(setpoints, properties)
+
+    # Equations 8.27 - 8.29, 8.35
+    above_canopy_rad = (1 - ratio_GlobAir) * cover_transmission_coef * outdoor_band_rad
+    canopy_transmission_coef = np.exp(-properties.canopy_extinction_coef * leaf_area_index)
+    canopy_absorbed_extinction = above_canopy_rad * (1 - properties.canopy_reflection_coef) \
+        * (1 - canopy_transmission_coef) \
+        * (1 + properties.floor_reflection_coef * (1 - np.exp(-properties.floor_extinction_coef * leaf_area_index)))
+    floor_absorbed_extinction = (1 - properties.floor_reflection_coef) * canopy_transmission_coef * above_canopy_rad
+
+    # Equations 8.30 - 8.34
+    virtual_canopy_reflection_coef = properties.canopy_reflection_coef * (1 - canopy_transmission_coef)
+    virtual_cover_transmission_coef = 1 - cover_reflection_coef
+    cover_canopy_transmission_coef = double_layer_cover_transmission_coefficient(virtual_cover_transmission_coef,
+                                                                                 canopy_transmission_coef,
+                                                                                 cover_reflection_coef,
+                                                                                 virtual_canopy_reflection_coef)
+    cover_canopy_reflection_coef = double_layer_cover_reflection_coefficient(virtual_cover_transmission_coef,
+                                                                             cover_reflection_coef,
+                                                                             virtual_canopy_reflection_coef)
+    cover_canopy_floor_transmission_coef = double_layer_cover_transmission_coefficient(
+        cover_canopy_transmission_coef, 1 - properties.floor_reflection_coef, cover_canopy_reflection_coef,
+        properties.floor_reflection_coef)
+    cover_canopy_floor_reflection_coef = double_layer_cover_reflection_coefficient(cover_canopy_transmission_coef,
+                                                                                   cover_canopy_reflection_coef,
+                                                                                   properties.floor_reflection_coef)
+    canopy_absorption_virtual_coef = 1 - cover_canopy_floor_transmission_coef - cover_canopy_floor_reflection_coef
+    floor_absorption_virtual_coef = cover_canopy_floor_transmission_coef
+    canopy_absorbed_virtual = (1 - ratio_GlobAir) * canopy_absorption_virtual_coef * outdoor_band_rad
+    floor_absorbed_virtual = (1 - ratio_GlobAir) * floor_absorption_virtual_coef * outdoor_band_rad
+
+    # Equation 8.36
+    air_absorbed = ratio_GlobAir * outdoor_band_rad * np.where(
+        bands.is_PAR, cover_transmission_coef, canopy_absorption_virtual_coef + floor_absorption_virtual_coef)
+    # Equation 8.37
+    cover_absorbed = (1 - cover_transmission_coef - cover_reflection_coef) * outdoor_band_rad
+
+    return SpectralAbsorption(cover=cover_absorbed,
+                              air=air_absorbed,
+                              canopy=np.where(bands.is_PAR, canopy_absorbed_extinction, canopy_absorbed_virtual),
+                              floor=np.where(bands.is_PAR, floor_absorbed_extinction, floor_absorbed_virtual))
+
+
+def spectral_lamp_absorption(states: ClimateStates, setpoints: Setpoints,
+                             bands: SpectralBands = DEFAULT_BANDS, properties: SpectralProperties = None,
+                             lamp_spectrum: np.ndarray = None):
+    """
+    Equations A17 - A23 [2] for all bands at once
+    The PAR and NIR output both scale with the electrical input of the lamps, as in Equations A20 and A22 [2]
+    Args:
+        lamp_spectrum: the conversion rate from electrical input to the output of each band [J J^-1]
+
+    Returns: SpectralAbsorption of the lamp radiation [W m^-2], the band axis is the last axis
+    """
+    if properties is None:
+        properties = default_spectral_properties(bands)
+    if lamp_spectrum is None:
+        lamp_spectrum = default_lamp_spectrum(bands)
+    leaf_area_index = np.asarray(states.leaf_area_index)[..., np.newaxis]
+    lamp_rad = np.asarray(lamp_electrical_input(setpoints))[..., np.newaxis] * lamp_spectrum
+    canopy_transmission_coef = np.exp(-properties.canopy_extinction_coef * leaf_area_index)
+
+    canopy_absorbed_down = lamp_rad * (1 - properties.canopy_reflection_coef) * (1 - canopy_transmission_coef)
+    canopy_absorbed_up = lamp_rad * canopy_transmission_coef * properties.floor_reflection_coef \
+        * (1 - properties.canopy_reflection_coef) \
+        * (1 - np.exp(-properties.floor_extinction_coef * leaf_area_index))
+    canopy_absorbed = canopy_absorbed_down + np.where(bands.is_PAR, canopy_absorbed_up, 0)
+    floor_absorbed = (1 - properties.floor_reflection_coef) * canopy_transmission_coef * lamp_rad
+    return SpectralAbsorption(cover=np.zeros_like(lamp_rad),
+                              air=lamp_rad - canopy_absorbed - floor_absorbed,
+                              canopy=canopy_absorbed,
+                              floor=floor_absorbed)
+
+
+def spectral_PAR_photons(absorbed: np.ndarray, bands: SpectralBands = DEFAULT_BANDS):
+    """
+    The spectral counterpart of canopy_total_PAR_absorbed (Equation 17 [2])
+    Args:
+        absorbed: the absorbed radiation of each band [W m^-2]
+
+    Returns: the absorbed PAR photons [µmol{photons} m^{-2} s^{-1}]
+    """
+    return np.sum(absorbed * np.where(bands.is_PAR, bands.photons_per_joule, 0), axis=-1)
+
+
+def lumped_shortwave_absorption(states: ClimateStates, setpoints: Setpoints, weather: Weather) -> ShortwaveAbsorption:
+    """
+    The sun and lamp radiation absorbed by the greenhouse objects in the two-band model (sections 8.6.1 and A [2])
+    Returns: ShortwaveAbsorption [W m^-2]
+    """
+    return ShortwaveAbsorption(radiation_flux_PAR_SunCanopy=canopy_PAR_absorbed_from_sun(states, setpoints, weather),
+                               radiation_flux_NIR_SunCanopy=canopy_NIR_absorbed_from_sun(states, setpoints, weather),
+                               radiation_flux_PAR_SunFlr=floor_PAR_absorbed(states, setpoints, weather),
+                               radiation_flux_NIR_SunFlr=floor_NIR_absorbed(states, setpoints, weather),
+                               radiation_flux_Glob_SunAir=construction_elements_global_radiation(states, setpoints,
+                                                                                                 weather),
+                               radiation_flux_Glob_SunCov_e=cover_global_radiation(setpoints, weather),
+                               radiation_flux_PAR_LampCanopy=canopy_PAR_absorbed_from_lamp(states, setpoints),
+                               radiation_flux_NIR_LampCanopy=canopy_NIR_absorbed_from_lamp(states, setpoints),
+                               radiation_flux_PAR_LampFlr=floor_PAR_absorbed_from_lamp(states, setpoints),
+                               radiation_flux_NIR_LampFlr=floor_NIR_absorbed_from_lamp(states, setpoints),
+                               radiation_flux_LampAir=lamp_radiation(states, setpoints))
+
+
+def spectral_shortwave_absorption(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                  bands: SpectralBands = DEFAULT_BANDS, properties: SpectralProperties = None,
+                                  lamp_spectrum: np.ndarray = None) -> ShortwaveAbsorption:
+    """
+    The band sums of spectral_sun_absorption and spectral_lamp_absorption
+    With the default bands, properties and lamp spectrum the result equals lumped_shortwave_absorption
+    Returns: ShortwaveAbsorption [W m^-2]
+    """
+    if properties is None:
+        properties = default_spectral_properties(bands)
+    sun = spectral_sun_absorption(states, setpoints, weather, bands, properties)
+    lamp = spectral_lamp_absorption(states, setpoints, bands, properties, lamp_spectrum)
+    is_PAR = bands.is_PAR
+    return ShortwaveAbsorption(radiation_flux_PAR_SunCanopy=np.sum(sun.canopy, axis=-1, where=is_PAR),
+                               radiation_flux_NIR_SunCanopy=np.sum(sun.canopy, axis=-1, where=~is_PAR),
+                               radiation_flux_PAR_SunFlr=np.sum(sun.floor, axis=-1, where=is_PAR),
+                               radiation_flux_NIR_SunFlr=np.sum(sun.floor, axis=-1, where=~is_PAR),
+                               radiation_flux_Glob_SunAir=np.sum(sun.air, axis=-1),
+                               radiation_flux_Glob_SunCov_e=np.sum(sun.cover, axis=-1),
+                               radiation_flux_PAR_LampCanopy=np.sum(lamp.canopy, axis=-1, where=is_PAR),
+                               radiation_flux_NIR_LampCanopy=np.sum(lamp.canopy, axis=-1, where=~is_PAR),
+                               radiation_flux_PAR_LampFlr=np.sum(lamp.floor, axis=-1, where=is_PAR),
+                               radiation_flux_NIR_LampFlr=np.sum(lamp.floor, axis=-1, where=~is_PAR),
+                               radiation_flux_LampAir=np.sum(lamp.air, axis=-1))
+
+
+def shortwave_absorption(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                         spectral: bool = False) -> ShortwaveAbsorption:
+    """
+    Args:
+        spectral: evaluate the multi-band spectral mode with its default bands instead of the lumped two-band model
+
+    Returns: ShortwaveAbsorption of the selected radiation mode [W m^-2]
+    """
+    if spectral:
+        return spectral_shortwave_absorption(states, setpoints, weather)
+    return lumped_shortwave_absorption(states, setpoints, weather)
@@ -13,17 +13,34 @@ The state variables of the model are all described by differential equations.
 - vapor_pressure_AboveThScr: The vapor pressure of the compartment above the thermal screen
 - air_CO2: Greenhouse air CO2
 - top_CO2: The CO2 of the compartment above the thermal screen
+
+The air, vapor and CO2 balances accept the AirExchange of the current evaluation (see air_exchange_rates),
+so the ventilation rates are computed once per right-hand side evaluation and can be reported as diagnostics.
+In the same way the vapor balances and the screen and cover energy balances accept the Condensation of the current
+evaluation (see condensation_fluxes), so the condensation on all cold surfaces is computed in one pass. Without one,
+a balance only computes the condensation on the surfaces it uses.
+The canopy, floor, air, external cover and lamp energy balances accept the ShortwaveAbsorption of the current
+evaluation (see climate.spectral_radiation), which selects the lumped or the spectral radiation mode.
+While a FluxLedger is active (see climate.ledger), every balance records its named fluxes.
 """
+import numpy as np
+
+from crop_model import CropClimateCoupling
 from .CO2_fluxes import *
 from .electrical_input import inter_lamp_electrical_input
 from .heat_fluxes import *
+from .ledger import active_ledger
 from .capacities import *
 from .radiation_fluxes import *
 from .vapor_fluxes import *
-from .utils import air_density
+from .parameters import model_parameters
+from .spectral_radiation import ShortwaveAbsorption, lumped_shortwave_absorption
+from .soil_column import SoilColumn, default_soil_column, soil_column_derivatives
+from .utils import air_exchange_rates, AirExchange
 
 
-def canopy_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def canopy_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                       shortwave: ShortwaveAbsorption = None):
     """
     Equation 2.1 / 8.1 [W m-2]
     cap_canopy * t_Canopy = radiation_flux_PAR_SunCanopy + radiation_flux_NIR_SunCanopy + radiation_flux_PipeCanopy
@@ -34,9 +51,11 @@ def canopy_temperature(setpoints: Setpoints, states: ClimateStates, weather: Wea
                     + radiation_flux_GroPipeCanopy
     :return: The canopy temperature
     """
+    if shortwave is None:
+        shortwave = lumped_shortwave_absorption(states, setpoints, weather)
     cap_canopy = canopy_heat_capacity(states)
-    radiation_flux_PAR_SunCanopy = canopy_PAR_absorbed_from_sun(states, setpoints, weather)
-    radiation_flux_NIR_SunCanopy = canopy_NIR_absorbed_from_sun(states, setpoints, weather)
+    radiation_flux_PAR_SunCanopy = shortwave.radiation_flux_PAR_SunCanopy
+    radiation_flux_NIR_SunCanopy = shortwave.radiation_flux_NIR_SunCanopy
     radiation_flux_PipeCanopy = FIR_from_pipe_to_canopy(states)
     radiation_flux_CanopyCov_in = FIR_from_canopy_to_internal_cover(states, setpoints)
     radiation_flux_CanopyFlr = FIR_from_canopy_to_floor(states)
@@ -46,22 +65,46 @@ def canopy_temperature(setpoints: Setpoints, states: ClimateStates, weather: Wea
     latent_heat_flux_CanopyAir = latent_heat_flux_between_canopy_and_air(states, setpoints, weather)
 
     radiation_flux_CanopyBlScr = FIR_from_canopy_to_blackout_screen(states, setpoints)
-    radiation_flux_PAR_LampCanopy = canopy_PAR_absorbed_from_lamp(states, setpoints)
-    radiation_flux_NIR_LampCanopy = canopy_NIR_absorbed_from_lamp(states, setpoints)
+    radiation_flux_PAR_LampCanopy = shortwave.radiation_flux_PAR_LampCanopy
+    radiation_flux_NIR_LampCanopy = shortwave.radiation_flux_NIR_LampCanopy
     radiation_flux_FIR_LampCanopy = FIR_from_lamp_to_canopy(states)
     radiation_flux_PAR_IntLampCanopy = canopy_PAR_absorbed_from_inter_lamp(setpoints)
     radiation_flux_NIR_IntLampCanopy = canopy_NIR_absorbed_from_inter_lamp(setpoints)
     radiation_flux_FIR_IntLampCanopy = FIR_from_inter_lamp_to_canopy(states)
     radiation_flux_GroPipeCanopy = FIR_from_grow_pipe_to_canopy(states)
-    return (radiation_flux_PAR_SunCanopy + radiation_flux_NIR_SunCanopy + radiation_flux_PipeCanopy
-            - radiation_flux_CanopyCov_in - radiation_flux_CanopyFlr - radiation_flux_CanopySky - radiation_flux_CanopyThScr
-            - sensible_heat_flux_CanopyAir - latent_heat_flux_CanopyAir - radiation_flux_CanopyBlScr
-            + radiation_flux_PAR_LampCanopy + radiation_flux_NIR_LampCanopy + radiation_flux_FIR_LampCanopy
-            + radiation_flux_PAR_IntLampCanopy + radiation_flux_NIR_IntLampCanopy + radiation_flux_FIR_IntLampCanopy
-            + radiation_flux_GroPipeCanopy) / cap_canopy
-
-
-def greenhouse_air_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    derivative = (radiation_flux_PAR_SunCanopy + radiation_flux_NIR_SunCanopy
+                  + radiation_flux_PipeCanopy + radiation_flux_PAR_LampCanopy
+                  + radiation_flux_NIR_LampCanopy + radiation_flux_FIR_LampCanopy
+                  + radiation_flux_PAR_IntLampCanopy + radiation_flux_NIR_IntLampCanopy
+                  + radiation_flux_FIR_IntLampCanopy + radiation_flux_GroPipeCanopy
+                  - radiation_flux_CanopyCov_in - radiation_flux_CanopyFlr - radiation_flux_CanopySky
+                  - radiation_flux_CanopyThScr - sensible_heat_flux_CanopyAir
+                  - latent_heat_flux_CanopyAir - radiation_flux_CanopyBlScr) / cap_canopy
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Canopy', cap_canopy,
+                              gains=dict(radiation_flux_PAR_SunCanopy=radiation_flux_PAR_SunCanopy,
+                                         radiation_flux_NIR_SunCanopy=radiation_flux_NIR_SunCanopy,
+                                         radiation_flux_PipeCanopy=radiation_flux_PipeCanopy,
+                                         radiation_flux_PAR_LampCanopy=radiation_flux_PAR_LampCanopy,
+                                         radiation_flux_NIR_LampCanopy=radiation_flux_NIR_LampCanopy,
+                                         radiation_flux_FIR_LampCanopy=radiation_flux_FIR_LampCanopy,
+                                         radiation_flux_PAR_IntLampCanopy=radiation_flux_PAR_IntLampCanopy,
+                                         radiation_flux_NIR_IntLampCanopy=radiation_flux_NIR_IntLampCanopy,
+                                         radiation_flux_FIR_IntLampCanopy=radiation_flux_FIR_IntLampCanopy,
+                                         radiation_flux_GroPipeCanopy=radiation_flux_GroPipeCanopy),
+                              losses=dict(radiation_flux_CanopyCov_in=radiation_flux_CanopyCov_in,
+                                          radiation_flux_CanopyFlr=radiation_flux_CanopyFlr,
+                                          radiation_flux_CanopySky=radiation_flux_CanopySky,
+                                          radiation_flux_CanopyThScr=radiation_flux_CanopyThScr,
+                                          sensible_heat_flux_CanopyAir=sensible_heat_flux_CanopyAir,
+                                          latent_heat_flux_CanopyAir=latent_heat_flux_CanopyAir,
+                                          radiation_flux_CanopyBlScr=radiation_flux_CanopyBlScr))
+    return derivative
+
+
+def greenhouse_air_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                               air_exchange: AirExchange = None, shortwave: ShortwaveAbsorption = None):
     """
     Equation 2.2 / 8.2 [W m-2]
     cap_Air * t_Air = sensible_heat_flux_CanopyAir + sensible_heat_flux_MechAir
@@ -72,11 +115,13 @@ def greenhouse_air_temperature(setpoints: Setpoints, states: ClimateStates, weat
                     + radiation_flux_LampAir + sensible_heat_flux_IntLampAir + sensible_heat_flux_GroPipeAir
     :return: The greenhouse air temperature
     """
-    air_height = coefs.Construction.air_height
-    density_air = air_density()
-    cap_Air = remaining_object_heat_capacity(air_height, density_air, C_PAIR)
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    if shortwave is None:
+        shortwave = lumped_shortwave_absorption(states, setpoints, weather)
+    cap_Air = model_parameters().cap_Air
 
-    radiation_flux_Glob_SunAir = construction_elements_global_radiation(states, setpoints, weather)
+    radiation_flux_Glob_SunAir = shortwave.radiation_flux_Glob_SunAir
     sensible_heat_flux_CanopyAir = sensible_heat_flux_between_canopy_and_air(states)
     sensible_heat_flux_MechAir = sensible_heat_flux_between_mechanical_cooling_and_greenhouse_air(setpoints, states)
     sensible_heat_flux_PipeAir = sensible_heat_flux_between_heating_pipe_and_greenhouse_air(states)
@@ -84,25 +129,48 @@ def greenhouse_air_temperature(setpoints: Setpoints, states: ClimateStates, weat
     sensible_heat_flux_BlowAir = sensible_heat_flux_between_direct_air_heater_and_greenhouse_air(setpoints)
     sensible_heat_flux_AirFlr = sensible_heat_flux_between_floor_and_greenhouse_air(states)
     sensible_heat_flux_AirThScr = sensible_heat_flux_between_thermal_screen_and_greenhouse_air(states, setpoints)
-    sensible_heat_flux_AirOut = sensible_heat_flux_between_outdoor_and_greenhouse_air(states, setpoints, weather)
-    sensible_heat_flux_AirTop = sensible_heat_flux_between_above_thermal_screen_and_greenhouse_air(states, setpoints, weather)
+    sensible_heat_flux_AirOut = sensible_heat_flux_between_outdoor_and_greenhouse_air(states, setpoints, weather,
+                                                                                      air_exchange)
+    sensible_heat_flux_AirTop = sensible_heat_flux_between_above_thermal_screen_and_greenhouse_air(states, setpoints, weather,
+                                                                                                   air_exchange)
     latent_heat_flux_AirFog = latent_heat_flux_between_fogging_and_greenhouse_air(setpoints)
 
     sensible_heat_flux_AirBlScr = sensible_heat_flux_between_greenhouse_air_and_blackout_screen(states, setpoints)
     sensible_heat_flux_LampAir = sensible_heat_flux_between_lamps_and_greenhouse_air(states)
-    radiation_flux_LampAir = lamp_radiation(states, setpoints)
+    radiation_flux_LampAir = shortwave.radiation_flux_LampAir
     sensible_heat_flux_IntLampAir = sensible_heat_flux_between_inter_lamp_and_greenhouse_air(states)
     sensible_heat_flux_GroPipeAir = sensible_heat_flux_between_grow_pipe_and_greenhouse_air(states)
 
-    return (sensible_heat_flux_CanopyAir + sensible_heat_flux_MechAir
-            + sensible_heat_flux_PipeAir + sensible_heat_flux_PasAir + sensible_heat_flux_BlowAir
-            + radiation_flux_Glob_SunAir - sensible_heat_flux_AirFlr - sensible_heat_flux_AirThScr
-            - sensible_heat_flux_AirOut - sensible_heat_flux_AirTop - latent_heat_flux_AirFog
-            - sensible_heat_flux_AirBlScr + sensible_heat_flux_LampAir + radiation_flux_LampAir
-            + sensible_heat_flux_IntLampAir + sensible_heat_flux_GroPipeAir) / cap_Air
-
-
-def floor_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    derivative = (sensible_heat_flux_CanopyAir + sensible_heat_flux_MechAir + sensible_heat_flux_PipeAir
+                  + sensible_heat_flux_PasAir + sensible_heat_flux_BlowAir + radiation_flux_Glob_SunAir
+                  + sensible_heat_flux_LampAir + radiation_flux_LampAir + sensible_heat_flux_IntLampAir
+                  + sensible_heat_flux_GroPipeAir - sensible_heat_flux_AirFlr
+                  - sensible_heat_flux_AirThScr - sensible_heat_flux_AirOut - sensible_heat_flux_AirTop
+                  - latent_heat_flux_AirFog - sensible_heat_flux_AirBlScr) / cap_Air
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Air', cap_Air,
+                              gains=dict(sensible_heat_flux_CanopyAir=sensible_heat_flux_CanopyAir,
+                                         sensible_heat_flux_MechAir=sensible_heat_flux_MechAir,
+                                         sensible_heat_flux_PipeAir=sensible_heat_flux_PipeAir,
+                                         sensible_heat_flux_PasAir=sensible_heat_flux_PasAir,
+                                         sensible_heat_flux_BlowAir=sensible_heat_flux_BlowAir,
+                                         radiation_flux_Glob_SunAir=radiation_flux_Glob_SunAir,
+                                         sensible_heat_flux_LampAir=sensible_heat_flux_LampAir,
+                                         radiation_flux_LampAir=radiation_flux_LampAir,
+                                         sensible_heat_flux_IntLampAir=sensible_heat_flux_IntLampAir,
+                                         sensible_heat_flux_GroPipeAir=sensible_heat_flux_GroPipeAir),
+                              losses=dict(sensible_heat_flux_AirFlr=sensible_heat_flux_AirFlr,
+                                          sensible_heat_flux_AirThScr=sensible_heat_flux_AirThScr,
+                                          sensible_heat_flux_AirOut=sensible_heat_flux_AirOut,
+                                          sensible_heat_flux_AirTop=sensible_heat_flux_AirTop,
+                                          latent_heat_flux_AirFog=latent_heat_flux_AirFog,
+                                          sensible_heat_flux_AirBlScr=sensible_heat_flux_AirBlScr))
+    return derivative
+
+
+def floor_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                      shortwave: ShortwaveAbsorption = None):
     """
     Equation 2.3 / 8.3 [W m-2]
     cap_Flr * t_Floor = sensible_heat_flux_AirFlr + radiation_flux_PAR_SunFlr + radiation_flux_NIR_SunFlr
@@ -110,14 +178,13 @@ def floor_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weat
                       - radiation_flux_FlrCov_in - radiation_flux_FlrSky - radiation_flux_FlrThScr
     :return: The floor temperature
     """
-    floor_thickness = coefs.Floor.floor_thickness
-    floor_density = coefs.Floor.floor_density
-    c_pFlr = coefs.Floor.c_pFlr
-    cap_Flr = remaining_object_heat_capacity(floor_thickness, floor_density, c_pFlr)
+    if shortwave is None:
+        shortwave = lumped_shortwave_absorption(states, setpoints, weather)
+    cap_Flr = model_parameters().cap_Flr
 
     sensible_heat_flux_AirFlr = sensible_heat_flux_between_floor_and_greenhouse_air(states)
-    radiation_flux_PAR_SunFlr = floor_PAR_absorbed(states, setpoints, weather)
-    radiation_flux_NIR_SunFlr = floor_NIR_absorbed(states, setpoints, weather)
+    radiation_flux_PAR_SunFlr = shortwave.radiation_flux_PAR_SunFlr
+    radiation_flux_NIR_SunFlr = shortwave.radiation_flux_NIR_SunFlr
     radiation_flux_CanopyFlr = FIR_from_canopy_to_floor(states)
     radiation_flux_PipeFlr = FIR_from_heating_pipe_to_floor(states)
     radiation_flux_FlrCov_in = FIR_from_floor_to_internal_cover(states, setpoints)
@@ -126,42 +193,78 @@ def floor_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weat
     sensible_heat_flux_FlrSo1 = sensible_heat_flux_between_floor_and_first_layer_soil(states)
 
     radiation_flux_FlrBlScr = FIR_from_floor_to_blackout_screen(states, setpoints)
-    radiation_flux_PAR_LampFlr = floor_PAR_absorbed_from_lamp(states, setpoints)
-    radiation_flux_NIR_LampFlr = floor_NIR_absorbed_from_lamp(states, setpoints)
+    radiation_flux_PAR_LampFlr = shortwave.radiation_flux_PAR_LampFlr
+    radiation_flux_NIR_LampFlr = shortwave.radiation_flux_NIR_LampFlr
     radiation_flux_FIR_LampFlr = FIR_from_lamp_to_floor(states)
 
-    return (sensible_heat_flux_AirFlr + radiation_flux_PAR_SunFlr + radiation_flux_NIR_SunFlr
-            + radiation_flux_CanopyFlr + radiation_flux_PipeFlr - sensible_heat_flux_FlrSo1
-            - radiation_flux_FlrCov_in - radiation_flux_FlrSky - radiation_flux_FlrThScr
-            - radiation_flux_FlrBlScr
-            + radiation_flux_PAR_LampFlr + radiation_flux_NIR_LampFlr + radiation_flux_FIR_LampFlr) / cap_Flr
-
-
-def soil_temperature(j: int, states: ClimateStates, weather: Weather):  # j = 1,2,..,5
+    derivative = (sensible_heat_flux_AirFlr + radiation_flux_PAR_SunFlr + radiation_flux_NIR_SunFlr
+                  + radiation_flux_CanopyFlr + radiation_flux_PipeFlr + radiation_flux_PAR_LampFlr
+                  + radiation_flux_NIR_LampFlr + radiation_flux_FIR_LampFlr - sensible_heat_flux_FlrSo1
+                  - radiation_flux_FlrCov_in - radiation_flux_FlrSky - radiation_flux_FlrThScr
+                  - radiation_flux_FlrBlScr) / cap_Flr
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Floor', cap_Flr,
+                              gains=dict(sensible_heat_flux_AirFlr=sensible_heat_flux_AirFlr,
+                                         radiation_flux_PAR_SunFlr=radiation_flux_PAR_SunFlr,
+                                         radiation_flux_NIR_SunFlr=radiation_flux_NIR_SunFlr,
+                                         radiation_flux_CanopyFlr=radiation_flux_CanopyFlr,
+                                         radiation_flux_PipeFlr=radiation_flux_PipeFlr,
+                                         radiation_flux_PAR_LampFlr=radiation_flux_PAR_LampFlr,
+                                         radiation_flux_NIR_LampFlr=radiation_flux_NIR_LampFlr,
+                                         radiation_flux_FIR_LampFlr=radiation_flux_FIR_LampFlr),
+                              losses=dict(sensible_heat_flux_FlrSo1=sensible_heat_flux_FlrSo1,
+                                          radiation_flux_FlrCov_in=radiation_flux_FlrCov_in,
+                                          radiation_flux_FlrSky=radiation_flux_FlrSky,
+                                          radiation_flux_FlrThScr=radiation_flux_FlrThScr,
+                                          radiation_flux_FlrBlScr=radiation_flux_FlrBlScr))
+    return derivative
+
+
+def soil_temperature(j: int, states: ClimateStates, weather: Weather):  # j = 1,2,..,n_layers
     """
     Equation 2.4 / 8.4 [W m-2]
     cap_soil_j * t_Soil = sensible_heat_flux_soil_j_minus_soil_j - sensible_heat_flux_soil_j_soil_j_plus
-    0 is Floor, 6 is SoOut
+    0 is Floor, n_layers + 1 is SoOut, n_layers is the number of layers of the active design
     :return: The soil temperature
     """
-
-    h_soil_j_minus = coefs.Floor.floor_thickness if j == 1 else coefs.Soil.soil_thicknesses[j - 2]
-    h_soil_j = coefs.Soil.soil_thicknesses[j - 1]
-    h_soil_j_plus = 1.28 if j == 5 else coefs.Soil.soil_thicknesses[j]  # Assumed by GreenLight's authors, line 83, setGlParams
-    cap_soil_j = h_soil_j * coefs.Soil.rho_c_p_So
-    soil_heat_conductivity = coefs.Soil.soil_heat_conductivity
-    HEC_soil_j_minus_soil_j = 2 * soil_heat_conductivity / (h_soil_j_minus + h_soil_j)
-    HEC_soil_j_soil_j_plus = 2 * soil_heat_conductivity / (h_soil_j + h_soil_j_plus)
-    soil_j_minus_t = states.t_Floor if j == 1 else states.t_Soil[j - 2]
-    soil_j_t = states.t_Soil[j - 1]
-    soil_j_plus_t = weather.t_Soil_Out if j == 5 else states.t_Soil[j]
+    parameters = model_parameters()
+    n_layers = len(parameters.cap_Soil)
+    if np.shape(states.t_Soil)[-1:] != (n_layers,):
+        raise ValueError(f'The soil column of the active design has {n_layers} layers, '
+                         f't_Soil has the shape {np.shape(states.t_Soil)}')
+    cap_soil_j = parameters.cap_Soil[j - 1]
+    HEC_soil_j_minus_soil_j = parameters.HEC_Soil[j - 1]
+    HEC_soil_j_soil_j_plus = parameters.HEC_Soil[j]
+    soil_j_minus_t = states.t_Floor if j == 1 else np.asarray(states.t_Soil)[..., j - 2]
+    soil_j_t = np.asarray(states.t_Soil)[..., j - 1]
+    soil_j_plus_t = weather.t_Soil_Out if j == n_layers else np.asarray(states.t_Soil)[..., j]
 
     sensible_heat_flux_soil_j_minus_soil_j = convective_and_conductive_heat_fluxes(HEC_soil_j_minus_soil_j, soil_j_minus_t, soil_j_t)
     sensible_heat_flux_soil_j_soil_j_plus = convective_and_conductive_heat_fluxes(HEC_soil_j_soil_j_plus, soil_j_t, soil_j_plus_t)
-    return (sensible_heat_flux_soil_j_minus_soil_j - sensible_heat_flux_soil_j_soil_j_plus) / cap_soil_j
+    derivative = (sensible_heat_flux_soil_j_minus_soil_j - sensible_heat_flux_soil_j_soil_j_plus) / cap_soil_j
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance(f't_Soil_{j}', cap_soil_j,
+                              gains=dict(sensible_heat_flux_soil_j_minus_soil_j=sensible_heat_flux_soil_j_minus_soil_j),
+                              losses=dict(sensible_heat_flux_soil_j_soil_j_plus=sensible_heat_flux_soil_j_soil_j_plus))
+    return derivative
+
+
+def soil_temperatures(states: ClimateStates, weather: Weather, column: SoilColumn = None):
+    """
+    Equation 2.4 / 8.4 for all soil layers at once, see climate.soil_column
+    With the default column the result equals soil_temperature(j, states, weather) for j = 1,2,..,n_layers
+    The column can have any number of layers, states.t_Soil has one entry per layer
+    :return: The soil temperatures of all layers
+    """
+    if column is None:
+        column = default_soil_column()
+    return soil_column_derivatives(column, states.t_Soil, states.t_Floor, weather.t_Soil_Out)
 
 
-def thermal_screen_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def thermal_screen_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                               condensation: Condensation = None):
     """
     Equation 2.5 / 8.5 [W m-2]
     cap_ThScr * t_ThScr = sensible_heat_flux_AirThScr + latent_heat_flux_AirThScr + radiation_flux_CanopyThScr
@@ -170,13 +273,12 @@ def thermal_screen_temperature(setpoints: Setpoints, states: ClimateStates, weat
                                   + radiation_flux_LampThScr
     :return: The thermal screen temperature
     """
-    thScr_thickness = coefs.Thermalscreen.thScr_thickness
-    thScr_density = coefs.Thermalscreen.thScr_density
-    c_pThScr = coefs.Thermalscreen.c_pThScr
-    cap_ThScr = remaining_object_heat_capacity(thScr_thickness, thScr_density, c_pThScr)
+    if condensation is None:
+        condensation = condensation_fluxes(setpoints, states, ('ThScr',))
+    cap_ThScr = model_parameters().cap_ThScr
 
     sensible_heat_flux_AirThScr = sensible_heat_flux_between_thermal_screen_and_greenhouse_air(states, setpoints)
-    latent_heat_flux_AirThScr = latent_heat_flux_between_greenhouse_air_and_thermal_screen(states, setpoints)
+    latent_heat_flux_AirThScr = condensation.latent_heat_flux_AirThScr
     radiation_flux_CanopyThScr = FIR_from_canopy_to_thermal_screen(states, setpoints)
     radiation_flux_FlrThScr = FIR_from_floor_to_thermal_screen(states, setpoints)
     radiation_flux_PipeThScr = FIR_from_heating_pipe_to_thermal_screen(states, setpoints)
@@ -186,13 +288,28 @@ def thermal_screen_temperature(setpoints: Setpoints, states: ClimateStates, weat
 
     radiation_flux_BlScrThScr = FIR_from_blackout_screen_to_thermal_screen(states, setpoints)
     radiation_flux_LampThScr = FIR_from_lamp_to_thermal_screen(states, setpoints)
-    return (sensible_heat_flux_AirThScr + latent_heat_flux_AirThScr + radiation_flux_CanopyThScr
-            + radiation_flux_FlrThScr + radiation_flux_PipeThScr - sensible_heat_flux_ThScrTop
-            - radiation_flux_ThScrCov_in - radiation_flux_ThScrSky + radiation_flux_BlScrThScr
-            + radiation_flux_LampThScr) / cap_ThScr
-
-
-def top_compartment_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    derivative = (sensible_heat_flux_AirThScr + latent_heat_flux_AirThScr + radiation_flux_CanopyThScr
+                  + radiation_flux_FlrThScr + radiation_flux_PipeThScr + radiation_flux_BlScrThScr
+                  + radiation_flux_LampThScr - sensible_heat_flux_ThScrTop - radiation_flux_ThScrCov_in
+                  - radiation_flux_ThScrSky) / cap_ThScr
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_ThScr', cap_ThScr,
+                              gains=dict(sensible_heat_flux_AirThScr=sensible_heat_flux_AirThScr,
+                                         latent_heat_flux_AirThScr=latent_heat_flux_AirThScr,
+                                         radiation_flux_CanopyThScr=radiation_flux_CanopyThScr,
+                                         radiation_flux_FlrThScr=radiation_flux_FlrThScr,
+                                         radiation_flux_PipeThScr=radiation_flux_PipeThScr,
+                                         radiation_flux_BlScrThScr=radiation_flux_BlScrThScr,
+                                         radiation_flux_LampThScr=radiation_flux_LampThScr),
+                              losses=dict(sensible_heat_flux_ThScrTop=sensible_heat_flux_ThScrTop,
+                                          radiation_flux_ThScrCov_in=radiation_flux_ThScrCov_in,
+                                          radiation_flux_ThScrSky=radiation_flux_ThScrSky))
+    return derivative
+
+
+def top_compartment_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                air_exchange: AirExchange = None):
     """
     Equation 2.6 / 8.6 [W m-2]
     cap_Top * above_thermal_screen_t = sensible_heat_flux_ThScrTop + sensible_heat_flux_AirTop − sensible_heat_flux_TopCov_in
@@ -200,23 +317,33 @@ def top_compartment_temperature(setpoints: Setpoints, states: ClimateStates, wea
     TODO: need to recheck if top compartment params are the same with air params
     :return: The above thermal screen air temperature
     """
-    h_Top = coefs.Construction.greenhouse_height - coefs.Construction.air_height
-    elevation_height = coefs.Construction.elevation_height
-    pressure = 101325 * (1 - 2.5577e-5 * elevation_height) ** 5.25588
-    density_Top = M_AIR * pressure / ((states.t_AboveThScr + 273.15) * M_GAS)  # Note: line 704 / setGlAux / GreenLight
-    c_pTop = C_PAIR
-    cap_Top = remaining_object_heat_capacity(h_Top, density_Top, c_pTop)
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    parameters = model_parameters()
+    # The density of the top compartment air varies with its temperature, line 704 / setGlAux / GreenLight
+    cap_Top = parameters.cap_Top_kelvin / (states.t_AboveThScr + 273.15)
 
     sensible_heat_flux_ThScrTop = sensible_heat_flux_between_thermal_screen_and_above_thermal_screen(states, setpoints)
-    sensible_heat_flux_AirTop = sensible_heat_flux_between_above_thermal_screen_and_greenhouse_air(states, setpoints, weather)
+    sensible_heat_flux_AirTop = sensible_heat_flux_between_above_thermal_screen_and_greenhouse_air(states, setpoints, weather,
+                                                                                                   air_exchange)
     sensible_heat_flux_TopCov_in = sensible_heat_flux_between_above_thermal_screen_and_internal_cover(states)
-    sensible_heat_flux_TopOut = sensible_heat_flux_between_above_thermal_screen_and_outdoor(states, setpoints, weather)
+    sensible_heat_flux_TopOut = sensible_heat_flux_between_above_thermal_screen_and_outdoor(states, setpoints, weather,
+                                                                                            air_exchange)
     sensible_heat_flux_BlScrTop = sensible_heat_flux_between_above_thermal_screen_and_blackout_screen(states, setpoints)
-    return (sensible_heat_flux_ThScrTop + sensible_heat_flux_AirTop
-            - sensible_heat_flux_TopCov_in - sensible_heat_flux_TopOut + sensible_heat_flux_BlScrTop) / cap_Top
+    derivative = (sensible_heat_flux_ThScrTop + sensible_heat_flux_AirTop + sensible_heat_flux_BlScrTop
+                  - sensible_heat_flux_TopCov_in - sensible_heat_flux_TopOut) / cap_Top
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_AboveThScr', cap_Top,
+                              gains=dict(sensible_heat_flux_ThScrTop=sensible_heat_flux_ThScrTop,
+                                         sensible_heat_flux_AirTop=sensible_heat_flux_AirTop,
+                                         sensible_heat_flux_BlScrTop=sensible_heat_flux_BlScrTop),
+                              losses=dict(sensible_heat_flux_TopCov_in=sensible_heat_flux_TopCov_in,
+                                          sensible_heat_flux_TopOut=sensible_heat_flux_TopOut))
+    return derivative
 
 
-def internal_cover_temperature(setpoints: Setpoints, states: ClimateStates):
+def internal_cover_temperature(setpoints: Setpoints, states: ClimateStates, condensation: Condensation = None):
     """
     Equation 2.7 / 8.7 [W m-2]
     cap_Cov_in * t_Cov_internal = sensible_heat_flux_TopCov_in + latent_heat_flux_TopCov_in + radiation_flux_CanopyCov_in
@@ -224,11 +351,12 @@ def internal_cover_temperature(setpoints: Setpoints, states: ClimateStates):
                               - sensible_heat_flux_Cov_in_Cov_e + radiation_flux_BlScrCov_in + radiation_flux_LampCov_in
     :return: The internal cover temperature
     """
-    cap_Cov = lumped_cover_heat_capacity()
-    cap_Cov_in = internal_external_canopy_heat_capacity(cap_Cov)
+    if condensation is None:
+        condensation = condensation_fluxes(setpoints, states, ('Cov_in',))
+    cap_Cov_in = model_parameters().cap_Cov
 
     sensible_heat_flux_TopCov_in = sensible_heat_flux_between_above_thermal_screen_and_internal_cover(states)
-    latent_heat_flux_TopCov_in = latent_heat_flux_between_above_thermal_screen_and_internal_cover(states)
+    latent_heat_flux_TopCov_in = condensation.latent_heat_flux_TopCov_in
     radiation_flux_CanopyCov_in = FIR_from_canopy_to_internal_cover(states, setpoints)
     radiation_flux_FlrCov_in = FIR_from_floor_to_internal_cover(states, setpoints)
     radiation_flux_PipeCov_in = FIR_from_heating_pipe_to_internal_cover(states, setpoints)
@@ -237,28 +365,52 @@ def internal_cover_temperature(setpoints: Setpoints, states: ClimateStates):
 
     radiation_flux_BlScrCov_in = FIR_from_blackout_screen_to_internal_cover(states, setpoints)
     radiation_flux_LampCov_in = FIR_from_lamp_to_internal_cover(states, setpoints)
-    return (sensible_heat_flux_TopCov_in + latent_heat_flux_TopCov_in + radiation_flux_CanopyCov_in
-            + radiation_flux_FlrCov_in + radiation_flux_PipeCov_in + radiation_flux_ThScrCov_in
-            - sensible_heat_flux_Cov_in_Cov_e + radiation_flux_BlScrCov_in + radiation_flux_LampCov_in) / cap_Cov_in
-
-
-def external_cover_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    derivative = (sensible_heat_flux_TopCov_in + latent_heat_flux_TopCov_in
+                  + radiation_flux_CanopyCov_in + radiation_flux_FlrCov_in + radiation_flux_PipeCov_in
+                  + radiation_flux_ThScrCov_in + radiation_flux_BlScrCov_in
+                  + radiation_flux_LampCov_in - sensible_heat_flux_Cov_in_Cov_e) / cap_Cov_in
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Cov_internal', cap_Cov_in,
+                              gains=dict(sensible_heat_flux_TopCov_in=sensible_heat_flux_TopCov_in,
+                                         latent_heat_flux_TopCov_in=latent_heat_flux_TopCov_in,
+                                         radiation_flux_CanopyCov_in=radiation_flux_CanopyCov_in,
+                                         radiation_flux_FlrCov_in=radiation_flux_FlrCov_in,
+                                         radiation_flux_PipeCov_in=radiation_flux_PipeCov_in,
+                                         radiation_flux_ThScrCov_in=radiation_flux_ThScrCov_in,
+                                         radiation_flux_BlScrCov_in=radiation_flux_BlScrCov_in,
+                                         radiation_flux_LampCov_in=radiation_flux_LampCov_in),
+                              losses=dict(sensible_heat_flux_Cov_in_Cov_e=sensible_heat_flux_Cov_in_Cov_e))
+    return derivative
+
+
+def external_cover_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                               shortwave: ShortwaveAbsorption = None):
     """
     Equation 2.8 / 8.8 [W m-2]
     cap_Cov_e * t_Cov_external =  radiation_flux_Glob_SunCov_e + sensible_heat_flux_Cov_in_Cov_e
                                 - sensible_heat_flux_Cov_e_Out - radiation_flux_Cov_e_Sky
     :return: The external cover temperature
     """
-    cap_Cov = lumped_cover_heat_capacity()
-    cap_Cov_e = internal_external_canopy_heat_capacity(cap_Cov)
+    if shortwave is None:
+        shortwave = lumped_shortwave_absorption(states, setpoints, weather)
+    cap_Cov_e = model_parameters().cap_Cov
 
-    radiation_flux_Glob_SunCov_e = cover_global_radiation(setpoints, weather)
+    radiation_flux_Glob_SunCov_e = shortwave.radiation_flux_Glob_SunCov_e
     sensible_heat_flux_Cov_in_Cov_e = sensible_heat_flux_between_internal_cover_and_external_cover(states)
     sensible_heat_flux_Cov_e_Out = sensible_heat_flux_between_external_cover_and_outdoor(states, weather)
     radiation_flux_Cov_e_Sky = FIR_from_external_cover_to_sky(states, weather)
 
-    return (radiation_flux_Glob_SunCov_e + sensible_heat_flux_Cov_in_Cov_e
-            - sensible_heat_flux_Cov_e_Out - radiation_flux_Cov_e_Sky) / cap_Cov_e
+    derivative = (radiation_flux_Glob_SunCov_e + sensible_heat_flux_Cov_in_Cov_e
+                  - sensible_heat_flux_Cov_e_Out - radiation_flux_Cov_e_Sky) / cap_Cov_e
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Cov_external', cap_Cov_e,
+                              gains=dict(radiation_flux_Glob_SunCov_e=radiation_flux_Glob_SunCov_e,
+                                         sensible_heat_flux_Cov_in_Cov_e=sensible_heat_flux_Cov_in_Cov_e),
+                              losses=dict(sensible_heat_flux_Cov_e_Out=sensible_heat_flux_Cov_e_Out,
+                                          radiation_flux_Cov_e_Sky=radiation_flux_Cov_e_Sky))
+    return derivative
 
 
 def heating_pipe_system_surface_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
@@ -270,7 +422,7 @@ def heating_pipe_system_surface_temperature(setpoints: Setpoints, states: Climat
                        - radiation_flux_PipeBlScr + radiation_flux_LampPipe
     :return: The heating pipe temperature
     """
-    cap_Pipe = heating_pipe_heat_capacity()
+    cap_Pipe = model_parameters().cap_Pipe
 
     U_Boil = setpoints.U_Boil
     heat_cap_Boil = Coefficients.ActiveClimateControl.heat_cap_Boil
@@ -294,13 +446,29 @@ def heating_pipe_system_surface_temperature(setpoints: Setpoints, states: Climat
 
     radiation_flux_PipeBlScr = FIR_from_heating_pipe_to_blackout_screen(states, setpoints)
     radiation_flux_LampPipe = FIR_from_lamp_to_heating_pipe(states)
-    return (sensible_heat_flux_BoilPipe + sensible_heat_flux_IndPipe + sensible_heat_flux_GeoPipe
-            - radiation_flux_PipeSky - radiation_flux_PipeCov_in - radiation_flux_PipeCanopy
-            - radiation_flux_PipeFlr - radiation_flux_PipeThScr - sensible_heat_flux_PipeAir
-            - radiation_flux_PipeBlScr + radiation_flux_LampPipe) / cap_Pipe
-
-
-def blackout_screen_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    derivative = (sensible_heat_flux_BoilPipe + sensible_heat_flux_IndPipe + sensible_heat_flux_GeoPipe
+                  + radiation_flux_LampPipe - radiation_flux_PipeSky - radiation_flux_PipeCov_in
+                  - radiation_flux_PipeCanopy - radiation_flux_PipeFlr - radiation_flux_PipeThScr
+                  - sensible_heat_flux_PipeAir - radiation_flux_PipeBlScr) / cap_Pipe
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Pipe', cap_Pipe,
+                              gains=dict(sensible_heat_flux_BoilPipe=sensible_heat_flux_BoilPipe,
+                                         sensible_heat_flux_IndPipe=sensible_heat_flux_IndPipe,
+                                         sensible_heat_flux_GeoPipe=sensible_heat_flux_GeoPipe,
+                                         radiation_flux_LampPipe=radiation_flux_LampPipe),
+                              losses=dict(radiation_flux_PipeSky=radiation_flux_PipeSky,
+                                          radiation_flux_PipeCov_in=radiation_flux_PipeCov_in,
+                                          radiation_flux_PipeCanopy=radiation_flux_PipeCanopy,
+                                          radiation_flux_PipeFlr=radiation_flux_PipeFlr,
+                                          radiation_flux_PipeThScr=radiation_flux_PipeThScr,
+                                          sensible_heat_flux_PipeAir=sensible_heat_flux_PipeAir,
+                                          radiation_flux_PipeBlScr=radiation_flux_PipeBlScr))
+    return derivative
+
+
+def blackout_screen_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                condensation: Condensation = None):
     """
     Equation 1 [2] [W m-2]
     cap_BlScr * t_BlScr = sensible_heat_flux_AirBlScr + latent_heat_flux_AirBlScr + radiation_flux_CanopyBlScr
@@ -309,11 +477,11 @@ def blackout_screen_temperature(setpoints: Setpoints, states: ClimateStates, wea
                         + radiation_flux_LampBlScr
     Returns: The black screen temperature
     """
-    cap_BlScr = remaining_object_heat_capacity(Coefficients.Blackoutscreen.blScr_thickness,
-                                               Coefficients.Blackoutscreen.blScr_density,
-                                               Coefficients.Blackoutscreen.c_pBlScr)
+    if condensation is None:
+        condensation = condensation_fluxes(setpoints, states, ('BlScr',))
+    cap_BlScr = model_parameters().cap_BlScr
     sensible_heat_flux_AirBlScr = sensible_heat_flux_between_greenhouse_air_and_blackout_screen(states, setpoints)
-    latent_heat_flux_AirBlScr = latent_heat_flux_between_greenhouse_air_and_blackout_screen(states, setpoints)
+    latent_heat_flux_AirBlScr = condensation.latent_heat_flux_AirBlScr
     radiation_flux_CanopyBlScr = FIR_from_canopy_to_blackout_screen(states, setpoints)
     radiation_flux_FlrBlScr = FIR_from_floor_to_blackout_screen(states, setpoints)
     radiation_flux_PipeBlScr = FIR_from_heating_pipe_to_blackout_screen(states, setpoints)
@@ -323,10 +491,24 @@ def blackout_screen_temperature(setpoints: Setpoints, states: ClimateStates, wea
     radiation_flux_BlScrThScr = FIR_from_blackout_screen_to_thermal_screen(states, setpoints)
     radiation_flux_LampBlScr = FIR_from_lamp_to_blackout_screen(states, setpoints)
 
-    return (sensible_heat_flux_AirBlScr + latent_heat_flux_AirBlScr + radiation_flux_CanopyBlScr
-            + radiation_flux_FlrBlScr + radiation_flux_PipeBlScr - sensible_heat_flux_BlScrTop
-            - radiation_flux_BlScrCov_in - radiation_flux_BlScrSky - radiation_flux_BlScrThScr
-            + radiation_flux_LampBlScr)/cap_BlScr
+    derivative = (sensible_heat_flux_AirBlScr + latent_heat_flux_AirBlScr + radiation_flux_CanopyBlScr
+                  + radiation_flux_FlrBlScr + radiation_flux_PipeBlScr + radiation_flux_LampBlScr
+                  - sensible_heat_flux_BlScrTop - radiation_flux_BlScrCov_in - radiation_flux_BlScrSky
+                  - radiation_flux_BlScrThScr) / cap_BlScr
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_BlScr', cap_BlScr,
+                              gains=dict(sensible_heat_flux_AirBlScr=sensible_heat_flux_AirBlScr,
+                                         latent_heat_flux_AirBlScr=latent_heat_flux_AirBlScr,
+                                         radiation_flux_CanopyBlScr=radiation_flux_CanopyBlScr,
+                                         radiation_flux_FlrBlScr=radiation_flux_FlrBlScr,
+                                         radiation_flux_PipeBlScr=radiation_flux_PipeBlScr,
+                                         radiation_flux_LampBlScr=radiation_flux_LampBlScr),
+                              losses=dict(sensible_heat_flux_BlScrTop=sensible_heat_flux_BlScrTop,
+                                          radiation_flux_BlScrCov_in=radiation_flux_BlScrCov_in,
+                                          radiation_flux_BlScrSky=radiation_flux_BlScrSky,
+                                          radiation_flux_BlScrThScr=radiation_flux_BlScrThScr))
+    return derivative
 
 
 def grow_pipe_temperature(setpoints: Setpoints, states: ClimateStates):
@@ -335,14 +517,23 @@ def grow_pipe_temperature(setpoints: Setpoints, states: ClimateStates):
     cap_GroPipe * t_GrowPipe = sensible_heat_flux_BoilGroPipe -  radiation_flux_GroPipeCanopy - sensible_heat_flux_GroPipeAir
     Returns: The grow pipe temperature
     """
-    cap_GroPipe = grow_pipe_heat_capacity()
+    cap_GroPipe = model_parameters().cap_GroPipe
     sensible_heat_flux_BoilGroPipe = sensible_heat_flux_between_boiler_and_grow_pipe(setpoints)
     radiation_flux_GroPipeCanopy = FIR_from_grow_pipe_to_canopy(states)
     sensible_heat_flux_GroPipeAir = sensible_heat_flux_between_grow_pipe_and_greenhouse_air(states)
-    return (sensible_heat_flux_BoilGroPipe - radiation_flux_GroPipeCanopy - sensible_heat_flux_GroPipeAir) / cap_GroPipe
+    derivative = (sensible_heat_flux_BoilGroPipe - radiation_flux_GroPipeCanopy
+                  - sensible_heat_flux_GroPipeAir) / cap_GroPipe
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_GrowPipe', cap_GroPipe,
+                              gains=dict(sensible_heat_flux_BoilGroPipe=sensible_heat_flux_BoilGroPipe),
+                              losses=dict(radiation_flux_GroPipeCanopy=radiation_flux_GroPipeCanopy,
+                                          sensible_heat_flux_GroPipeAir=sensible_heat_flux_GroPipeAir))
+    return derivative
 
 
-def lamps_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def lamps_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                      shortwave: ShortwaveAbsorption = None):
     """
     Equation 2 [2] [W m-2]
     cap_Lamp * t_Lamp = electrical_input_Lamp - radiation_flux_LampSky - radiation_flux_LampCov_in
@@ -352,6 +543,8 @@ def lamps_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weat
                       - radiation_flux_FIR_LampFlr - radiation_flux_LampAir - sensible_heat_flux_LampCool
     Returns:
     """
+    if shortwave is None:
+        shortwave = lumped_shortwave_absorption(states, setpoints, weather)
     cap_Lamp = Coefficients.Lamp.heat_capacity_lamp
     electrical_input_Lamp = lamp_electrical_input(setpoints)
     radiation_flux_LampSky = FIR_from_lamp_to_sky(states, setpoints, weather)
@@ -359,21 +552,41 @@ def lamps_temperature(setpoints: Setpoints, states: ClimateStates, weather: Weat
     radiation_flux_LampThScr = FIR_from_lamp_to_thermal_screen(states, setpoints)
     radiation_flux_LampBlScr = FIR_from_lamp_to_blackout_screen(states, setpoints)
     sensible_heat_flux_LampAir = sensible_heat_flux_between_lamps_and_greenhouse_air(states)
-    radiation_flux_PAR_LampCanopy = canopy_PAR_absorbed_from_lamp(states, setpoints)
-    radiation_flux_NIR_LampCanopy = canopy_NIR_absorbed_from_lamp(states, setpoints)
+    radiation_flux_PAR_LampCanopy = shortwave.radiation_flux_PAR_LampCanopy
+    radiation_flux_NIR_LampCanopy = shortwave.radiation_flux_NIR_LampCanopy
     radiation_flux_FIR_LampCanopy = FIR_from_inter_lamp_to_canopy(states)
     radiation_flux_LampPipe = FIR_from_lamp_to_heating_pipe(states)
-    radiation_flux_PAR_LampFlr = floor_PAR_absorbed_from_lamp(states, setpoints)
-    radiation_flux_NIR_LampFlr = floor_NIR_absorbed_from_lamp(states, setpoints)
+    radiation_flux_PAR_LampFlr = shortwave.radiation_flux_PAR_LampFlr
+    radiation_flux_NIR_LampFlr = shortwave.radiation_flux_NIR_LampFlr
     radiation_flux_FIR_LampFlr = FIR_from_lamp_to_floor(states)
 
-    radiation_flux_LampAir = lamp_radiation(states, setpoints)
+    radiation_flux_LampAir = shortwave.radiation_flux_LampAir
     sensible_heat_flux_LampCool = Coefficients.Lamp.lamp_cool_energy * electrical_input_Lamp  # Equation A34 [2]
-    return (electrical_input_Lamp - radiation_flux_LampSky - radiation_flux_LampCov_in
-                      - radiation_flux_LampThScr - radiation_flux_LampBlScr - sensible_heat_flux_LampAir
-                      - radiation_flux_PAR_LampCanopy - radiation_flux_NIR_LampCanopy - radiation_flux_FIR_LampCanopy
-                      - radiation_flux_LampPipe - radiation_flux_PAR_LampFlr - radiation_flux_NIR_LampFlr
-                      - radiation_flux_FIR_LampFlr - radiation_flux_LampAir - sensible_heat_flux_LampCool)/cap_Lamp
+    derivative = (electrical_input_Lamp - radiation_flux_LampSky - radiation_flux_LampCov_in
+                  - radiation_flux_LampThScr - radiation_flux_LampBlScr - sensible_heat_flux_LampAir
+                  - radiation_flux_PAR_LampCanopy - radiation_flux_NIR_LampCanopy
+                  - radiation_flux_FIR_LampCanopy - radiation_flux_LampPipe - radiation_flux_PAR_LampFlr
+                  - radiation_flux_NIR_LampFlr - radiation_flux_FIR_LampFlr - radiation_flux_LampAir
+                  - sensible_heat_flux_LampCool) / cap_Lamp
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_Lamp', cap_Lamp,
+                              gains=dict(electrical_input_Lamp=electrical_input_Lamp),
+                              losses=dict(radiation_flux_LampSky=radiation_flux_LampSky,
+                                          radiation_flux_LampCov_in=radiation_flux_LampCov_in,
+                                          radiation_flux_LampThScr=radiation_flux_LampThScr,
+                                          radiation_flux_LampBlScr=radiation_flux_LampBlScr,
+                                          sensible_heat_flux_LampAir=sensible_heat_flux_LampAir,
+                                          radiation_flux_PAR_LampCanopy=radiation_flux_PAR_LampCanopy,
+                                          radiation_flux_NIR_LampCanopy=radiation_flux_NIR_LampCanopy,
+                                          radiation_flux_FIR_LampCanopy=radiation_flux_FIR_LampCanopy,
+                                          radiation_flux_LampPipe=radiation_flux_LampPipe,
+                                          radiation_flux_PAR_LampFlr=radiation_flux_PAR_LampFlr,
+                                          radiation_flux_NIR_LampFlr=radiation_flux_NIR_LampFlr,
+                                          radiation_flux_FIR_LampFlr=radiation_flux_FIR_LampFlr,
+                                          radiation_flux_LampAir=radiation_flux_LampAir,
+                                          sensible_heat_flux_LampCool=sensible_heat_flux_LampCool))
+    return derivative
 
 
 def inter_lamps_temperature(setpoints: Setpoints, states: ClimateStates):
@@ -389,11 +602,22 @@ def inter_lamps_temperature(setpoints: Setpoints, states: ClimateStates):
     radiation_flux_PAR_IntLampCanopy = canopy_PAR_absorbed_from_inter_lamp(setpoints)
     radiation_flux_NIR_IntLampCanopy = canopy_NIR_absorbed_from_inter_lamp(setpoints)
     radiation_flux_FIR_IntLampCanopy = FIR_from_inter_lamp_to_canopy(states)
-    return (electrical_input_IntLampIn - sensible_heat_flux_IntLampAir - radiation_flux_PAR_IntLampCanopy
-            - radiation_flux_NIR_IntLampCanopy - radiation_flux_FIR_IntLampCanopy)/cap_LampInt
-
-
-def greenhouse_air_vapor_pressure(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    derivative = (electrical_input_IntLampIn - sensible_heat_flux_IntLampAir
+                  - radiation_flux_PAR_IntLampCanopy - radiation_flux_NIR_IntLampCanopy
+                  - radiation_flux_FIR_IntLampCanopy) / cap_LampInt
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('t_IntLamp', cap_LampInt,
+                              gains=dict(electrical_input_IntLampIn=electrical_input_IntLampIn),
+                              losses=dict(sensible_heat_flux_IntLampAir=sensible_heat_flux_IntLampAir,
+                                          radiation_flux_PAR_IntLampCanopy=radiation_flux_PAR_IntLampCanopy,
+                                          radiation_flux_NIR_IntLampCanopy=radiation_flux_NIR_IntLampCanopy,
+                                          radiation_flux_FIR_IntLampCanopy=radiation_flux_FIR_IntLampCanopy))
+    return derivative
+
+
+def greenhouse_air_vapor_pressure(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                  air_exchange: AirExchange = None, condensation: Condensation = None):
     """
     Equation 2.10 / 8.10
     cap_vapor_Air * vapor_pressure_Air = mass_vapor_flux_CanopyAir + mass_vapor_flux_FogAir
@@ -401,58 +625,111 @@ def greenhouse_air_vapor_pressure(setpoints: Setpoints, states: ClimateStates, w
                                     − mass_vapor_flux_AirOut − mass_vapor_flux_AirMech
     :return: The greenhouse air vapor pressure
     """
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    if condensation is None:
+        condensation = condensation_fluxes(setpoints, states, ('ThScr', 'MechCool'))
     cap_vapor_Air = air_compartment_water_vapor_capacity(states)
     mass_vapor_flux_CanopyAir = canopy_transpiration(states, setpoints, weather)
     mass_vapor_flux_FogAir = fogging_system_to_greenhouse_air_latent_vapor_flux(setpoints)
     mass_vapor_flux_BlowAir = heat_blower_to_greenhouse_air_vapor_flux(setpoints)
-    mass_vapor_flux_AirThScr = greenhouse_air_to_thermal_screen_vapor_flux(setpoints, states)
-    mass_vapor_flux_AirTop = greenhouse_air_to_above_thermal_screen_vapor_flux(states, setpoints, weather)
-    mass_vapor_flux_AirOut = greenhouse_air_to_outdoor_vapor_flux(states, setpoints, weather)
-    mass_vapor_flux_AirMech = greenhouse_air_to_mechanical_cooling_vapor_flux(states, setpoints)
-
-    return (mass_vapor_flux_CanopyAir + mass_vapor_flux_FogAir
-            + mass_vapor_flux_BlowAir - mass_vapor_flux_AirThScr - mass_vapor_flux_AirTop
-            - mass_vapor_flux_AirOut - mass_vapor_flux_AirMech) / cap_vapor_Air
-
-
-def top_compartment_vapor_pressure(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    mass_vapor_flux_AirThScr = condensation.mass_vapor_flux_AirThScr
+    mass_vapor_flux_AirTop = greenhouse_air_to_above_thermal_screen_vapor_flux(states, setpoints, weather, air_exchange)
+    mass_vapor_flux_AirOut = greenhouse_air_to_outdoor_vapor_flux(states, setpoints, weather, air_exchange)
+    mass_vapor_flux_AirMech = condensation.mass_vapor_flux_AirMech
+
+    derivative = (mass_vapor_flux_CanopyAir + mass_vapor_flux_FogAir + mass_vapor_flux_BlowAir
+                  - mass_vapor_flux_AirThScr - mass_vapor_flux_AirTop - mass_vapor_flux_AirOut
+                  - mass_vapor_flux_AirMech) / cap_vapor_Air
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('vapor_pressure_Air', cap_vapor_Air,
+                              gains=dict(mass_vapor_flux_CanopyAir=mass_vapor_flux_CanopyAir,
+                                         mass_vapor_flux_FogAir=mass_vapor_flux_FogAir,
+                                         mass_vapor_flux_BlowAir=mass_vapor_flux_BlowAir),
+                              losses=dict(mass_vapor_flux_AirThScr=mass_vapor_flux_AirThScr,
+                                          mass_vapor_flux_AirTop=mass_vapor_flux_AirTop,
+                                          mass_vapor_flux_AirOut=mass_vapor_flux_AirOut,
+                                          mass_vapor_flux_AirMech=mass_vapor_flux_AirMech))
+    return derivative
+
+
+def top_compartment_vapor_pressure(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                   air_exchange: AirExchange = None, condensation: Condensation = None):
     """
     Equation 2.11 / 8.11
     cap_vapor_Top * vapor_pressure_AboveThScr = mass_vapor_flux_AirTop − mass_vapor_flux_TopCov_in − mass_vapor_flux_TopOut
     :return: The above thermal screen air vapor pressure
     """
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    if condensation is None:
+        condensation = condensation_fluxes(setpoints, states, ('Cov_in',))
     cap_vapor_Top = air_compartment_water_vapor_capacity(states)
-    mass_vapor_flux_AirTop = greenhouse_air_to_above_thermal_screen_vapor_flux(states, setpoints, weather)
-    mass_vapor_flux_TopCov_in = above_thermal_screen_to_internal_cover_vapor_flux(states)
-    mass_vapor_flux_TopOut = above_thermal_screen_to_outdoor_vapor_flux(states, setpoints, weather)
-    return (mass_vapor_flux_AirTop - mass_vapor_flux_TopCov_in - mass_vapor_flux_TopOut) / cap_vapor_Top
-
-
-def greenhouse_air_co2(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    mass_vapor_flux_AirTop = greenhouse_air_to_above_thermal_screen_vapor_flux(states, setpoints, weather, air_exchange)
+    mass_vapor_flux_TopCov_in = condensation.mass_vapor_flux_TopCov_in
+    mass_vapor_flux_TopOut = above_thermal_screen_to_outdoor_vapor_flux(states, setpoints, weather, air_exchange)
+    derivative = (mass_vapor_flux_AirTop - mass_vapor_flux_TopCov_in - mass_vapor_flux_TopOut) / cap_vapor_Top
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('vapor_pressure_AboveThScr', cap_vapor_Top,
+                              gains=dict(mass_vapor_flux_AirTop=mass_vapor_flux_AirTop),
+                              losses=dict(mass_vapor_flux_TopCov_in=mass_vapor_flux_TopCov_in,
+                                          mass_vapor_flux_TopOut=mass_vapor_flux_TopOut))
+    return derivative
+
+
+def greenhouse_air_co2(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                       air_exchange: AirExchange = None, crop_coupling: CropClimateCoupling = None, crop_states=None):
     """
     Equation 2.12 / 8.12
     cap_CO2_Air * air_CO2 = mass_CO2_flux_BlowAir + mass_CO2_flux_ExtAir
                           - mass_CO2_flux_AirCanopy - mass_CO2_flux_AirTop - mass_CO2_flux_AirOut
+    With a crop_coupling, mass_CO2_flux_AirCanopy is evaluated from crop_states and states in the same evaluation,
+    otherwise states.mass_co2_flux_AirCanopy is used.
     :return: The greenhouse air CO2 concentration
     """
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
     cap_co2_Air = coefs.Construction.air_height
     mass_co2_flux_BlowAir = heat_blower_to_greenhouse_air_co2_flux(setpoints)
     mass_co2_flux_ExtAir = external_co2_added(setpoints)
-    mass_co2_flux_AirCanopy = states.mass_co2_flux_AirCanopy
-    mass_co2_flux_AirTop = greenhouse_air_and_above_thermal_screen_co2_flux(states, setpoints, weather)
-    mass_co2_flux_AirOut = greenhouse_air_and_outdoor_co2_flux(states, setpoints, weather)
-    return (mass_co2_flux_BlowAir + mass_co2_flux_ExtAir
-            - mass_co2_flux_AirCanopy - mass_co2_flux_AirTop - mass_co2_flux_AirOut) / cap_co2_Air
-
-
-def top_compartment_air_co2(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+    if crop_coupling is None:
+        mass_co2_flux_AirCanopy = states.mass_co2_flux_AirCanopy
+    else:
+        mass_co2_flux_AirCanopy = crop_coupling.canopy_co2_uptake(crop_states, states)
+    mass_co2_flux_AirTop = greenhouse_air_and_above_thermal_screen_co2_flux(states, setpoints, weather, air_exchange)
+    mass_co2_flux_AirOut = greenhouse_air_and_outdoor_co2_flux(states, setpoints, weather, air_exchange)
+    derivative = (mass_co2_flux_BlowAir + mass_co2_flux_ExtAir - mass_co2_flux_AirCanopy
+                  - mass_co2_flux_AirTop - mass_co2_flux_AirOut) / cap_co2_Air
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('co2_Air', cap_co2_Air,
+                              gains=dict(mass_co2_flux_BlowAir=mass_co2_flux_BlowAir,
+                                         mass_co2_flux_ExtAir=mass_co2_flux_ExtAir),
+                              losses=dict(mass_co2_flux_AirCanopy=mass_co2_flux_AirCanopy,
+                                          mass_co2_flux_AirTop=mass_co2_flux_AirTop,
+                                          mass_co2_flux_AirOut=mass_co2_flux_AirOut))
+    return derivative
+
+
+def top_compartment_air_co2(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                            air_exchange: AirExchange = None):
     """
     Equation 2.13 / 8.13
     cap_CO2_Top * top_CO2 = mass_CO2_flux_AirTop - mass_CO2_flux_TopOut
     :return: The above thermal screen air CO2 concentration
     """
-    cap_co2_Top = coefs.Construction.greenhouse_height - coefs.Construction.air_height
-    mass_co2_flux_AirTop = greenhouse_air_and_above_thermal_screen_co2_flux(states, setpoints, weather)
-    mass_co2_flux_TopOut = above_thermal_screen_and_outdoor_co2_flux(states, setpoints, weather)
-    return (mass_co2_flux_AirTop - mass_co2_flux_TopOut) / cap_co2_Top
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    cap_co2_Top = model_parameters().h_Top
+    mass_co2_flux_AirTop = greenhouse_air_and_above_thermal_screen_co2_flux(states, setpoints, weather, air_exchange)
+    mass_co2_flux_TopOut = above_thermal_screen_and_outdoor_co2_flux(states, setpoints, weather, air_exchange)
+    derivative = (mass_co2_flux_AirTop - mass_co2_flux_TopOut) / cap_co2_Top
+    ledger = active_ledger()
+    if ledger is not None:
+        ledger.record_balance('co2_AboveThScr', cap_co2_Top,
+                              gains=dict(mass_co2_flux_AirTop=mass_co2_flux_AirTop),
+                              losses=dict(mass_co2_flux_TopOut=mass_co2_flux_TopOut))
+    return derivative
 
@@ -1,22 +1,89 @@
-import math
+from typing import NamedTuple
+
+import numpy as np
 
 from coefficients import Coefficients
 from data_models import Setpoints, ClimateStates, Weather
 from constants import *
+from climate.parameters import model_parameters
+from physics_utils import InterpolationTable, tabulated_temperature_function
 
 
 def air_density():
     # Equation 8.24
-    return DENSITY_AIR0 * math.exp(GRAVITY * M_AIR * Coefficients.Construction.elevation_height / (293.15 * M_GAS))
+    return DENSITY_AIR0 * np.exp(GRAVITY * M_AIR * Coefficients.Construction.elevation_height / (293.15 * M_GAS))
+
+
+def smooth_switch(x):
+    """
+    The smoothed switch 1 / (1 + exp(x)) of Equation 8.44, 8.52 and B.1, written with tanh so that it doesn't
+    overflow for large x
+    Returns: a value between 0 and 1, 0.5 at x = 0
+    """
+    return 0.5 * (1 - np.tanh(0.5 * x))
+
+
+# The width of the rounding of smooth_abs around 0 [K]
+SMOOTH_ABS_WIDTH = 1E-2
 
 
-def thermal_screen_air_flux_rate(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def smooth_abs(x):
+    """
+    |x| rounded off around 0, for the free convection heat exchange coefficients c * |dT| ** n with n < 1,
+    whose derivative is infinite at dT = 0 with the plain absolute value
+    Returns: sqrt(x ** 2 + SMOOTH_ABS_WIDTH ** 2)
+    """
+    return np.sqrt(x * x + SMOOTH_ABS_WIDTH * SMOOTH_ABS_WIDTH)
+
+
+class AirExchange(NamedTuple):
+    """
+    The air exchange rates of one evaluation of the climate model, shared by the heat, vapor and CO2 balances
+    """
+    density_air: float  # density of the greenhouse air [kg m^-3]
+    f_ThScr: float  # air flux rate through the thermal screen [m^3 m^-2 s^-1]
+    f_VentRoof: float  # total roof ventilation rate [m^3 m^-2 s^-1]
+    f_VentSide: float  # total side vents ventilation rate [m^3 m^-2 s^-1]
+    f_VentForced: float  # forced ventilation rate [m^3 m^-2 s^-1]
+
+    @property
+    def f_AirOut(self):
+        # Air flux rate from the greenhouse air to the outdoor air [m^3 m^-2 s^-1]
+        return self.f_VentSide + self.f_VentForced
+
+    @property
+    def f_TopOut(self):
+        # Air flux rate from the above thermal screen compartment to the outdoor air [m^3 m^-2 s^-1]
+        return self.f_VentRoof
+
+
+def air_exchange_rates(setpoints: Setpoints, states: ClimateStates, weather: Weather) -> AirExchange:
+    """
+    Equations 8.41, 8.65 - 8.76
+    The air density and the discharge coefficients are evaluated once and shared by all ventilation rates.
+    Returns: the air exchange rates of the current evaluation
+    """
+    density_air = model_parameters().density_air
+    discharge_coef = discharge_coefficients(setpoints, 'd')
+    global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
+    leakage_rate = greenhouse_leakage_rate(weather)
+    return AirExchange(density_air=density_air,
+                       f_ThScr=thermal_screen_air_flux_rate(setpoints, states, weather, density_air),
+                       f_VentRoof=total_roof_ventilation_rates(setpoints, states, weather, discharge_coef,
+                                                               global_wind_pressure_coef, leakage_rate),
+                       f_VentSide=total_side_vents_ventilation_rates(setpoints, states, weather, discharge_coef,
+                                                                     global_wind_pressure_coef, leakage_rate),
+                       f_VentForced=0)  # According to GreenLight, forced ventilation doesn't exist in this greenhouse
+
+
+def thermal_screen_air_flux_rate(setpoints: Setpoints, states: ClimateStates, weather: Weather, density_air=None):
     # Equation 8.41
-    density_air = air_density()
-    pressure = 101325 * (1 - 2.5577e-5 * Coefficients.Construction.elevation_height) ** 5.25588
-    density_Out = M_AIR * pressure / ((states.t_AboveThScr + 273.15) * M_GAS) # = rho_Top, line 715 / setGlAux / GreenLight
+    parameters = model_parameters()
+    if density_air is None:
+        density_air = parameters.density_air
+    density_Out = M_AIR * parameters.pressure / ((states.t_AboveThScr + 273.15) * M_GAS) # = rho_Top, line 715 / setGlAux / GreenLight
     density_mean_Air = (density_air + density_Out) / 2
-    return setpoints.U_ThScr * Coefficients.Thermalscreen.thScr_flux_coefficient * abs(states.t_Air - weather.t_Outdoor) ** 0.66 \
+    return setpoints.U_ThScr * Coefficients.Thermalscreen.thScr_flux_coefficient * smooth_abs(states.t_Air - weather.t_Outdoor) ** 0.66 \
            + (1-setpoints.U_ThScr) \
            * (0.5 * density_mean_Air * (1 - setpoints.U_ThScr) * GRAVITY * abs(density_air - density_Out)) ** 0.5 \
            / density_mean_Air
@@ -42,39 +109,62 @@ def mechanical_cooling_to_greenhouse_air_heat_exchange_coefficient(setpoints: Se
            / (states.t_Air - states.t_MechCool + 6.5E-9 * EVAPORATION_LATENT_HEAT * (states.vapor_pressure_Air - vapor_pressure_MechCool))
 
 
-def roof_ventilation_natural_ventilation_rate(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def greenhouse_air_to_thermal_screen_heat_exchange_coefficient(setpoints: Setpoints, states: ClimateStates):
+    # Shared by the sensible heat flux and the condensation between the greenhouse air and the thermal screen
+    return 1.7 * setpoints.U_ThScr * smooth_abs(states.t_Air - states.t_ThScr) ** 0.33
+
+
+def above_thermal_screen_to_internal_cover_heat_exchange_coefficient(states: ClimateStates):
+    # Shared by the sensible heat flux and the condensation between the top compartment and the internal cover
+    return model_parameters().c_HEC_TopCov_in * smooth_abs(states.t_AboveThScr - states.t_Cov_internal) ** 0.33
+
+
+def greenhouse_air_to_blackout_screen_heat_exchange_coefficient(setpoints: Setpoints, states: ClimateStates):
+    # Shared by the sensible heat flux and the condensation between the greenhouse air and the blackout screen
+    return 1.7 * setpoints.U_BlScr * smooth_abs(states.t_Air - states.t_BlScr) ** 0.33
+
+
+def roof_ventilation_natural_ventilation_rate(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                              discharge_coef=None, global_wind_pressure_coef=None):
     # Equation 8.65
     max_area_roof_ventilation = Coefficients.Ventilation.A_Roof  # TODO: Need to re-check
-    discharge_coef = discharge_coefficients(setpoints, 'd')
-    global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
+    if discharge_coef is None:
+        discharge_coef = discharge_coefficients(setpoints, 'd')
+    if global_wind_pressure_coef is None:
+        global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
     vent_vertical_dimension = Coefficients.Construction.vent_vertical_dimension
     mean_t = (states.t_Air + weather.t_Outdoor) / 2
     return setpoints.U_Roof * max_area_roof_ventilation * discharge_coef \
-           * math.sqrt(GRAVITY * vent_vertical_dimension * (states.t_Air - weather.t_Outdoor) / (2 * (mean_t + 273.15))
-                       + global_wind_pressure_coef * weather.v_Wind ** 2) \
+           * np.sqrt(GRAVITY * vent_vertical_dimension * abs(states.t_Air - weather.t_Outdoor) / (2 * (mean_t + 273.15))
+                     + global_wind_pressure_coef * weather.v_Wind ** 2) \
            / (2 * Coefficients.Construction.floor_area)
 
 
-def roof_and_side_vents_ventilation_rate(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def roof_and_side_vents_ventilation_rate(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                         discharge_coef=None, global_wind_pressure_coef=None):
     # Equation 8.66
-    discharge_coef = discharge_coefficients(setpoints, 'd')
-    global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
+    if discharge_coef is None:
+        discharge_coef = discharge_coefficients(setpoints, 'd')
+    if global_wind_pressure_coef is None:
+        global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
     rf_vents = roof_vents_apertures(setpoints)
     side_vents = sidewall_vents_apertures(setpoints)
     mean_t = (states.t_Air + weather.t_Outdoor) / 2
     return (discharge_coef / Coefficients.Construction.floor_area) * \
-           math.sqrt((rf_vents * side_vents / math.sqrt(rf_vents ** 2 + side_vents ** 2)) ** 2
-                     * (2 * GRAVITY * Coefficients.Construction.side_wall_roof_vent_distance
-                        * (states.t_Air - weather.t_Outdoor) / (mean_t + 273.15))
-                     + ((rf_vents + side_vents) / 2) ** 2 * global_wind_pressure_coef * weather.v_Wind ** 2)
+           np.sqrt((rf_vents * side_vents / np.sqrt(rf_vents ** 2 + side_vents ** 2)) ** 2
+                   * (2 * GRAVITY * Coefficients.Construction.side_wall_roof_vent_distance
+                      * abs(states.t_Air - weather.t_Outdoor) / (mean_t + 273.15))
+                   + ((rf_vents + side_vents) / 2) ** 2 * global_wind_pressure_coef * weather.v_Wind ** 2)
 
 
-def sidewall_ventilation_rate(setpoints: Setpoints, weather: Weather):
+def sidewall_ventilation_rate(setpoints: Setpoints, weather: Weather, discharge_coef=None, global_wind_pressure_coef=None):
     # Equation 8.67
-    discharge_coef = discharge_coefficients(setpoints, 'd')
-    global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
+    if discharge_coef is None:
+        discharge_coef = discharge_coefficients(setpoints, 'd')
+    if global_wind_pressure_coef is None:
+        global_wind_pressure_coef = discharge_coefficients(setpoints, 'w')
     side_vents = sidewall_vents_apertures(setpoints)
-    return discharge_coef * side_vents * weather.v_Wind * math.sqrt(global_wind_pressure_coef) \
+    return discharge_coef * side_vents * weather.v_Wind * np.sqrt(global_wind_pressure_coef) \
            / (2 * Coefficients.Construction.floor_area)
 
 
@@ -98,19 +188,20 @@ def ventilation_rate_reduce_factor():
 
 def greenhouse_leakage_rate(weather: Weather):
     # Equation 8.71
-    if weather.v_Wind < 0.25:
-        return 0.25 * Coefficients.Construction.leakage_coef
-    else:
-        return Coefficients.Construction.leakage_coef * weather.v_Wind
+    return Coefficients.Construction.leakage_coef * np.maximum(weather.v_Wind, 0.25)
 
 
-def total_roof_ventilation_rates(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def total_roof_ventilation_rates(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                 discharge_coef=None, global_wind_pressure_coef=None, leakage_rate=None):
     # Equation 8.72
     eta_Roof = 1  # Note: line 606 / setGlAux / GreenLight
     ventilation_rate_reduced = ventilation_rate_reduce_factor()
-    vent_roof_rate = roof_ventilation_natural_ventilation_rate(setpoints, states, weather)
-    vent_roof_side_rate = roof_and_side_vents_ventilation_rate(setpoints, states, weather)
-    leakage_rate = greenhouse_leakage_rate(weather)
+    vent_roof_rate = roof_ventilation_natural_ventilation_rate(setpoints, states, weather,
+                                                               discharge_coef, global_wind_pressure_coef)
+    vent_roof_side_rate = roof_and_side_vents_ventilation_rate(setpoints, states, weather,
+                                                               discharge_coef, global_wind_pressure_coef)
+    if leakage_rate is None:
+        leakage_rate = greenhouse_leakage_rate(weather)
     if eta_Roof >= ETA_ROOF_THR:
         return ventilation_rate_reduced * vent_roof_rate + 0.5 * leakage_rate
     else:
@@ -119,14 +210,17 @@ def total_roof_ventilation_rates(setpoints: Setpoints, states: ClimateStates, we
                + 0.5 * leakage_rate
 
 
-def total_side_vents_ventilation_rates(setpoints: Setpoints, states: ClimateStates, weather: Weather):
+def total_side_vents_ventilation_rates(setpoints: Setpoints, states: ClimateStates, weather: Weather,
+                                       discharge_coef=None, global_wind_pressure_coef=None, leakage_rate=None):
     # Equation 8.73
     eta_Roof = 1  # Note: line 606 / setGlAux / GreenLight
     eta_Side = 0  # Note: line 611 / setGlAux / GreenLight
     ventilation_rate_reduced = ventilation_rate_reduce_factor()
-    vent_side_rate = sidewall_ventilation_rate(setpoints, weather)
-    vent_roof_side_rate = roof_and_side_vents_ventilation_rate(setpoints, states, weather)
-    leakage_rate = greenhouse_leakage_rate(weather)
+    vent_side_rate = sidewall_ventilation_rate(setpoints, weather, discharge_coef, global_wind_pressure_coef)
+    vent_roof_side_rate = roof_and_side_vents_ventilation_rate(setpoints, states, weather,
+                                                               discharge_coef, global_wind_pressure_coef)
+    if leakage_rate is None:
+        leakage_rate = greenhouse_leakage_rate(weather)
     if eta_Roof >= ETA_ROOF_THR:
         return ventilation_rate_reduced * vent_side_rate + 0.5 * leakage_rate
     else:
@@ -153,7 +247,29 @@ def clear_sky_FIR_emission_coefficient(weather: Weather):
     return 0.53 + 6E-3 * weather.vapor_pressure_outdoor ** 0.5
 
 
-def saturation_vapor_pressure(temp):
+def _exact_saturation_vapor_pressure(temp):
     # Calculation based on
     # http://www.conservationphysics.org/atmcalc/atmoclc2.pdf
-    return 610.78 * math.exp(temp / (temp + 238.3) * 17.2694)  # Pascal
+    return 610.78 * np.exp(temp / (temp + 238.3) * 17.2694)  # Pascal
+
+
+def saturation_vapor_pressure_table() -> InterpolationTable:
+    """
+    The saturation vapor pressure [Pa] tabulated by physics_utils.tabulated_temperature_function.
+    physics_utils.saturation_vapor_pressure uses other constants and is in kPa.
+    """
+    return tabulated_temperature_function(_exact_saturation_vapor_pressure)
+
+
+def saturation_vapor_pressure(temp, fast: bool = False):
+    """
+    Args:
+        temp: the temperature, a scalar or an array of any shape [°C]
+        fast: read the value from saturation_vapor_pressure_table(), the relative error is reported by its
+              max_relative_error
+
+    Returns: the saturation vapor pressure [Pa]
+    """
+    if fast:
+        return saturation_vapor_pressure_table()(temp)
+    return _exact_saturation_vapor_pressure(temp)
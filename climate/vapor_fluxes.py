@@ -1,6 +1,15 @@
-from climate.heat_fluxes import sensible_heat_flux_between_direct_air_heater_and_greenhouse_air
+from typing import NamedTuple
+
+import numpy as np
+
+from climate.parameters import model_parameters
 from climate.utils import *
 
+# The cold surfaces on which the air can condense, in the order of the surface axis of Condensation
+# ThScr: thermal screen (greenhouse air), Cov_in: internal cover (top compartment air),
+# MechCool: mechanical cooling (greenhouse air), BlScr: blackout screen (greenhouse air)
+CONDENSATION_SURFACES = ('ThScr', 'Cov_in', 'MechCool', 'BlScr')
+
 
 def differentiable_air_to_obj_vapor_flux(vapor_pressure_1: float, vapor_pressure_2: float, heat_exchange_coef: float):
     """
@@ -13,7 +22,7 @@ def differentiable_air_to_obj_vapor_flux(vapor_pressure_1: float, vapor_pressure
     Returns:  the vapor flux from the air to an object by condensation [kg m^-2 s^-1]
     """
     return 6.4E-9 * heat_exchange_coef * (vapor_pressure_1 - vapor_pressure_2) \
-           / (1 + math.exp(S_MV12 * (vapor_pressure_1 - vapor_pressure_2)))
+           * smooth_switch(S_MV12 * (vapor_pressure_1 - vapor_pressure_2))
 
 
 def general_vapor_flux(air_flux: float, vapor_pressure_1: float, vapor_pressure_2: float, temp_1: float, temp_2: float):
@@ -38,45 +47,140 @@ def fogging_system_to_greenhouse_air_latent_vapor_flux(setpoints: Setpoints):
 
 def heat_blower_to_greenhouse_air_vapor_flux(setpoints: Setpoints):
     # Equation 8.55
+    # Imported here, climate.heat_fluxes imports this module
+    from climate.heat_fluxes import sensible_heat_flux_between_direct_air_heater_and_greenhouse_air
+
     sensible_heat_flux_BlowAir = sensible_heat_flux_between_direct_air_heater_and_greenhouse_air(setpoints)
     return ETA_HEATVAP * sensible_heat_flux_BlowAir
 
 
 def greenhouse_air_to_thermal_screen_vapor_flux(setpoints: Setpoints, states: ClimateStates):
-    HEC_AirThScr = 1.7 * setpoints.U_ThScr * abs(states.t_Air - states.t_ThScr) ** 0.33
-    vapor_pressure_ThScr = saturation_vapor_pressure(states.t_ThScr)
-    return differentiable_air_to_obj_vapor_flux(states.vapor_pressure_Air, vapor_pressure_ThScr, HEC_AirThScr)
+    # Equation 8.43, see condensation_fluxes
+    return condensation_fluxes(setpoints, states, ('ThScr',)).mass_vapor_flux_AirThScr
 
 
-def greenhouse_air_to_above_thermal_screen_vapor_flux(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    f_AirTop = thermal_screen_air_flux_rate(setpoints, states, weather)
+def greenhouse_air_to_above_thermal_screen_vapor_flux(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                                      air_exchange: AirExchange = None):
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    f_AirTop = air_exchange.f_ThScr
     return general_vapor_flux(f_AirTop, states.vapor_pressure_Air, states.vapor_pressure_AboveThScr, states.t_Air,
                               states.t_AboveThScr)
 
 
-def greenhouse_air_to_outdoor_vapor_flux(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    total_side_vent_rate = total_side_vents_ventilation_rates(setpoints, states, weather)
-    f_VentForced = 0  # According to GreenLight, forced ventilation doesn't exist in this greenhouse
-    f_AirOut = total_side_vent_rate + f_VentForced
+def greenhouse_air_to_outdoor_vapor_flux(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                         air_exchange: AirExchange = None):
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    f_AirOut = air_exchange.f_AirOut
     return general_vapor_flux(f_AirOut, states.vapor_pressure_Air, weather.vapor_pressure_outdoor, states.t_Air,
                               weather.t_Outdoor)
 
 
 def greenhouse_air_to_mechanical_cooling_vapor_flux(states: ClimateStates, setpoints: Setpoints):
-    HEC_MechAir = mechanical_cooling_to_greenhouse_air_heat_exchange_coefficient(setpoints, states)
-    vapor_pressure_MechCool = saturation_vapor_pressure(states.t_MechCool)
-    return differentiable_air_to_obj_vapor_flux(states.vapor_pressure_Air, vapor_pressure_MechCool, HEC_MechAir)
+    # Equation 8.63, see condensation_fluxes
+    return condensation_fluxes(setpoints, states, ('MechCool',)).mass_vapor_flux_AirMech
 
 
 def above_thermal_screen_to_internal_cover_vapor_flux(states: ClimateStates):
-    HEC_TopCov_in = Coefficients.Construction.c_HECin * (states.t_AboveThScr - states.t_Cov_internal) ** 0.33 \
-                    * Coefficients.Construction.cover_area / Coefficients.Construction.floor_area
-    vapor_pressure_Cov_internal = saturation_vapor_pressure(states.t_Cov_internal)
-    return differentiable_air_to_obj_vapor_flux(states.vapor_pressure_AboveThScr, vapor_pressure_Cov_internal,
-                                                HEC_TopCov_in)
+    # Equation 8.43, see condensation_fluxes
+    return condensation_fluxes(None, states, ('Cov_in',)).mass_vapor_flux_TopCov_in
 
 
-def above_thermal_screen_to_outdoor_vapor_flux(states: ClimateStates, setpoints: Setpoints, weather: Weather):
-    f_TopOut = total_roof_ventilation_rates(setpoints, states, weather)
+def above_thermal_screen_to_outdoor_vapor_flux(states: ClimateStates, setpoints: Setpoints, weather: Weather,
+                                               air_exchange: AirExchange = None):
+    if air_exchange is None:
+        air_exchange = air_exchange_rates(setpoints, states, weather)
+    f_TopOut = air_exchange.f_TopOut
     return general_vapor_flux(f_TopOut, states.vapor_pressure_AboveThScr, weather.vapor_pressure_outdoor,
                               states.t_AboveThScr, weather.t_Outdoor)
+
+
+class Condensation(NamedTuple):
+    mass_vapor_flux: np.ndarray  # condensation flux on each of the surfaces [kg m^-2 s^-1]
+    latent_heat_flux: np.ndarray  # latent heat released on each of the surfaces [W m^-2]
+    surfaces: tuple = CONDENSATION_SURFACES  # the surfaces of the last axis, a subset of CONDENSATION_SURFACES
+
+    def _surface(self, surface: str) -> int:
+        try:
+            return self.surfaces.index(surface)
+        except ValueError:
+            raise ValueError(f'The condensation on {surface} was not computed, the surfaces are {self.surfaces}') \
+                from None
+
+    @property
+    def mass_vapor_flux_AirThScr(self):
+        return self.mass_vapor_flux[..., self._surface('ThScr')]
+
+    @property
+    def mass_vapor_flux_TopCov_in(self):
+        return self.mass_vapor_flux[..., self._surface('Cov_in')]
+
+    @property
+    def mass_vapor_flux_AirMech(self):
+        return self.mass_vapor_flux[..., self._surface('MechCool')]
+
+    @property
+    def mass_vapor_flux_AirBlScr(self):
+        return self.mass_vapor_flux[..., self._surface('BlScr')]
+
+    @property
+    def latent_heat_flux_AirThScr(self):
+        return self.latent_heat_flux[..., self._surface('ThScr')]
+
+    @property
+    def latent_heat_flux_TopCov_in(self):
+        return self.latent_heat_flux[..., self._surface('Cov_in')]
+
+    @property
+    def latent_heat_flux_AirBlScr(self):
+        return self.latent_heat_flux[..., self._surface('BlScr')]
+
+
+def condensation_kernel(vapor_pressure_air, t_surface, heat_exchange_coef):
+    """
+    Equation 8.44 and 8.42 for any number of surfaces at once
+    Args:
+        vapor_pressure_air: the vapor pressure of the air in contact with each surface [Pa]
+        t_surface: the temperature of each surface [°C]
+        heat_exchange_coef: the heat exchange coefficient between the air and each surface [W m^-2 K^-1]
+
+    Returns: the condensation fluxes [kg m^-2 s^-1] and the latent heat fluxes [W m^-2], with the broadcast shape
+    """
+    vapor_pressure_surface = saturation_vapor_pressure(np.asarray(t_surface, dtype=float))
+    mass_vapor_flux = differentiable_air_to_obj_vapor_flux(vapor_pressure_air, vapor_pressure_surface, heat_exchange_coef)
+    return mass_vapor_flux, EVAPORATION_LATENT_HEAT * mass_vapor_flux
+
+
+def _condensation_surface(surface: str, setpoints: Setpoints, states: ClimateStates):
+    # The air vapor pressure, the surface temperature and the heat exchange coefficient of one surface
+    if surface == 'ThScr':
+        return states.vapor_pressure_Air, states.t_ThScr, \
+            greenhouse_air_to_thermal_screen_heat_exchange_coefficient(setpoints, states)
+    if surface == 'Cov_in':
+        return states.vapor_pressure_AboveThScr, states.t_Cov_internal, \
+            above_thermal_screen_to_internal_cover_heat_exchange_coefficient(states)
+    if surface == 'MechCool':
+        return states.vapor_pressure_Air, states.t_MechCool, \
+            mechanical_cooling_to_greenhouse_air_heat_exchange_coefficient(setpoints, states)
+    if surface == 'BlScr':
+        return states.vapor_pressure_Air, states.t_BlScr, \
+            greenhouse_air_to_blackout_screen_heat_exchange_coefficient(setpoints, states)
+    raise ValueError(f'Unknown condensation surface {surface}, the surfaces are {CONDENSATION_SURFACES}')
+
+
+def condensation_fluxes(setpoints: Setpoints, states: ClimateStates,
+                        surfaces: tuple = CONDENSATION_SURFACES) -> Condensation:
+    """
+    The condensation on several CONDENSATION_SURFACES in one pass, shared by the vapor and the energy balances.
+    A balance only asks for the surfaces it uses, e.g. the thermal screen balance doesn't evaluate the mechanical
+    cooling, which needs the coefficients of the active climate control. The setpoints are not read for Cov_in alone.
+    Returns: the condensation fluxes of the current evaluation
+    """
+    vapor_pressure_air, t_surface, heat_exchange_coef = zip(*(_condensation_surface(surface, setpoints, states)
+                                                             for surface in surfaces))
+    mass_vapor_flux, latent_heat_flux = condensation_kernel(
+        np.stack(np.broadcast_arrays(*vapor_pressure_air), axis=-1),
+        np.stack(np.broadcast_arrays(*t_surface), axis=-1),
+        np.stack(np.broadcast_arrays(*heat_exchange_coef), axis=-1))
+    return Condensation(mass_vapor_flux=mass_vapor_flux, latent_heat_flux=latent_heat_flux, surfaces=tuple(surfaces))
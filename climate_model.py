@@ -2,7 +2,9 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 
-from data_models import Setpoints
+from climate.spectral_radiation import ShortwaveAbsorption, shortwave_absorption
+from data_models import ClimateStates, Setpoints, Weather
+from design import GreenhouseDesign, load_design, use_design
 
 
 class IndoorClimateModel(ABC):
@@ -23,9 +25,33 @@ class IndoorClimateModel(ABC):
 
 
 class GreenhouseClimateModel(IndoorClimateModel):
+    """
+    The flux functions read the active design (see design.activate_design), so the model evaluates its climate in a
+    use_design block of its own design: the models of different designs can be used side by side in one process,
+    their evaluations take turns.
+    """
+
+    def __init__(self, greenhouse_design, spectral_radiation: bool = False):
+        """
+        Args:
+            greenhouse_design: a GreenhouseDesign or the path of its configuration file, see design.load_design
+            spectral_radiation: use the multi-band spectral radiation mode instead of the lumped two-band model,
+                                see climate.spectral_radiation
+        """
+        super(GreenhouseClimateModel, self).__init__(greenhouse_design)
+        if not isinstance(greenhouse_design, GreenhouseDesign):
+            greenhouse_design = load_design(greenhouse_design)
+        self.greenhouse_design = greenhouse_design
+        self.spectral_radiation = spectral_radiation
 
-    def __init__(self, greenhouse_config_file):
-        super(GreenhouseClimateModel, self).__init__(greenhouse_config_file)
+    def shortwave_absorption(self, states: ClimateStates, setpoints: Setpoints,
+                             weather: Weather) -> ShortwaveAbsorption:
+        """
+        Returns: the sun and lamp radiation absorbed by the greenhouse objects of the design of the model in the
+                 selected radiation mode, to be passed to the energy balances of climate.state_variables [W m^-2]
+        """
+        with use_design(self.greenhouse_design):
+            return shortwave_absorption(states, setpoints, weather, spectral=self.spectral_radiation)
 
     def step(self, crop_observations: np.ndarray, setpoint: np.ndarray):
         raise NotImplementedError
@@ -4,7 +4,7 @@ NOTE: In the GreenLight model, there are no whitewash and shadow screen
 """
 
 
-# TODO: import coefficients through a configuration file
+# The default greenhouse design, see design.load_design for designs read from configuration files
 class Coefficients(object):
     class Construction:
         ratio_GlobAir = 0.1  # The ratio of the global radiation which is absorbed by the greenhouse construction elements
@@ -0,0 +1,87 @@
+"""Multi-layer canopy
+
+The big-leaf model of Equation 9.14 applies the light response of the electron transport to the PAR absorbed by the
+whole canopy. The multi-layer canopy integrates the light response of the leaves over the depth of the canopy
+instead, with Gauss-Legendre quadrature over the cumulative leaf area index L:
+    electron_transport_rate = integral from 0 to LAI of
+                              sunlit_fraction(L) * J(PAR_sunlit(L)) + (1 - sunlit_fraction(L)) * J(PAR_shaded(L)) dL
+where J is the light response of Equation 9.14 per square meter leaf.
+
+The PAR above the canopy is derived from the PAR absorbed by the canopy with Equation 8.27, so both models absorb
+the same PAR. DIRECT_PAR_FRACTION of it is direct radiation absorbed by the sunlit leaves, the rest is diffuse.
+The PAR of the inter-lights is absorbed evenly by all leaves. With a single leaf of uniform light the multi-layer
+canopy reduces to the big-leaf model. The layers are an array axis appended to the inputs, so the cost is about
+2 * CANOPY_LAYERS_NUM light responses per evaluation.
+"""
+import numpy as np
+
+from constants import CANOPY_PAR_EXTINCTION_COEF
+from .electron_transport import potential_electron_transport
+from .tomato_constants import *
+from .utils import leaf_area_index
+
+_gauss_legendre_points = {}
+
+
+def gauss_legendre_layers(layers_num: int):
+    """
+    Returns: the Gauss-Legendre points and weights on [0, 1], cached by number of layers
+    """
+    layers = _gauss_legendre_points.get(layers_num)
+    if layers is None:
+        points, weights = np.polynomial.legendre.leggauss(layers_num)
+        layers = (points + 1) / 2, weights / 2
+        _gauss_legendre_points[layers_num] = layers
+    return layers
+
+
+def leaf_electron_transport(potential_leaf_electron_transport_rate, leaf_PAR_absorbed):
+    """
+    Equation 9.14 per square meter leaf
+    Returns: electron transport rate [µmol {e-} m^-2 {leaf} s^-1]
+    """
+    electrons = PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR * leaf_PAR_absorbed
+    return (potential_leaf_electron_transport_rate + electrons
+            - np.sqrt((potential_leaf_electron_transport_rate + electrons) ** 2
+                      - 4 * ELECTRON_TRANSPORT_RATE_CURVATURE * potential_leaf_electron_transport_rate * electrons)) \
+        / (2 * ELECTRON_TRANSPORT_RATE_CURVATURE)
+
+
+def multi_layer_electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy, PAR_IntLamp=0,
+                                   layers_num: int = CANOPY_LAYERS_NUM, direct_fraction: float = None):
+    """
+    Equation 9.14 integrated over the sunlit and shaded leaves of the canopy layers
+    Args:
+        carbohydrate_amount_Leaf: carbohydrates in the leaves [mg m^-2]
+        canopy_t: canopy temperature [°C]
+        PAR_Canopy: the PAR absorbed by the canopy, including PAR_IntLamp [µmol {photons} m^-2 s^-1]
+        PAR_IntLamp: the part of PAR_Canopy from the inter-lights [µmol {photons} m^-2 s^-1]
+        layers_num: the number of layers
+        direct_fraction: the part of the PAR above the canopy which is direct radiation [-], by default
+            DIRECT_PAR_FRACTION, read on each call
+
+    Returns: electron transport rate [µmol {e-} m^-2 s^-1]
+    """
+    if direct_fraction is None:
+        direct_fraction = DIRECT_PAR_FRACTION
+    LAI = np.maximum(leaf_area_index(carbohydrate_amount_Leaf), 1e-10)
+    extinction_coef = CANOPY_PAR_EXTINCTION_COEF
+    # The potential rate of Equation 9.15 is proportional to the LAI, the leaves share it evenly
+    potential_leaf_electron_transport_rate = \
+        np.asarray(potential_electron_transport(carbohydrate_amount_Leaf, canopy_t) / LAI)[..., np.newaxis]
+
+    # Equation 8.27 inverted: the PAR above the canopy which is absorbed as PAR_Canopy - PAR_IntLamp
+    PAR_above_canopy = (PAR_Canopy - PAR_IntLamp) / (1 - np.exp(-extinction_coef * LAI))
+    points, weights = gauss_legendre_layers(layers_num)
+    depth = np.asarray(LAI)[..., np.newaxis] * points
+    transmission = np.exp(-extinction_coef * depth)
+    # PAR absorbed per square meter leaf in each layer
+    shaded_PAR = np.asarray(extinction_coef * (1 - direct_fraction) * PAR_above_canopy)[..., np.newaxis] \
+        * transmission + np.asarray(PAR_IntLamp / LAI)[..., np.newaxis]
+    sunlit_PAR = shaded_PAR + np.asarray(extinction_coef * direct_fraction * PAR_above_canopy)[..., np.newaxis]
+
+    electron_transport_shaded = leaf_electron_transport(potential_leaf_electron_transport_rate, shaded_PAR)
+    electron_transport_sunlit = leaf_electron_transport(potential_leaf_electron_transport_rate, sunlit_PAR)
+    layer_electron_transport_rate = electron_transport_shaded \
+        + transmission * (electron_transport_sunlit - electron_transport_shaded)
+    return LAI * np.sum(weights * layer_electron_transport_rate, axis=-1)
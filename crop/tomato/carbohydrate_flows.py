@@ -1,4 +1,7 @@
+import numpy as np
+
 from .CO2_concentration import co2_concentration_inside_stomata, co2_compensation
+from .canopy_layers import multi_layer_electron_transport
 from .electron_transport import electron_transport
 from .fruit_flow import fruit_set_of_first_development_stage
 from .inhibitions import *
@@ -26,13 +29,19 @@ def net_photosynthesis_rate(carbohydrate_amount_Buf, carbohydrate_amount_Leaf, a
                                       co2_compensation_point))
 
 
-def canopy_level_photosynthesis_rate(carbohydrate_amount_Leaf, canopy_t, stomata_co2_concentration, co2_compensation_point, PAR_Canopy):
+def canopy_level_photosynthesis_rate(carbohydrate_amount_Leaf, canopy_t, stomata_co2_concentration, co2_compensation_point, PAR_Canopy,
+                                     layers_num: int = 0):
     """
     Equations 9.12
     canopy_level_photosynthesis_rate = electron_transport_rate * (stomata_CO2_concentration - CO2_compensation_point) / (4 * (stomata_CO2_concentration + 2*CO2_compensation_point))
+    With layers_num > 0 the electron transport rate is integrated over layers_num canopy layers, see canopy_layers
     Returns: gross canopy photosynthesis rate [µmol {CO2} m^-2 s^-1]
     """
-    electron_transport_rate = electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy)
+    if layers_num:
+        electron_transport_rate = multi_layer_electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy,
+                                                                 layers_num=layers_num)
+    else:
+        electron_transport_rate = electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy)
     return electron_transport_rate * (stomata_co2_concentration - co2_compensation_point) \
            / (4 * (stomata_co2_concentration + 2 * co2_compensation_point))
 
@@ -182,7 +191,7 @@ def carbohydrate_flow_from_fruit_maintenance_respiration(carbohydrate_amount_Fru
     Returns: carbohydrates flow from fruit maintenance respiration [mg m^-2 s^-1]
     """
     return FRUIT_MAINTENANCE_RESPIRATION_COEF * Q10_M**(0.1*(last_24_canopy_t-25)) * carbohydrate_amount_Fruit_j \
-           * (1 - math.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF*RELATIVE_GROWTH_RATE))
+           * (1 - np.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF*RELATIVE_GROWTH_RATE))
 
 
 def carbohydrate_flow_from_leaf_maintenance_respiration(carbohydrate_amount_Leaf, last_24_canopy_t):
@@ -193,7 +202,7 @@ def carbohydrate_flow_from_leaf_maintenance_respiration(carbohydrate_amount_Leaf
     Returns: carbohydrates flow from leaf maintenance respiration [mg m^-2 s^-1]
     """
     return LEAF_MAINTENANCE_RESPIRATION_COEF * Q10_M**(0.1*(last_24_canopy_t-25)) * carbohydrate_amount_Leaf \
-           * (1 - math.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF*RELATIVE_GROWTH_RATE))
+           * (1 - np.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF*RELATIVE_GROWTH_RATE))
 
 
 def carbohydrate_flow_from_stem_maintenance_respiration(carbohydrate_amount_Stem, last_24_canopy_t):
@@ -204,7 +213,7 @@ def carbohydrate_flow_from_stem_maintenance_respiration(carbohydrate_amount_Stem
     Returns: carbohydrates flow from stem maintenance respiration [mg m^-2 s^-1]
     """
     return STEM_MAINTENANCE_RESPIRATION_COEF * Q10_M**(0.1*(last_24_canopy_t-25)) * carbohydrate_amount_Stem \
-           * (1 - math.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF*RELATIVE_GROWTH_RATE))
+           * (1 - np.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF*RELATIVE_GROWTH_RATE))
 
 
 def leaf_harvest_rate(carbohydrate_amount_Leaf):
@@ -216,3 +225,14 @@ def leaf_harvest_rate(carbohydrate_amount_Leaf):
     max_stored_leaves_carbohydrates = maximum_carbohydrates_stored_in_the_leaves()
     return smoothed_conditional_function(carbohydrate_amount_Leaf, -5e-5, max_stored_leaves_carbohydrates) \
            * (carbohydrate_amount_Leaf - max_stored_leaves_carbohydrates)
+
+
+def leaf_harvest_rate_derivative(carbohydrate_amount_Leaf):
+    """
+    Derivative of Equations 9.47, B.5 to carbohydrate_amount_Leaf
+    d carbohydrate_flow_LeafHar / d carbohydrate_amount_Leaf = S_ + S_ * (1 - S_) * 5e-5 * (carbohydrate_amount_Leaf - maximum_carbohydrates_stored_in_the_leaves)
+    Returns: the rate of the leaf pruning [s^-1]
+    """
+    max_stored_leaves_carbohydrates = maximum_carbohydrates_stored_in_the_leaves()
+    switch = smoothed_conditional_function(carbohydrate_amount_Leaf, -5e-5, max_stored_leaves_carbohydrates)
+    return switch + switch * (1 - switch) * 5e-5 * (carbohydrate_amount_Leaf - max_stored_leaves_carbohydrates)
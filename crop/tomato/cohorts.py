@@ -0,0 +1,125 @@
+"""Tomato cohorts
+
+Several plantings of tomato with their own planting time share one greenhouse climate. Each cohort has its own
+carbohydrate buffer, fruit stages, leaves, temperature sum and 24 hour mean temperature, and occupies a fraction of the
+greenhouse floor. The states of a cohort are per square meter of the floor it occupies, so it sees the greenhouse
+climate and PAR per square meter like a single crop would.
+
+The states of all cohorts are one array of shape (..., n_cohorts, CROP_STATES_SIZE), the cohort axis is the
+second to last axis. cohort_states gives a CropStates whose fields are arrays over the cohorts, and
+cohort_derivatives evaluates all cohorts with one call of crop_derivatives, so more cohorts only widen the arrays.
+The climate model sees the floor-weighted totals of total_leaf_area_index and CohortClimateCoupling.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from crop_model import CropClimateCoupling
+from data_models import ClimateStates
+from .crop_model import CropStates, CROP_STATES_SIZE, crop_states_from_vector, crop_states_to_vector
+from .state_variables import carbohydrate_flow_from_air_to_buffer, crop_derivatives
+from .tomato_constants import CO2_TO_CH2O_MASS_RATIO
+from .utils import leaf_area_index
+
+
+class CohortPopulation(NamedTuple):
+    states: np.ndarray  # the states of the cohorts, shape (..., n_cohorts, CROP_STATES_SIZE)
+    floor_fractions: np.ndarray  # the part of the greenhouse floor occupied by each cohort [-]
+    planting_times: np.ndarray  # the time each cohort is planted, from the start of the simulation [s]
+
+    @property
+    def n_cohorts(self) -> int:
+        return len(self.floor_fractions)
+
+
+def cohort_population(initial_states, floor_fractions=None, planting_times=None) -> CohortPopulation:
+    """
+    Args:
+        initial_states: the states of each cohort at planting, a sequence of CropStates or an array of shape
+            (n_cohorts, CROP_STATES_SIZE)
+        floor_fractions: the part of the floor occupied by each cohort, by default the floor is shared equally [-]
+        planting_times: the planting time of each cohort, by default all cohorts are planted at the start [s]
+
+    Returns: the population
+    """
+    if isinstance(initial_states, np.ndarray):
+        states = np.array(initial_states, dtype=float)
+    else:
+        states = np.stack([crop_states_to_vector(cohort) for cohort in initial_states])
+    if states.ndim != 2 or states.shape[-1] != CROP_STATES_SIZE:
+        raise ValueError(f'The cohort states need the shape (n_cohorts, {CROP_STATES_SIZE})')
+    n_cohorts = len(states)
+    if floor_fractions is None:
+        floor_fractions = np.full(n_cohorts, 1 / n_cohorts)
+    if planting_times is None:
+        planting_times = np.zeros(n_cohorts)
+    floor_fractions = np.asarray(floor_fractions, dtype=float)
+    planting_times = np.asarray(planting_times, dtype=float)
+    if floor_fractions.shape != (n_cohorts,) or planting_times.shape != (n_cohorts,):
+        raise ValueError('floor_fractions and planting_times need one value per cohort')
+    if np.any(floor_fractions < 0) or np.sum(floor_fractions) > 1 + 1e-9:
+        raise ValueError('The floor fractions must be positive and sum to at most 1')
+    return CohortPopulation(states=states, floor_fractions=floor_fractions, planting_times=planting_times)
+
+
+def cohort_states(states) -> CropStates:
+    """
+    Returns: the states of all cohorts, each field is a view with the cohort axis, e.g. carbohydrate_amount_Buf of
+    shape (..., n_cohorts) and carbohydrate_amount_Fruits of shape (..., n_cohorts, FRUIT_DEVELOPMENT_STAGES_NUM)
+    """
+    return crop_states_from_vector(states)
+
+
+def planted_cohorts(population: CohortPopulation, time) -> np.ndarray:
+    """
+    Returns: True for the cohorts planted at the time [s]
+    """
+    return population.planting_times <= time
+
+
+def cohort_derivatives(states, climate_vec, planted=None, fast: bool = False) -> np.ndarray:
+    """
+    The derivatives of all cohorts in one evaluation
+    Args:
+        states: the states of the cohorts, shape (..., n_cohorts, CROP_STATES_SIZE)
+        climate_vec: the climate states shared by the cohorts, shape (..., n_climate_states)
+        planted: the planted cohorts, see planted_cohorts, the states of the others are held. None if all are planted
+        fast: interpolate the fruit growth rates in the fruit growth table
+
+    Returns: The derivatives of the states of the cohorts, shape (..., n_cohorts, CROP_STATES_SIZE)
+    """
+    derivatives = crop_derivatives(states, np.asarray(climate_vec, dtype=float)[..., np.newaxis, :], fast)
+    if planted is not None:
+        derivatives *= np.asarray(planted)[..., np.newaxis]
+    return derivatives
+
+
+def total_leaf_area_index(states, floor_fractions, planted=None):
+    """
+    Equation 9.5 summed over the cohorts, weighted by the floor they occupy
+    Returns: leaf area index of the greenhouse [m^2 {leaf} m^-2]
+    """
+    weights = floor_fractions if planted is None else floor_fractions * planted
+    return np.sum(weights * leaf_area_index(cohort_states(states).carbohydrate_amount_Leaf), axis=-1)
+
+
+class CohortClimateCoupling(CropClimateCoupling):
+    """
+    The coupling of a cohort population to the climate model.
+    The crop states are the cohort_states of the population, the uptake of the cohorts is weighted by their floor.
+    For a batch of greenhouses the fields of the climate states need a trailing axis of length 1 for the cohort axis.
+    """
+
+    def __init__(self, floor_fractions, planted=None):
+        self.floor_fractions = np.asarray(floor_fractions, dtype=float)
+        self.planted = planted
+
+    def canopy_co2_uptake(self, crop_states: CropStates, climate_states: ClimateStates) -> float:
+        """
+        Equation 9.10 for each cohort
+        mass_co2_flux_AirCanopy = sum(floor_fraction * CO2_TO_CH2O_MASS_RATIO * carbohydrate_flow_AirBuf)
+        Returns: the net CO2 flux from the greenhouse air to the canopy [mg {CO2} m^-2 s^-1]
+        """
+        weights = self.floor_fractions if self.planted is None else self.floor_fractions * self.planted
+        return np.sum(weights * CO2_TO_CH2O_MASS_RATIO
+                      * carbohydrate_flow_from_air_to_buffer(crop_states, climate_states), axis=-1)
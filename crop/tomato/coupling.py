@@ -0,0 +1,15 @@
+from crop_model import CropClimateCoupling
+from data_models import ClimateStates
+from .crop_model import CropStates
+from .state_variables import carbohydrate_flow_from_air_to_buffer
+from .tomato_constants import CO2_TO_CH2O_MASS_RATIO
+
+
+class TomatoClimateCoupling(CropClimateCoupling):
+    def canopy_co2_uptake(self, crop_states: CropStates, climate_states: ClimateStates) -> float:
+        """
+        The CO2 fixed by the net photosynthesis of the buffer, Equation 9.10
+        mass_co2_flux_AirCanopy = CO2_TO_CH2O_MASS_RATIO * carbohydrate_flow_AirBuf
+        Returns: the net CO2 flux from the greenhouse air to the canopy [mg {CO2} m^-2 s^-1]
+        """
+        return CO2_TO_CH2O_MASS_RATIO * carbohydrate_flow_from_air_to_buffer(crop_states, climate_states)
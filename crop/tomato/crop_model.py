@@ -1,5 +1,8 @@
 from typing import NamedTuple
 
+import numpy as np
+
+from state_arrays import array_states_class
 from .tomato_constants import *
 
 
@@ -13,3 +16,40 @@ class CropStates(NamedTuple):
     sum_canopy_t: float
     last_24_canopy_t: float
 
+
+
+# Layout of the crop state vector: the buffer, the carbohydrates and numbers of the fruit stages, then the other states
+FRUITS_SLICE = slice(1, 1 + FRUIT_DEVELOPMENT_STAGES_NUM)
+NUMBERS_SLICE = slice(1 + FRUIT_DEVELOPMENT_STAGES_NUM, 1 + 2 * FRUIT_DEVELOPMENT_STAGES_NUM)
+CROP_STATES_SIZE = 2 * FRUIT_DEVELOPMENT_STAGES_NUM + 6
+
+
+def crop_states_from_vector(vector) -> CropStates:
+    """
+    The crop states of a vector of shape (..., CROP_STATES_SIZE), the fields are views on the vector
+    """
+    vector = np.asarray(vector, dtype=float)
+    tail = NUMBERS_SLICE.stop
+    return CropStates(carbohydrate_amount_Buf=vector[..., 0],
+                      carbohydrate_amount_Fruits=vector[..., FRUITS_SLICE],
+                      number_Fruits=vector[..., NUMBERS_SLICE],
+                      carbohydrate_amount_Leaf=vector[..., tail],
+                      carbohydrate_amount_Stem=vector[..., tail + 1],
+                      dry_matter_Har=vector[..., tail + 2],
+                      sum_canopy_t=vector[..., tail + 3],
+                      last_24_canopy_t=vector[..., tail + 4])
+
+
+def crop_states_to_vector(states: CropStates) -> np.ndarray:
+    """
+    The inverse of crop_states_from_vector
+    """
+    stage_fields = ('carbohydrate_amount_Fruits', 'number_Fruits')
+    return np.concatenate([np.asarray(field, dtype=float) if name in stage_fields
+                           else np.asarray(field, dtype=float)[..., np.newaxis]
+                           for name, field in zip(CropStates._fields, states)], axis=-1)
+
+
+# Array-backed crop states with the layout of crop_states_from_vector, see state_arrays
+CropStatesArray = array_states_class(CropStates, {'carbohydrate_amount_Fruits': FRUIT_DEVELOPMENT_STAGES_NUM,
+                                                  'number_Fruits': FRUIT_DEVELOPMENT_STAGES_NUM})
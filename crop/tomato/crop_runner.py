@@ -0,0 +1,88 @@
+"""Crop-only runs
+
+Integrates the tomato crop states driven by recorded climate instead of the coupled climate model, e.g. to forecast
+the yield of many measured or simulated seasons. The crop only depends on the canopy temperature, the CO2
+concentration of the air and the PAR absorbed by the canopy, so these three series are the whole input.
+
+The series have the time axis last and any leading batch axes, e.g. (n_seasons, n_steps), and all seasons are
+integrated together: every step evaluates crop_derivatives_of_climate once for the whole batch.
+
+The leaf pruning of Equation 9.47 removes the leaves above the maximum within seconds, which makes an explicit step
+of the length of a climate record unstable. The integration is a semi-implicit Euler step with the sample period
+as step: the leaves are linearly implicit in the pruning, the other states are explicit.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from .crop_model import CropStates, CROP_STATES_SIZE, NUMBERS_SLICE, crop_states_from_vector, crop_states_to_vector
+from .carbohydrate_flows import leaf_harvest_rate_derivative
+from .state_variables import crop_derivatives_of_climate
+
+
+class CropRun(NamedTuple):
+    states: np.ndarray  # the crop states at the end of the run, shape (..., CROP_STATES_SIZE)
+    trajectory: np.ndarray  # the recorded states, shape (n_records, ..., CROP_STATES_SIZE), None if not kept
+    record_steps: np.ndarray  # the step of each recorded state
+
+    @property
+    def final_states(self) -> CropStates:
+        return crop_states_from_vector(self.states)
+
+    @property
+    def dry_matter_Har(self):
+        """The harvested dry matter at the end of the run [mg {DM} m^-2]"""
+        return self.final_states.dry_matter_Har
+
+
+def _record(trajectory, writer, index: int, states):
+    if writer is None:
+        trajectory[index] = states
+    else:
+        writer.record(states)
+
+
+def run_crop(initial_states, t_Canopy, co2_Air, PAR_Canopy, dt: float, record_every: int = 0,
+             fast: bool = True, layers_num: int = 0, photosynthesis_surrogate=None, writer=None) -> CropRun:
+    """
+    Integrate the crop states over recorded climate series
+    Args:
+        initial_states: the crop states at the first sample, a CropStates or an array of shape (..., CROP_STATES_SIZE)
+            broadcastable to the batch shape of the series
+        t_Canopy: canopy temperature, shape (..., n_steps) [°C]
+        co2_Air: CO2 concentration of the greenhouse air, shape (..., n_steps) [mg m^-3]
+        PAR_Canopy: PAR absorbed by the canopy, shape (..., n_steps) [µmol {photons} m^-2 s^-1]
+        dt: the time between two samples [s]
+        record_every: record the states every record_every steps, 0 to only return the final states
+        fast, layers_num, photosynthesis_surrogate: see crop_derivatives
+        writer: a trajectory_writer.TrajectoryWriter with the row shape of the states which receives the recorded
+            states on disk instead of the trajectory, see record_every
+
+    Returns: the states at the last sample and the recorded trajectory
+    """
+    if isinstance(initial_states, CropStates):
+        initial_states = crop_states_to_vector(initial_states)
+    t_Canopy, co2_Air, PAR_Canopy = np.broadcast_arrays(np.asarray(t_Canopy, dtype=float),
+                                                        np.asarray(co2_Air, dtype=float),
+                                                        np.asarray(PAR_Canopy, dtype=float))
+    batch_shape = t_Canopy.shape[:-1]
+    n_steps = t_Canopy.shape[-1]
+    states = np.array(np.broadcast_to(initial_states, batch_shape + (CROP_STATES_SIZE,)), dtype=float)
+    if states.shape[-1] != CROP_STATES_SIZE:
+        raise ValueError(f'The crop states need {CROP_STATES_SIZE} entries on the last axis')
+
+    record_steps = np.arange(0, n_steps, record_every) if record_every else np.zeros(0, dtype=int)
+    trajectory = np.empty((len(record_steps),) + states.shape) if record_every and writer is None else None
+
+    leaf = NUMBERS_SLICE.stop
+    for step in range(n_steps - 1):
+        if record_every and step % record_every == 0:
+            _record(trajectory, writer, step // record_every, states)
+        slope = crop_derivatives_of_climate(states, t_Canopy[..., step], co2_Air[..., step], PAR_Canopy[..., step],
+                                            fast, layers_num, photosynthesis_surrogate)
+        # Below the maximum the smoothed pruning decreases with the leaves, only its stabilizing part is implicit
+        slope[..., leaf] /= 1 + dt * np.maximum(leaf_harvest_rate_derivative(states[..., leaf]), 0)
+        states += dt * slope
+    if record_every and (n_steps - 1) % record_every == 0:
+        _record(trajectory, writer, -1, states)
+    return CropRun(states=states, trajectory=trajectory, record_steps=record_steps)
@@ -1,6 +1,6 @@
-import math
+import numpy as np
 
-from ...constants import *
+from constants import *
 from .utils import leaf_area_index
 from .tomato_constants import *
 
@@ -19,7 +19,7 @@ def electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy):
     """
     potential_electron_transport_rate = potential_electron_transport(carbohydrate_amount_Leaf, canopy_t)
     return (potential_electron_transport_rate + PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR * PAR_Canopy
-            - math.sqrt((potential_electron_transport_rate + PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR * PAR_Canopy) ** 2
+            - np.sqrt((potential_electron_transport_rate + PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR * PAR_Canopy) ** 2
                         - 4 * ELECTRON_TRANSPORT_RATE_CURVATURE * potential_electron_transport_rate
                         * PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR * PAR_Canopy)) \
             / (2 * ELECTRON_TRANSPORT_RATE_CURVATURE)
@@ -40,10 +40,10 @@ def potential_electron_transport(carbohydrate_amount_Leaf, canopy_t):
     reference_canopy_t = canopy_t + 273.15
     max_canopy_electron_transport_rate_at_25 = max_canopy_electron_transport_at_25(carbohydrate_amount_Leaf)
     return max_canopy_electron_transport_rate_at_25 \
-        * math.exp(ACTIVATION_ENERGY_JPOT
+        * np.exp(ACTIVATION_ENERGY_JPOT
                    * (reference_canopy_t - REFERENCE_TEMPERATURE_JPOT)/(M_GAS*reference_canopy_t*REFERENCE_TEMPERATURE_JPOT)) \
-        * (1+math.exp((ENTROPY_TERM_JPOT * REFERENCE_TEMPERATURE_JPOT - DEACTIVATION_ENERGY_JPOT)/(M_GAS*REFERENCE_TEMPERATURE_JPOT))) \
-        / (1+math.exp((ENTROPY_TERM_JPOT * reference_canopy_t - DEACTIVATION_ENERGY_JPOT)/(M_GAS*reference_canopy_t)))
+        * (1+np.exp((ENTROPY_TERM_JPOT * REFERENCE_TEMPERATURE_JPOT - DEACTIVATION_ENERGY_JPOT)/(M_GAS*REFERENCE_TEMPERATURE_JPOT))) \
+        / (1+np.exp((ENTROPY_TERM_JPOT * reference_canopy_t - DEACTIVATION_ENERGY_JPOT)/(M_GAS*reference_canopy_t)))
 
 
 def max_canopy_electron_transport_at_25(carbohydrate_amount_Leaf):
@@ -0,0 +1,158 @@
+"""All fruit development stages at once
+
+The per-stage functions of carbohydrate_flows and fruit_flow evaluate one stage j per call and recompute the flows
+shared by all stages, e.g. the Gompertz growth rates of Equation 9.37, so one crop derivative costs O(N^2) with
+N = FRUIT_DEVELOPMENT_STAGES_NUM. fruit_stage_flows computes every stage flow in one pass of array operations.
+The last axis of the stage arrays is the stage axis, stage j is at index j - 1.
+"""
+from functools import partial
+from typing import NamedTuple
+
+import numpy as np
+
+from physics_utils import InterpolationTable
+from .carbohydrate_flows import carbohydrate_flow_from_buffer_to_fruits
+from .fruit_flow import fruit_set_of_first_development_stage
+from .inhibitions import fruit_flow_inhibition
+from . import tomato_constants
+from .tomato_constants import *
+from .utils import fruit_development
+
+# Range and step of the 24 hour mean canopy temperature grid of the fruit growth table (°C).
+# The fruit development rate of Equation 9.32 vanishes below 0.66 °C.
+GROWTH_TABLE_MIN_T = 5
+GROWTH_TABLE_MAX_T = 40
+GROWTH_TABLE_STEP_T = 0.02
+
+
+class FruitStageFlows(NamedTuple):
+    carbohydrate_flow_BufFruit: np.ndarray  # buffer to stage j, Equations 9.35, 9.36 [mg m^-2 s^-1]
+    carbohydrate_flow_FruitFruit: np.ndarray  # stage j to stage j+1, the last one is the harvest, Equation 9.34 [mg m^-2 s^-1]
+    carbohydrate_flow_FruitAir: np.ndarray  # maintenance respiration of stage j, Equation 9.45 [mg m^-2 s^-1]
+    number_flow_BufFruit_1: float  # fruit set of the first stage, Equation 9.29 [fruits m^-2 s^-1]
+    number_flow_FruitFruit: np.ndarray  # stage j to stage j+1, the last one is the harvest, Equation 9.31 [fruits m^-2 s^-1]
+
+    @property
+    def carbohydrate_flow_FruitHar(self):
+        return self.carbohydrate_flow_FruitFruit[..., -1]
+
+    @property
+    def carbohydrate_amount_Fruits(self):
+        """
+        Equation 9.2 for all stages
+        Returns: the derivatives of the carbohydrates stored in the stages [mg m^-2 s^-1]
+        """
+        inflow = np.zeros_like(self.carbohydrate_flow_FruitFruit)
+        inflow[..., 1:] = self.carbohydrate_flow_FruitFruit[..., :-1]
+        return self.carbohydrate_flow_BufFruit + inflow - self.carbohydrate_flow_FruitFruit \
+            - self.carbohydrate_flow_FruitAir
+
+    @property
+    def number_Fruits(self):
+        """
+        Equation 9.3 for all stages, the first stage is fed by the fruit set
+        Returns: the derivatives of the number of fruits in the stages [fruits m^-2 s^-1]
+        """
+        inflow = np.zeros_like(self.number_flow_FruitFruit)
+        inflow[..., 0] = self.number_flow_BufFruit_1
+        inflow[..., 1:] = self.number_flow_FruitFruit[..., :-1]
+        return inflow - self.number_flow_FruitFruit
+
+
+def _gompertz_fruit_growth(last_24_canopy_t, potential_fruit_dry_weight, development_rate_coef_1,
+                           development_rate_coef_2, stages_num):
+    # Equation 9.38 with explicit constants, the stage axis is appended to last_24_canopy_t
+    last_24_canopy_t = np.asarray(last_24_canopy_t, dtype=float)[..., np.newaxis]
+    Fruit_Growth_Period = 1 / ((development_rate_coef_1 + development_rate_coef_2 * last_24_canopy_t) * 86400)
+    fruit_development_time = -93.4 + 548.0 * Fruit_Growth_Period
+    curve_steepness = 1 / (2.44 + 403.0 * fruit_development_time)
+    days_after_fruit_set = (np.arange(1, stages_num + 1) - 0.5) * Fruit_Growth_Period / stages_num
+    return potential_fruit_dry_weight * np.exp(-np.exp(-curve_steepness * (days_after_fruit_set
+                                                                          - fruit_development_time)))
+
+
+def _gompertz_fruit_growth_of_constants(constants: tuple, last_24_canopy_t):
+    return _gompertz_fruit_growth(last_24_canopy_t, *constants)
+
+
+def _gompertz_constants() -> tuple:
+    # The constants of Equation 9.38, read from tomato_constants at call time
+    return (tomato_constants.POTENTIAL_FRUIT_DRY_WEIGHT, tomato_constants.FRUIT_DEVELOPMENT_RATE_COEF_1,
+            tomato_constants.FRUIT_DEVELOPMENT_RATE_COEF_2, tomato_constants.FRUIT_DEVELOPMENT_STAGES_NUM)
+
+
+_fruit_growth_table = None
+
+
+def fruit_growth_table() -> InterpolationTable:
+    """
+    The fruit growth rates of all stages tabulated between GROWTH_TABLE_MIN_T and GROWTH_TABLE_MAX_T of 24 hour mean
+    canopy temperatures, rebuilt when one of the constants of Equation 9.38 changed.
+    Its max_relative_error attribute reports the maximum interpolation error relative to the exact rate of each stage.
+    """
+    global _fruit_growth_table
+    constants = _gompertz_constants()
+    if _fruit_growth_table is None or _fruit_growth_table[0] != constants:
+        table = InterpolationTable(partial(_gompertz_fruit_growth_of_constants, constants),
+                                   GROWTH_TABLE_MIN_T, GROWTH_TABLE_MAX_T, GROWTH_TABLE_STEP_T)
+        _fruit_growth_table = constants, table
+    return _fruit_growth_table[1]
+
+
+def fruit_growth_rates(last_24_canopy_t, fast: bool = False):
+    """
+    Equation 9.38 for all stages
+    With fast=True the rates are interpolated in fruit_growth_table()
+    Returns: the fruit growth rate of each stage [mg {CH2O} fruit^-1 d^-1]
+    """
+    if fast:
+        return fruit_growth_table()(last_24_canopy_t)
+    return _gompertz_fruit_growth(last_24_canopy_t, *_gompertz_constants())
+
+
+def fruit_stage_flows(carbohydrate_amount_Buf, carbohydrate_amount_Fruits, number_Fruits, canopy_t,
+                      sum_canopy_t, last_24_canopy_t, fast: bool = False,
+                      carbohydrate_flow_BufFruits=None) -> FruitStageFlows:
+    """
+    The carbohydrate and number flows of all fruit development stages in one pass
+    Args:
+        carbohydrate_amount_Fruits: the carbohydrates stored in each stage [mg m^-2]
+        number_Fruits: the number of fruits in each stage [fruits m^-2]
+        fast: interpolate the fruit growth rates in fruit_growth_table()
+        carbohydrate_flow_BufFruits: Equation 9.24 if already evaluated by the caller [mg m^-2 s^-1]
+
+    Returns: the flows of all stages
+    """
+    carbohydrate_amount_Fruits = np.asarray(carbohydrate_amount_Fruits, dtype=float)
+    number_Fruits = np.asarray(number_Fruits, dtype=float)
+    fruit_growth_rate = fruit_growth_rates(last_24_canopy_t, fast)
+    # Per-crop factors get a stage axis to broadcast over the stages
+    development_rate = np.asarray(fruit_development(last_24_canopy_t) * FRUIT_DEVELOPMENT_STAGES_NUM)[..., np.newaxis]
+
+    # Equations 9.35, 9.36, 9.37
+    if carbohydrate_flow_BufFruits is None:
+        carbohydrate_flow_BufFruits = carbohydrate_flow_from_buffer_to_fruits(carbohydrate_amount_Buf, canopy_t,
+                                                                              sum_canopy_t, last_24_canopy_t)
+    number_flow_BufFruit_1 = fruit_set_of_first_development_stage(last_24_canopy_t, carbohydrate_flow_BufFruits)
+    carbohydrate_flow_BufFruit_1 = fruit_growth_rate[..., 0] * FRUIT_DEVELOPMENT_STAGES_NUM * number_flow_BufFruit_1
+    weighted_growth = number_Fruits * fruit_growth_rate
+    # The stages after the first share the remainder of carbohydrate_flow_BufFruits
+    conversion_factor = 1 / (1e-10 + np.sum(weighted_growth[..., 1:], axis=-1))
+    carbohydrate_flow_BufFruit = (conversion_factor * (carbohydrate_flow_BufFruits - carbohydrate_flow_BufFruit_1)
+                                  )[..., np.newaxis] * weighted_growth
+    carbohydrate_flow_BufFruit[..., 0] = carbohydrate_flow_BufFruit_1
+
+    # Equations 9.31, 9.34, 9.45
+    number_flow_FruitFruit = development_rate * np.asarray(fruit_flow_inhibition(sum_canopy_t))[..., np.newaxis] \
+        * number_Fruits
+    carbohydrate_flow_FruitFruit = development_rate * carbohydrate_amount_Fruits
+    maintenance_respiration_coef = FRUIT_MAINTENANCE_RESPIRATION_COEF \
+        * Q10_M ** (0.1 * (np.asarray(last_24_canopy_t)[..., np.newaxis] - 25)) \
+        * (1 - np.exp(-MAINTENANCE_RESPIRATION_FUNCTION_REGRESSION_COEF * RELATIVE_GROWTH_RATE))
+    carbohydrate_flow_FruitAir = maintenance_respiration_coef * carbohydrate_amount_Fruits
+
+    return FruitStageFlows(carbohydrate_flow_BufFruit=carbohydrate_flow_BufFruit,
+                           carbohydrate_flow_FruitFruit=carbohydrate_flow_FruitFruit,
+                           carbohydrate_flow_FruitAir=carbohydrate_flow_FruitAir,
+                           number_flow_BufFruit_1=number_flow_BufFruit_1,
+                           number_flow_FruitFruit=number_flow_FruitFruit)
@@ -1,4 +1,4 @@
-import math
+import numpy as np
 
 from crop.tomato.utils import smoothed_conditional_function
 from .tomato_constants import *
@@ -34,9 +34,9 @@ def crop_development_stage_inhibition(sum_canopy_t):
     Equation 9.27, B.6
     Returns: The gradual increase in fruit growth rate depending on tomato development stage [-]
     """
-    return 0.5 * ((sum_canopy_t / SUM_END_T) + math.sqrt((sum_canopy_t / SUM_END_T) ** 2 + 1e-4)) \
+    return 0.5 * ((sum_canopy_t / SUM_END_T) + np.sqrt((sum_canopy_t / SUM_END_T) ** 2 + 1e-4)) \
            - 0.5 * ((sum_canopy_t - SUM_END_T / SUM_END_T)
-                    + math.sqrt((sum_canopy_t - SUM_END_T / SUM_END_T) ** 2 + 1e-4))
+                    + np.sqrt((sum_canopy_t - SUM_END_T / SUM_END_T) ** 2 + 1e-4))
 
 
 def fruit_flow_inhibition(sum_canopy_t):
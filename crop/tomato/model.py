@@ -0,0 +1,37 @@
+import numpy as np
+
+from crop_model import CropModel
+from .crop_model import CROP_STATES_SIZE, crop_states_from_vector
+from .state_variables import crop_derivatives
+from .tomato_constants import CARBOHYDRATE_TO_DRY_MATTER_CONVERSION
+from .utils import leaf_area_index
+
+
+class TomatoModel(CropModel):
+    """
+    The tomato model of Vanthoor, chapter 9, on the state vector of crop_states_to_vector
+    """
+    observation_names = ('leaf_area_index', 'dry_matter_Fruits', 'number_Fruits', 'dry_matter_Har')
+    states_size = CROP_STATES_SIZE
+
+    def __init__(self, fast: bool = False, layers_num: int = 0, photosynthesis_surrogate=None):
+        """
+        Args:
+            fast: interpolate the fruit growth rates in the fruit growth table
+            layers_num: the number of layers of the multi-layer canopy, 0 for the big-leaf canopy
+            photosynthesis_surrogate: a PhotosynthesisSurrogate replacing the exact photosynthesis
+        """
+        self.fast = fast
+        self.layers_num = layers_num
+        self.photosynthesis_surrogate = photosynthesis_surrogate
+
+    def derivatives(self, crop_vec, climate_vec) -> np.ndarray:
+        return crop_derivatives(crop_vec, climate_vec, self.fast, self.layers_num, self.photosynthesis_surrogate)
+
+    def observations(self, crop_vec) -> np.ndarray:
+        crop_states = crop_states_from_vector(crop_vec)
+        return np.stack((leaf_area_index(crop_states.carbohydrate_amount_Leaf),
+                         CARBOHYDRATE_TO_DRY_MATTER_CONVERSION * np.sum(crop_states.carbohydrate_amount_Fruits,
+                                                                        axis=-1),
+                         np.sum(crop_states.number_Fruits, axis=-1),
+                         crop_states.dry_matter_Har), axis=-1)
@@ -0,0 +1,166 @@
+"""Photosynthesis surrogate
+
+The net canopy photosynthesis of Equations 9.10 - 9.23 without the buffer inhibition,
+    gross_canopy_photosynthesis_rate - photorespiration_rate,
+only depends on the CO2 concentration of the air, the canopy temperature, the PAR absorbed by the canopy and the
+carbohydrates in the leaves. Its expensive part is the electron transport rate of Equations 9.14 - 9.16, with three
+exponentials and a square root, or the light response of every layer of the multi-layer canopy. The CO2 enters only
+through the rational functions of Equations 9.12, 9.13, 9.21 and 9.23.
+PhotosynthesisSurrogate tabulates the electron transport rate on a regular grid of the canopy temperature, the PAR
+and the leaf carbohydrates, evaluates it by trilinear interpolation and applies the CO2 terms exactly. A table of three
+inputs stays small enough for the cache and the CO2 response has no interpolation error.
+Inputs outside the grid fall back to the exact path.
+
+The cost of the surrogate doesn't depend on the canopy: it pays off with the multi-layer canopy, whereas the
+array-valued big-leaf electron transport costs about as much as the interpolation.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from .CO2_concentration import co2_concentration_inside_stomata, co2_compensation
+from .canopy_layers import multi_layer_electron_transport
+from .carbohydrate_flows import canopy_level_photosynthesis_rate, photorespiration_rate
+from .electron_transport import electron_transport
+from .tomato_constants import LAI_Max, SPECIFIC_LEAF_AREA_INDEX
+
+
+class GridAxis(NamedTuple):
+    start: float
+    stop: float
+    num: int
+
+    @property
+    def step(self) -> float:
+        return (self.stop - self.start) / (self.num - 1)
+
+    @property
+    def points(self) -> np.ndarray:
+        return np.linspace(self.start, self.stop, self.num)
+
+
+class SurrogateGrid(NamedTuple):
+    # The default grid covers leaves up to LAI_Max
+    canopy_t: GridAxis = GridAxis(5, 40, 71)  # canopy temperature [°C]
+    PAR_Canopy: GridAxis = GridAxis(0, 2000, 81)  # PAR absorbed by the canopy [µmol {photons} m^-2 s^-1]
+    carbohydrate_amount_Leaf: GridAxis = GridAxis(0, LAI_Max / SPECIFIC_LEAF_AREA_INDEX, 31)  # [mg m^-2]
+
+
+class SurrogateErrors(NamedTuple):
+    max_absolute_error: float  # [µmol {CO2} m^-2 s^-1]
+    max_relative_error: float  # relative to the largest rate of the samples [-]
+    rms_error: float  # [µmol {CO2} m^-2 s^-1]
+    samples_num: int
+
+
+def net_canopy_photosynthesis(co2_Air, canopy_t, PAR_Canopy, carbohydrate_amount_Leaf, layers_num: int = 0):
+    """
+    Equations 9.10, 9.12, 9.13 without M_CH2O and the buffer inhibition
+    Returns: gross canopy photosynthesis rate minus photorespiration rate [µmol {CO2} m^-2 s^-1]
+    """
+    stomata_co2_concentration = co2_concentration_inside_stomata(co2_Air)
+    co2_compensation_point = co2_compensation(carbohydrate_amount_Leaf, canopy_t)
+    gross_canopy_photosynthesis_rate = canopy_level_photosynthesis_rate(carbohydrate_amount_Leaf, canopy_t,
+                                                                        stomata_co2_concentration,
+                                                                        co2_compensation_point, PAR_Canopy,
+                                                                        layers_num)
+    return gross_canopy_photosynthesis_rate - photorespiration_rate(gross_canopy_photosynthesis_rate,
+                                                                    stomata_co2_concentration, co2_compensation_point)
+
+
+def _net_canopy_photosynthesis_of_electron_transport(electron_transport_rate, co2_Air, canopy_t,
+                                                     carbohydrate_amount_Leaf):
+    # Equations 9.12, 9.13, 9.21, 9.23 for a given electron transport rate
+    stomata_co2_concentration = co2_concentration_inside_stomata(co2_Air)
+    co2_compensation_point = co2_compensation(carbohydrate_amount_Leaf, canopy_t)
+    gross_canopy_photosynthesis_rate = electron_transport_rate * (stomata_co2_concentration - co2_compensation_point) \
+        / (4 * (stomata_co2_concentration + 2 * co2_compensation_point))
+    return gross_canopy_photosynthesis_rate - photorespiration_rate(gross_canopy_photosynthesis_rate,
+                                                                    stomata_co2_concentration, co2_compensation_point)
+
+
+class PhotosynthesisSurrogate(object):
+    """
+    net_canopy_photosynthesis with the electron transport rate tabulated on a SurrogateGrid
+    """
+
+    def __init__(self, grid: SurrogateGrid = SurrogateGrid(), layers_num: int = 0):
+        """
+        Args:
+            grid: the axes of the table
+            layers_num: the canopy of the tabulated electron transport, see canopy_level_photosynthesis_rate
+        """
+        for axis in grid:
+            if axis.num < 2 or axis.stop <= axis.start:
+                raise ValueError(f'A grid axis needs at least two increasing points, got {axis}')
+        self.grid = grid
+        self.layers_num = layers_num
+        mesh = np.meshgrid(*(axis.points for axis in grid), indexing='ij', sparse=True)
+        self.values = np.ascontiguousarray(self._electron_transport(*mesh), dtype=float)
+        # Offsets of the 8 corners of a cell in the flat table, the first axis varies slowest
+        self._strides = np.array(self.values.strides) // self.values.itemsize
+        corners = np.array(np.meshgrid(*([0, 1],) * len(grid), indexing='ij')).reshape(len(grid), -1).T
+        self._corner_offsets = corners @ self._strides
+
+    def _electron_transport(self, canopy_t, PAR_Canopy, carbohydrate_amount_Leaf):
+        if self.layers_num:
+            return multi_layer_electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy,
+                                                  layers_num=self.layers_num)
+        return electron_transport(carbohydrate_amount_Leaf, canopy_t, PAR_Canopy)
+
+    def exact(self, co2_Air, canopy_t, PAR_Canopy, carbohydrate_amount_Leaf):
+        return net_canopy_photosynthesis(co2_Air, canopy_t, PAR_Canopy, carbohydrate_amount_Leaf, self.layers_num)
+
+    def electron_transport(self, canopy_t, PAR_Canopy, carbohydrate_amount_Leaf):
+        """
+        Equation 9.14 interpolated in the table, inputs outside the grid fall back to the exact rate
+        Returns: electron transport rate [µmol {e-} m^-2 s^-1]
+        """
+        inputs = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                       (canopy_t, PAR_Canopy, carbohydrate_amount_Leaf)))
+        shape = inputs[0].shape
+        flat_index = np.zeros(shape, dtype=np.intp)
+        weights = []
+        outside = np.zeros(shape, dtype=bool)
+        for x, axis, stride in zip(inputs, self.grid, self._strides):
+            position = (x - axis.start) / axis.step
+            index = np.clip(position.astype(np.intp), 0, axis.num - 2)
+            weights.append(position - index)
+            flat_index += index * stride
+            outside |= (position < 0) | (position > axis.num - 1)
+
+        # The values at the corners of the cells, interpolated along one axis after the other
+        result = self.values.ravel()[flat_index[..., np.newaxis] + self._corner_offsets]
+        for weight in weights:
+            result = result.reshape(shape + (2, -1))
+            lower = result[..., 0, :]
+            result = lower + weight[..., np.newaxis] * (result[..., 1, :] - lower)
+        result = result[..., 0]
+
+        if np.any(outside):
+            result[outside] = self._electron_transport(*(x[outside] for x in inputs))
+        return result
+
+    def __call__(self, co2_Air, canopy_t, PAR_Canopy, carbohydrate_amount_Leaf):
+        """
+        Returns: gross canopy photosynthesis rate minus photorespiration rate [µmol {CO2} m^-2 s^-1]
+        """
+        result = _net_canopy_photosynthesis_of_electron_transport(
+            self.electron_transport(canopy_t, PAR_Canopy, carbohydrate_amount_Leaf), co2_Air, canopy_t,
+            carbohydrate_amount_Leaf)
+        return result if np.ndim(result) else float(result)
+
+    def error_report(self, samples_num: int = 100000, seed: int = 0) -> SurrogateErrors:
+        """
+        Compare the surrogate with the exact path at random points inside the grid and at 300 - 2000 ppm CO2
+        Returns: the interpolation errors
+        """
+        rng = np.random.default_rng(seed)
+        samples = [rng.uniform(300, 2000, samples_num)] \
+            + [rng.uniform(axis.start, axis.stop, samples_num) for axis in self.grid]
+        exact = self.exact(*samples)
+        errors = np.abs(self(*samples) - exact)
+        return SurrogateErrors(max_absolute_error=float(np.max(errors)),
+                               max_relative_error=float(np.max(errors) / np.max(np.abs(exact))),
+                               rms_error=float(np.sqrt(np.mean(errors ** 2))),
+                               samples_num=samples_num)
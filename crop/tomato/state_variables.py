@@ -1,7 +1,20 @@
-from ...data_models import ClimateStates
-from .crop_model import CropStates
+from constants import ETA_MG_PPM
+from data_models import ClimateStates, climate_states_from_vector
+from .crop_model import CropStates, CROP_STATES_SIZE, FRUITS_SLICE, NUMBERS_SLICE, crop_states_from_vector
 from .carbohydrate_flows import *
 from .fruit_flow import fruit_flow_through_fruit_development_stage
+from .fruit_stages import FruitStageFlows, fruit_stage_flows
+
+
+def carbohydrate_flow_from_air_to_buffer(crop_states: CropStates, climate_states: ClimateStates):
+    """
+    Equation 9.10, with the greenhouse air CO2 concentration converted from mg m^-3 to ppm (Equation 9.21)
+    The same flow is taken from the greenhouse air by TomatoClimateCoupling.
+    Returns: The net photosynthesis rate [mg {CH2O} m^-2 s^-1]
+    """
+    return net_photosynthesis_rate(crop_states.carbohydrate_amount_Buf, crop_states.carbohydrate_amount_Leaf,
+                                   ETA_MG_PPM * climate_states.co2_Air, climate_states.t_Canopy,
+                                   climate_states.PAR_Canopy)
 
 
 def buffer_carbohydrates_amount(crop_states: CropStates, climate_states: ClimateStates):
@@ -11,10 +24,7 @@ def buffer_carbohydrates_amount(crop_states: CropStates, climate_states: Climate
           − carbohydrate_flow_BufLeaf − carbohydrate_flow_BufStem − carbohydrate_flow_BufAir
     Returns: The evolution of the carbohydrates in the buffer [mg m^-2 s^-1]
     """
-    carbohydrate_flow_AirBuf = net_photosynthesis_rate(crop_states.carbohydrate_amount_Buf,
-                                                       crop_states.carbohydrate_amount_Leaf, climate_states.co2_Air,
-                                                       climate_states.t_Canopy,
-                                                       climate_states.PAR_Canopy)
+    carbohydrate_flow_AirBuf = carbohydrate_flow_from_air_to_buffer(crop_states, climate_states)
     carbohydrate_flow_BufFruit = carbohydrate_flow_from_buffer_to_fruits(crop_states.carbohydrate_amount_Buf,
                                                                          climate_states.t_Canopy,
                                                                          crop_states.sum_canopy_t,
@@ -75,6 +85,16 @@ def number_of_fruits(jth: int, crop_states: CropStates):
     return number_flow_Fruit_jminus_Fruit_j - number_flow_Fruit_j_Fruit_jplus
 
 
+def fruit_development_stages(crop_states: CropStates, climate_states: ClimateStates) -> FruitStageFlows:
+    """
+    Equations 9.2 and 9.3 for all fruit development stages in one pass, see fruit_stages
+    Returns: The flows of all stages, with the derivatives as carbohydrate_amount_Fruits and number_Fruits
+    """
+    return fruit_stage_flows(crop_states.carbohydrate_amount_Buf, crop_states.carbohydrate_amount_Fruits,
+                             crop_states.number_Fruits, climate_states.t_Canopy, crop_states.sum_canopy_t,
+                             crop_states.last_24_canopy_t)
+
+
 def leaves_stored_carbohydrates_amount(crop_states: CropStates):
     """
     Equation 9.4
@@ -83,7 +103,7 @@ def leaves_stored_carbohydrates_amount(crop_states: CropStates):
     """
     carbohydrate_flow_BufLeaf = carbohydrate_flow_from_buffer_to_leaves(crop_states.carbohydrate_amount_Buf,
                                                                         crop_states.last_24_canopy_t)
-    carbohydrate_flow_LeafAir = carbohydrate_flow_from_leaf_maintenance_respiration(crop_states.carbohydrate_amount_Buf,
+    carbohydrate_flow_LeafAir = carbohydrate_flow_from_leaf_maintenance_respiration(crop_states.carbohydrate_amount_Leaf,
                                                                                     crop_states.last_24_canopy_t)
     carbohydrate_flow_LeafHar = leaf_harvest_rate(crop_states.carbohydrate_amount_Leaf)
     return carbohydrate_flow_BufLeaf - carbohydrate_flow_LeafAir - carbohydrate_flow_LeafHar
@@ -97,7 +117,7 @@ def stem_and_roots_stored_carbohydrates_amount(crop_states: CropStates):
     """
     carbohydrate_flow_BufStem = carbohydrate_flow_from_buffer_to_stem(crop_states.carbohydrate_amount_Buf,
                                                                       crop_states.last_24_canopy_t)
-    carbohydrate_flow_StemAir = carbohydrate_flow_from_stem_maintenance_respiration(crop_states.carbohydrate_amount_Buf,
+    carbohydrate_flow_StemAir = carbohydrate_flow_from_stem_maintenance_respiration(crop_states.carbohydrate_amount_Stem,
                                                                                     crop_states.last_24_canopy_t)
     return carbohydrate_flow_BufStem - carbohydrate_flow_StemAir
 
@@ -130,3 +150,97 @@ def _24_mean_temperature(crop_states: CropStates, climate_states: ClimateStates)
     Returns: The 24 hour mean canopy temperature [°C s^-1]
     """
     return 1 / DAY_MEAN_TEMP_TIME_CONSTANT * (PROCESS_GAIN * climate_states.t_Canopy - crop_states.last_24_canopy_t)
+
+
+def crop_derivatives(crop_vec, climate_vec, fast: bool = False, layers_num: int = 0,
+                     photosynthesis_surrogate=None) -> np.ndarray:
+    """
+    Equations 9.1 - 9.9 in one pass: every inhibition and flow is evaluated once and shared by all states.
+    The leading axes of crop_vec and climate_vec are batch axes, e.g. (lanes, CROP_STATES_SIZE).
+    Args:
+        crop_vec: the crop states, see crop_states_from_vector
+        climate_vec: the climate states, see climate_states_from_vector
+        fast: interpolate the fruit growth rates in the fruit growth table
+        layers_num: the number of layers of the multi-layer canopy, 0 for the big-leaf canopy
+        photosynthesis_surrogate: a PhotosynthesisSurrogate replacing Equations 9.12 - 9.23, with its own layers_num
+
+    Returns: The derivatives of the crop states, with the layout and the batch shape of crop_vec
+    """
+    climate_states = climate_states_from_vector(climate_vec)
+    return crop_derivatives_of_climate(crop_vec, climate_states.t_Canopy, climate_states.co2_Air,
+                                       climate_states.PAR_Canopy, fast, layers_num, photosynthesis_surrogate)
+
+
+def crop_derivatives_of_climate(crop_vec, canopy_t, co2_Air, PAR_Canopy, fast: bool = False, layers_num: int = 0,
+                                photosynthesis_surrogate=None) -> np.ndarray:
+    """
+    crop_derivatives of the only climate states the crop depends on
+    Args:
+        canopy_t: canopy temperature [°C]
+        co2_Air: CO2 concentration of the greenhouse air [mg m^-3]
+        PAR_Canopy: PAR absorbed by the canopy [µmol {photons} m^-2 s^-1]
+
+    Returns: The derivatives of the crop states, with the layout and the batch shape of crop_vec
+    """
+    crop_states = crop_states_from_vector(crop_vec)
+    carbohydrate_amount_Buf = crop_states.carbohydrate_amount_Buf
+    carbohydrate_amount_Leaf = crop_states.carbohydrate_amount_Leaf
+    last_24_canopy_t = crop_states.last_24_canopy_t
+
+    # Inhibitions, Equations 9.11, 9.27, 9.28, B.2, B.3
+    carbohydrates_saturation_inhibition = carbohydrates_saturation_photosynthesis_rate_inhibition(carbohydrate_amount_Buf)
+    instantaneous_temperature_inhibition = non_optimal_instantaneous_temperature_inhibition(canopy_t)
+    mean_temperature_inhibition = non_optimal_24_hour_canopy_temperatures_inhibition(last_24_canopy_t)
+    development_stage_inhibition = crop_development_stage_inhibition(crop_states.sum_canopy_t)
+    growth_rate = growth_rate_dependency_to_temperature(last_24_canopy_t)
+
+    # Equations 9.10 - 9.13, 9.21
+    if photosynthesis_surrogate is not None:
+        net_canopy_photosynthesis_rate = photosynthesis_surrogate(ETA_MG_PPM * co2_Air, canopy_t, PAR_Canopy,
+                                                                  carbohydrate_amount_Leaf)
+    else:
+        stomata_co2_concentration = co2_concentration_inside_stomata(ETA_MG_PPM * co2_Air)
+        co2_compensation_point = co2_compensation(carbohydrate_amount_Leaf, canopy_t)
+        gross_canopy_photosynthesis_rate = canopy_level_photosynthesis_rate(carbohydrate_amount_Leaf, canopy_t,
+                                                                            stomata_co2_concentration,
+                                                                            co2_compensation_point,
+                                                                            PAR_Canopy, layers_num)
+        net_canopy_photosynthesis_rate = gross_canopy_photosynthesis_rate \
+            - photorespiration_rate(gross_canopy_photosynthesis_rate, stomata_co2_concentration,
+                                    co2_compensation_point)
+    carbohydrate_flow_AirBuf = M_CH2O * carbohydrates_saturation_inhibition * net_canopy_photosynthesis_rate
+
+    # Equations 9.24, 9.25, 9.43
+    vegetative_growth = carbohydrates_saturation_inhibition * mean_temperature_inhibition * growth_rate
+    carbohydrate_flow_BufFruits = vegetative_growth * instantaneous_temperature_inhibition \
+        * development_stage_inhibition * POTENTIAL_FRUIT_GROWTH_RATE_COEF
+    carbohydrate_flow_BufLeaf = vegetative_growth * POTENTIAL_LEAF_GROWTH_RATE_COEF
+    carbohydrate_flow_BufStem = vegetative_growth * POTENTIAL_STEM_GROWTH_RATE_COEF
+    carbohydrate_flow_BufAir = FRUIT_GROWTH_RESPIRATION_COEF * carbohydrate_flow_BufFruits \
+        + LEAF_GROWTH_RESPIRATION_COEF * carbohydrate_flow_BufLeaf \
+        + STEM_GROWTH_RESPIRATION_COEF * carbohydrate_flow_BufStem
+
+    fruit_stages = fruit_stage_flows(carbohydrate_amount_Buf, crop_states.carbohydrate_amount_Fruits,
+                                     crop_states.number_Fruits, canopy_t, crop_states.sum_canopy_t,
+                                     last_24_canopy_t, fast, carbohydrate_flow_BufFruits)
+
+    # Equation 9.45, B.5
+    carbohydrate_flow_LeafAir = carbohydrate_flow_from_leaf_maintenance_respiration(carbohydrate_amount_Leaf,
+                                                                                    last_24_canopy_t)
+    carbohydrate_flow_StemAir = carbohydrate_flow_from_stem_maintenance_respiration(
+        crop_states.carbohydrate_amount_Stem, last_24_canopy_t)
+    carbohydrate_flow_LeafHar = leaf_harvest_rate(carbohydrate_amount_Leaf)
+
+    derivatives = np.empty(np.broadcast_shapes(np.shape(carbohydrate_amount_Buf), np.shape(canopy_t))
+                           + (CROP_STATES_SIZE,))
+    tail = NUMBERS_SLICE.stop
+    derivatives[..., 0] = carbohydrate_flow_AirBuf - carbohydrate_flow_BufFruits \
+        - carbohydrate_flow_BufLeaf - carbohydrate_flow_BufStem - carbohydrate_flow_BufAir
+    derivatives[..., FRUITS_SLICE] = fruit_stages.carbohydrate_amount_Fruits
+    derivatives[..., NUMBERS_SLICE] = fruit_stages.number_Fruits
+    derivatives[..., tail] = carbohydrate_flow_BufLeaf - carbohydrate_flow_LeafAir - carbohydrate_flow_LeafHar
+    derivatives[..., tail + 1] = carbohydrate_flow_BufStem - carbohydrate_flow_StemAir
+    derivatives[..., tail + 2] = CARBOHYDRATE_TO_DRY_MATTER_CONVERSION * fruit_stages.carbohydrate_flow_FruitHar
+    derivatives[..., tail + 3] = canopy_t / 86400
+    derivatives[..., tail + 4] = 1 / DAY_MEAN_TEMP_TIME_CONSTANT * (PROCESS_GAIN * canopy_t - last_24_canopy_t)
+    return derivatives
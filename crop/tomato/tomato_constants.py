@@ -38,6 +38,16 @@ COVER_LIGHT_TRANSMISSION = 0.78
 # Ref: Farquhar (1988)
 CANOPY_TEMPERATURE_EFFECT = 1.7
 
+# Number of canopy layers (Gauss-Legendre points over the leaf area) of the multi-layer canopy.
+# Unit: [-]
+# Ref: Goudriaan (1986), 3 to 5 points integrate the light response accurately
+CANOPY_LAYERS_NUM = 5
+
+# Part of the PAR above the canopy which is direct radiation, reaching the sunlit leaves only.
+# Unit: [-]
+# Ref: Assumed, the greenhouse cover scatters a large part of the direct radiation
+DIRECT_PAR_FRACTION = 0.3
+
 # Maximum fruit set regression coefficient 1.
 # Unit: fruits plant^-1 s^-1
 # Ref: De Koning (1994)
@@ -132,6 +142,10 @@ PROCESS_GAIN = 1
 # Unit: mg {CH2O} µmol-1 {CH2O}
 M_CH2O = 30e-3
 
+# Mass of CO2 taken up from the air per mass of CH2O formed by photosynthesis, M_CO2 / M_CH2O.
+# Unit: mg {CO2} mg^-1 {CH2O}
+CO2_TO_CH2O_MASS_RATIO = 44 / 30
+
 # Plant density in the greenhouse.
 # Unit: plants m^-2
 # Ref: Measured for Dutch growers
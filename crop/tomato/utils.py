@@ -1,4 +1,4 @@
-import math
+import numpy as np
 
 from .tomato_constants import *
 
@@ -41,7 +41,7 @@ def fruit_growth(jth: int, last_24_canopy_t):
     fruit_development_time = -93.4 + 548.0 * Fruit_Growth_Period
     curve_steepness = 1/(2.44 + 403.0 * fruit_development_time)
     days_after_fruit_set = ((jth-1)+0.5)*Fruit_Growth_Period/FRUIT_DEVELOPMENT_STAGES_NUM
-    return POTENTIAL_FRUIT_DRY_WEIGHT*math.exp(-math.exp(-curve_steepness*(days_after_fruit_set - fruit_development_time)))
+    return POTENTIAL_FRUIT_DRY_WEIGHT*np.exp(-np.exp(-curve_steepness*(days_after_fruit_set - fruit_development_time)))
 
 
 def sum_carbohydrate_flow_BufFruit_conversion(number_Fruits, last_24_canopy_t):
@@ -67,7 +67,8 @@ def maximum_carbohydrates_stored_in_the_leaves():
 
 def smoothed_conditional_function(state, slope, switch):
     """
-    Equation B.1
+    Equation B.1, 1/(1+exp(slope*(state-switch))) written with tanh like climate.utils.smooth_switch,
+    so that it doesn't overflow far from the switch
     Args:
         state:
         slope:
@@ -76,4 +77,4 @@ def smoothed_conditional_function(state, slope, switch):
     Returns:
 
     """
-    return 1/(1+math.exp(slope*(state-switch)))
+    return 0.5 * (1 - np.tanh(0.5 * slope * (state - switch)))
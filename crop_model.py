@@ -1,9 +1,115 @@
 from abc import ABC, abstractmethod
+from importlib import import_module
 
 import numpy as np
 
+# Entry point group of crop models installed by other packages, e.g. in their pyproject.toml:
+# [project.entry-points."ceaos.crop_models"]
+# lettuce = "my_package.lettuce:LettuceModel"
+CROP_MODELS_ENTRY_POINT_GROUP = 'ceaos.crop_models'
+
 
 class CropModel(ABC):
+    """
+    A crop model with states in a flat vector.
+    The leading axes of the state and climate vectors are batch axes, the states are on the last axis.
+    """
+    # Names of the entries of the observations vector
+    observation_names = ()
+
     @abstractmethod
     def __init__(self):
         pass
+
+    @abstractmethod
+    def derivatives(self, crop_vec, climate_vec) -> np.ndarray:
+        """
+        Returns: the derivatives of the crop states, with the shape of crop_vec
+        """
+        pass
+
+    @abstractmethod
+    def observations(self, crop_vec) -> np.ndarray:
+        """
+        Returns: the observations of the crop states, shape (..., len(observation_names))
+        """
+        pass
+
+
+# Name of each crop model -> 'module:class'. The module is only imported when its model is selected.
+_crop_models = {
+    'tomato': 'crop.tomato.model:TomatoModel',
+}
+_crop_model_classes = {}
+
+
+def register_crop_model(name: str, target: str):
+    """
+    Register a crop model without importing it
+    Args:
+        name: the name the model is selected by
+        target: the class of the model as 'module:class'
+    """
+    if ':' not in target:
+        raise ValueError(f"The crop model target {target} is not of the form 'module:class'")
+    _crop_models[name] = target
+    _crop_model_classes.pop(name, None)
+
+
+def available_crop_models() -> list:
+    """
+    Returns: the names of the registered crop models, without importing them
+    """
+    return sorted(_crop_models)
+
+
+def _entry_point_target(name: str):
+    # The installed entry points are only scanned for the names which are not registered
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=CROP_MODELS_ENTRY_POINT_GROUP):
+        if entry_point.name == name:
+            return entry_point.value
+    return None
+
+
+def crop_model_class(name: str) -> type:
+    """
+    Import the module of a crop model on first use
+    Returns: the class of the crop model registered as name
+    """
+    model_class = _crop_model_classes.get(name)
+    if model_class is not None:
+        return model_class
+    target = _crop_models.get(name)
+    if target is None:
+        target = _entry_point_target(name)
+        if target is None:
+            raise KeyError(f'Unknown crop model {name}, the registered models are {available_crop_models()}')
+        _crop_models[name] = target
+    module_name, class_name = target.split(':')
+    model_class = getattr(import_module(module_name), class_name)
+    if not issubclass(model_class, CropModel):
+        raise TypeError(f'{target} is not a CropModel')
+    _crop_model_classes[name] = model_class
+    return model_class
+
+
+def create_crop_model(name: str, *args, **kwargs) -> CropModel:
+    """
+    Returns: an instance of the crop model registered as name
+    """
+    return crop_model_class(name)(*args, **kwargs)
+
+
+class CropClimateCoupling(ABC):
+    """
+    The exchange from the crop to the climate model inside one right-hand side evaluation.
+    The climate model only sees these fluxes, evaluated from the crop and climate states of the same evaluation.
+    """
+
+    @abstractmethod
+    def canopy_co2_uptake(self, crop_states, climate_states) -> float:
+        """
+        Returns: the net CO2 flux from the greenhouse air to the canopy [mg {CO2} m^-2 s^-1]
+        """
+        pass
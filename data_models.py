@@ -1,5 +1,14 @@
+import functools
 from typing import NamedTuple
 
+import numpy as np
+
+from state_arrays import array_states_class
+
+# Number of soil layers in ClimateStates.t_Soil of the default design, Coefficients.Soil.soil_thicknesses.
+# The states of a design with another soil column carry its number of layers, see climate_states_from_vector.
+SOIL_LAYERS_NUM = 5
+
 
 class Setpoints(NamedTuple):
     U_Blow: float  # Heat blower control
@@ -29,7 +38,7 @@ class ClimateStates(NamedTuple):
     t_ThScr: float  # thermal screen temperature
     t_AboveThScr: float  # above thermal screen temperature a.k.a top compartment temperature
     t_Floor: float  # floor temperature
-    t_Soil: [float, float, float, float, float]  # soil layer temperatures
+    t_Soil: [float, float, float, float, float]  # soil layer temperatures, one per layer of the soil column
     t_BlScr: float  # blackout screen temperatures
     t_GrowPipe: float  # grow pipe temperatures
     t_Lamp: float
@@ -41,7 +50,7 @@ class ClimateStates(NamedTuple):
     # Recheck these vars
     leaf_area_index: float
     t_MechCool: float  # Mechanical cooling system temperature
-    mass_co2_flux_AirCanopy: float  # CO2 flux from greenhouse air to canopy
+    mass_co2_flux_AirCanopy: float  # CO2 flux from greenhouse air to canopy, used when no crop coupling is given
     PAR_Canopy: float
 
 
@@ -53,3 +62,46 @@ class Weather(NamedTuple):
     co2_outdoor: float  # outdoor CO2
     vapor_pressure_outdoor: float  # outdoor vapor pressure
     v_Wind: float  # wind velocity
+
+
+def climate_states_from_vector(vector) -> ClimateStates:
+    """
+    The climate states of a vector of shape (..., n), in which t_Soil occupies the n - 20 entries of the soil layers.
+    The fields are views on the vector, t_Soil has shape (..., n_layers).
+    """
+    vector = np.asarray(vector, dtype=float)
+    soil = ClimateStates._fields.index('t_Soil')
+    soil_layers_num = vector.shape[-1] - len(ClimateStates._fields) + 1 if vector.ndim else 0
+    if soil_layers_num < 1:
+        raise ValueError(f'The climate states need at least {len(ClimateStates._fields)} entries on the last axis, '
+                         f'got the shape {vector.shape}')
+    fields = list(np.moveaxis(vector[..., :soil], -1, 0)) \
+        + [vector[..., soil:soil + soil_layers_num]] \
+        + list(np.moveaxis(vector[..., soil + soil_layers_num:], -1, 0))
+    return ClimateStates(*fields)
+
+
+def climate_states_to_vector(states: ClimateStates) -> np.ndarray:
+    """
+    The inverse of climate_states_from_vector
+    """
+    return np.concatenate([np.asarray(field, dtype=float) if name == 't_Soil'
+                           else np.asarray(field, dtype=float)[..., np.newaxis]
+                           for name, field in zip(ClimateStates._fields, states)], axis=-1)
+
+
+# Array-backed states, see state_arrays
+SetpointsArray = array_states_class(Setpoints)
+ClimateStatesArray = array_states_class(ClimateStates, {'t_Soil': SOIL_LAYERS_NUM})
+WeatherArray = array_states_class(Weather)
+
+
+@functools.lru_cache(maxsize=None)
+def climate_states_array_class(soil_layers_num: int = SOIL_LAYERS_NUM) -> type:
+    """
+    Returns: the array-backed climate states of a soil column of soil_layers_num layers
+    """
+    if soil_layers_num == SOIL_LAYERS_NUM:
+        return ClimateStatesArray
+    return array_states_class(ClimateStates, {'t_Soil': soil_layers_num},
+                              name=f'ClimateStatesArray{soil_layers_num}')
@@ -0,0 +1,398 @@
+"""Greenhouse designs
+
+A GreenhouseDesign is an immutable copy of the coefficients of a greenhouse, read from a configuration file or taken
+from coefficients.Coefficients. Its groups and coefficients have the names of the nested classes of Coefficients,
+so a design is used wherever Coefficients is, e.g. compile_parameters(design):
+
+    design = load_design('venlo.toml')
+    design.Construction.floor_area
+    design.key  # the SHA-256 of the content of the design
+
+A configuration file only lists the coefficients which differ from the shipped values of Coefficients (default_design,
+a snapshot taken when this module is imported), grouped like the nested classes:
+
+    [Construction]
+    floor_area = 1.0E4
+
+    [ActiveClimateControl]
+    HEC_PasAir = 0
+
+A design sweep gives some coefficients an array of values along a batch axis, the first axis of the array, and the
+climate functions broadcast them against states and weather of shape (batch_size,): each lane simulates one design.
+In a configuration file the swept coefficients are listed in sweep tables:
+
+    [sweep.Heating]
+    pipe_length = [1.0, 1.25, 1.5]
+
+A coefficient of several values, like Soil.soil_thicknesses, is swept by an array of shape (batch_size, n_values),
+the values on the last axis like the soil layers of t_Soil.
+
+JSON and TOML are read with the standard library, YAML needs PyYAML. Coefficients which Coefficients doesn't have are
+added to their group, e.g. those of the active climate control. The key only depends on the values, not on the file
+or on the order of the coefficients, and is stable across processes and sessions: it is the key of the caches of
+quantities derived from a design, see cache_key, ResultCache and climate.parameters.design_parameters.
+
+The flux functions of the climate model read Coefficients and climate.parameters.model_parameters(), so one design is
+simulated at a time per process: the active design, copied into Coefficients by activate_design. Code which runs
+a given design, e.g. a sweep handed to a model, uses it in a use_design block, which restores the previous design
+on exit and holds the other threads back until then.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from coefficients import Coefficients
+
+
+def coefficients_dict(coefficients=Coefficients) -> dict:
+    """
+    Returns: the coefficients of the nested classes of Coefficients as {group: {name: value}}
+    """
+    return {group: {name: value for name, value in vars(group_class).items() if not name.startswith('_')}
+            for group, group_class in vars(coefficients).items()
+            if isinstance(group_class, type) and not group.startswith('_')}
+
+
+def _frozen_value(group: str, name: str, value):
+    # Numbers become floats, sequences tuples of floats and swept values read-only float arrays,
+    # so equal designs have equal keys
+    if isinstance(value, np.ndarray) and value.ndim:
+        if value.dtype.kind not in 'iuf':
+            raise ValueError(f'The sweep of {group}.{name} must be numeric, got {value.dtype}')
+        value = np.array(value, dtype=float)
+        value.flags.writeable = False
+        return value
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.number, list, tuple, np.ndarray)):
+        raise ValueError(f'{group}.{name} must be a number or a sequence of numbers, got {value!r}')
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen_value(group, name, item) for item in value)
+    return float(value)
+
+
+def _json_value(value):
+    if isinstance(value, np.ndarray):
+        return {'sweep': value.tolist(), 'shape': list(value.shape)}
+    raise TypeError(f'{value!r} is not JSON serializable')
+
+
+class DesignGroup(object):
+    """
+    The coefficients of one group of a GreenhouseDesign, read-only attributes
+    """
+    __slots__ = ('_name', '_values')
+
+    def __init__(self, name: str, values: dict):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_values', dict(values))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f'The design group {self._name} has no coefficient {name}') from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError('A greenhouse design is immutable, see GreenhouseDesign.replace')
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def to_dict(self) -> dict:
+        return dict(self._values)
+
+    def __repr__(self):
+        return f'DesignGroup({self._name!r}, {self._values!r})'
+
+
+class GreenhouseDesign(object):
+    """
+    An immutable greenhouse design, hashed and compared by its content
+    """
+    __slots__ = ('_groups', 'key', 'batch_size')
+
+    def __init__(self, groups: dict):
+        """
+        Args:
+            groups: the coefficients as {group: {name: value}}, the values numbers, sequences of numbers or, for a
+                sweep, arrays with the batch axis first
+        """
+        frozen = {group: DesignGroup(group, {name: _frozen_value(group, name, value) for name, value in values.items()})
+                  for group, values in groups.items()}
+        batch_sizes = {value.shape[0] for values in frozen.values() for value in values._values.values()
+                       if isinstance(value, np.ndarray)}
+        if len(batch_sizes - {1}) > 1:
+            raise ValueError(f'The swept coefficients have different batch sizes {sorted(batch_sizes)}')
+        object.__setattr__(self, '_groups', frozen)
+        # 0 if the design is not a sweep
+        object.__setattr__(self, 'batch_size', max(batch_sizes, default=0))
+        object.__setattr__(self, 'key', hashlib.sha256(self.canonical_json().encode()).hexdigest())
+
+    def __getattr__(self, group):
+        try:
+            return self._groups[group]
+        except KeyError:
+            raise AttributeError(f'The design has no group {group}') from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError('A greenhouse design is immutable, see GreenhouseDesign.replace')
+
+    @property
+    def groups(self) -> tuple:
+        return tuple(self._groups)
+
+    def to_dict(self) -> dict:
+        return {group: values.to_dict() for group, values in self._groups.items()}
+
+    def canonical_json(self) -> str:
+        """
+        Returns: the JSON of the design with sorted groups and coefficients, the content of the key
+        """
+        return json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'), default=_json_value)
+
+    def to_config(self) -> dict:
+        """
+        Returns: the coefficients as {group: {name: value}}, the swept coefficients as lists in the sweep table
+        """
+        config, sweep = {}, {}
+        for group, values in self.to_dict().items():
+            config[group] = {name: value for name, value in values.items() if not isinstance(value, np.ndarray)}
+            swept = {name: value.tolist() for name, value in values.items() if isinstance(value, np.ndarray)}
+            if swept:
+                sweep[group] = swept
+        if sweep:
+            config['sweep'] = sweep
+        return config
+
+    def replace(self, changes: dict) -> 'GreenhouseDesign':
+        """
+        Args:
+            changes: the changed coefficients as {group: {name: value}}
+
+        Returns: a new design with the changed coefficients
+        """
+        return design_from_dict(changes, base=self)
+
+    def sweep(self, sweeps: dict) -> 'GreenhouseDesign':
+        """
+        Args:
+            sweeps: the swept coefficients as {group: {name: values}}, the batch axis first
+
+        Returns: a new design with the swept coefficients
+        """
+        return design_from_dict({'sweep': sweeps}, base=self)
+
+    def lane(self, index: int) -> 'GreenhouseDesign':
+        """
+        Returns: the design of one lane of a sweep
+        """
+        def lane_value(value):
+            if not isinstance(value, np.ndarray):
+                return value
+            # A swept sequence becomes a sequence again
+            value = value[index if len(value) > 1 else 0]
+            return tuple(value.tolist()) if value.ndim else float(value)
+
+        return GreenhouseDesign({group: {name: lane_value(value) for name, value in values.to_dict().items()}
+                                 for group, values in self._groups.items()})
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, GreenhouseDesign) and self.key == other.key
+
+    def __reduce__(self):
+        return GreenhouseDesign, (self.to_dict(),)
+
+    def __repr__(self):
+        batch = f', batch_size={self.batch_size}' if self.batch_size else ''
+        return f'GreenhouseDesign(key={self.key[:12]}{batch})'
+
+
+# The shipped values of Coefficients, before any activate_design
+_shipped_design = GreenhouseDesign(coefficients_dict(Coefficients))
+
+
+def default_design() -> GreenhouseDesign:
+    """
+    Returns: the design of the shipped values of Coefficients, independent of the active design
+    """
+    return _shipped_design
+
+
+def active_design() -> GreenhouseDesign:
+    """
+    Returns: the design of the current values of Coefficients, see activate_design
+    """
+    return GreenhouseDesign(coefficients_dict(Coefficients))
+
+
+def design_from_dict(config: dict, base: GreenhouseDesign = None) -> GreenhouseDesign:
+    """
+    Args:
+        config: the coefficients which differ from the base as {group: {name: value}}, and the swept coefficients
+            as {'sweep': {group: {name: values}}}
+        base: the design the config changes, by default default_design()
+
+    Returns: the design
+    """
+    groups = (base or default_design()).to_dict()
+    config = dict(config)
+    sweep = config.pop('sweep', {})
+    for changes, as_values in ((config, lambda value: value),
+                               (sweep, lambda values: np.asarray(values, dtype=float).reshape(np.shape(values) or 1))):
+        for group, values in changes.items():
+            if group not in groups:
+                raise ValueError(f'Unknown design group {group}, the groups are {sorted(groups)}')
+            if not isinstance(values, dict):
+                raise ValueError(f'The design group {group} must be a table of coefficients')
+            groups[group].update({name: as_values(value) for name, value in values.items()})
+    return GreenhouseDesign(groups)
+
+
+def _read_config(path) -> dict:
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension == '.json':
+        with open(path) as file:
+            return json.load(file)
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as file:
+            return tomllib.load(file)
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError('Reading YAML designs needs PyYAML: pip install pyyaml') from None
+        with open(path) as file:
+            return yaml.safe_load(file) or {}
+    raise ValueError(f'Unknown design file type {extension}, use .json, .toml, .yaml or .yml')
+
+
+def load_design(path, base: GreenhouseDesign = None) -> GreenhouseDesign:
+    """
+    Read a design from a JSON, TOML or YAML configuration file, see design_from_dict
+    """
+    return design_from_dict(_read_config(path), base)
+
+
+def save_design(design: GreenhouseDesign, path):
+    """
+    Write all coefficients of a design to a JSON file
+    """
+    with open(path, 'w') as file:
+        json.dump(design.to_config(), file, indent=4, sort_keys=True)
+
+
+# Held while a design is activated and during use_design blocks
+_activation_lock = threading.RLock()
+
+
+def activate_design(design: GreenhouseDesign) -> GreenhouseDesign:
+    """
+    Copy a design into Coefficients and recompile the model parameters, for the flux functions which read
+    Coefficients directly. The design replaces the active design of the whole process, see use_design.
+    Returns: the design of the previous values of Coefficients
+    """
+    from climate.parameters import rebuild_model_parameters
+
+    with _activation_lock:
+        previous = active_design()
+        for group, values in design.to_dict().items():
+            group_class = getattr(Coefficients, group)
+            for name in set(previous.to_dict()[group]) - set(values):
+                delattr(group_class, name)
+            for name, value in values.items():
+                setattr(group_class, name, list(value) if isinstance(value, tuple) else value)
+        rebuild_model_parameters(design)
+    return previous
+
+
+@contextlib.contextmanager
+def use_design(design: GreenhouseDesign):
+    """
+    Activate a design for a with block and restore the previous design on exit.
+    The blocks of other threads wait until the block ends, the blocks of one thread can be nested.
+    """
+    with _activation_lock:
+        previous = activate_design(design)
+        try:
+            yield design
+        finally:
+            activate_design(previous)
+
+
+def cache_key(design: GreenhouseDesign, *inputs) -> str:
+    """
+    The key of a result derived from a design and other inputs, e.g. a spin-up of the design for a weather record
+    Args:
+        design: the design
+        inputs: arrays, numbers or strings, hashed by their content
+
+    Returns: the SHA-256 of the design key and the inputs
+    """
+    digest = hashlib.sha256(design.key.encode())
+    for item in inputs:
+        if isinstance(item, np.ndarray):
+            digest.update(f'{item.dtype.str}{item.shape}'.encode())
+            digest.update(np.ascontiguousarray(item).tobytes())
+        else:
+            digest.update(repr(item).encode())
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """
+    Arrays computed from designs, stored by cache_key in memory or in a directory of .npy files
+    shared by all runs using the directory
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._results = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key + '.npy')
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._results or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def get(self, key: str):
+        """
+        Returns: the array stored with the key, None if there is none
+        """
+        if key not in self._results and self.directory is not None and os.path.exists(self._path(key)):
+            self._results[key] = np.load(self._path(key))
+        return self._results.get(key)
+
+    def put(self, key: str, result):
+        result = np.asarray(result)
+        self._results[key] = result
+        if self.directory is not None:
+            # Written under a temporary name and renamed, so concurrent runs never read a partial file
+            temporary = f'{self._path(key)}.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as file:
+                np.save(file, result)
+            os.replace(temporary, self._path(key))
+
+    def cached(self, key: str, compute):
+        """
+        Returns: the array stored with the key, computed by compute() and stored if there is none
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+            result = self._results[key]
+        return result
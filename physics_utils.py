@@ -1,4 +1,4 @@
-from math import exp, log
+import numpy as np
 
 
 """
@@ -6,34 +6,113 @@ Units
  - Absolute humidity: g/m3
  - Relative humidity: between 0 and 1
  - Temperature: Celsius
+
+All functions are NumPy ufunc-compatible: they accept scalars or arrays of any shape and broadcast their arguments.
+With fast=True the saturation vapor pressure is read from a precomputed interpolation table
+(see saturation_vapor_pressure_table), which is cheaper than the exponential on large arrays.
 """
 
 GAS_CONSTANT = 8.314463  # J/K/mol
 WATER_MOLECULAR_WEIGHT = 18.02  # g/mol
 
-def _kelvin(t_celsius: float) -> float:
+# Temperature range and grid step of the saturation vapor pressure table (°C).
+# The linear interpolation error is below 4E-6 relative to the exact value in this range.
+TABLE_MIN_T = -50
+TABLE_MAX_T = 80
+TABLE_STEP_T = 0.05
+
+
+class InterpolationTable(object):
+    """
+    A smooth function of one variable tabulated on a uniform grid and evaluated by linear interpolation.
+    The function may return an array for each point, e.g. one value per fruit development stage, whose axes are
+    appended to the axes of the evaluated points. Values outside the grid fall back to the exact function.
+    """
+
+    def __init__(self, function, x_min: float, x_max: float, step: float):
+        self.function = function
+        self.x_min = x_min
+        self.step = step
+        self.grid = np.arange(x_min, x_max + step / 2, step)
+        self.values = np.asarray(function(self.grid), dtype=float)
+        # The largest deviation of a linear interpolation of a smooth convex function is found between the grid points.
+        # The error is relative to the exact value at each point.
+        midpoints = (self.grid[:-1] + self.grid[1:]) / 2
+        exact = np.asarray(function(midpoints), dtype=float)
+        self.max_relative_error = float(np.max(np.abs(self(midpoints) - exact) / np.abs(exact)))
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        outside = (x < self.grid[0]) | (x > self.grid[-1])
+        if self.values.ndim == 1:
+            result = np.interp(x, self.grid, self.values)
+        else:
+            position = (x - self.x_min) / self.step
+            index = np.clip(np.floor(np.nan_to_num(position)).astype(int), 0, len(self.grid) - 2)
+            weight = (position - index).reshape(x.shape + (1,) * (self.values.ndim - 1))
+            result = self.values[index] * (1 - weight) + self.values[index + 1] * weight
+            outside = outside.reshape(weight.shape)
+        if np.any(outside):
+            result = np.where(outside, self.function(x), result)
+        return result[()]
+
+
+def _kelvin(t_celsius):
     return t_celsius + 273.15
 
-def saturation_vapor_pressure(t: float) -> float:
-    return 0.6112 * exp(17.67 * t / (t + 243.5))
 
-def vapor_pressure(rh: float, t: float) -> float:
-    return rh * saturation_vapor_pressure(t)
+def _exact_saturation_vapor_pressure(t):
+    return 0.6112 * np.exp(17.67 * t / (t + 243.5))
+
+
+# The tables of tabulated_temperature_function, by function
+_temperature_tables = {}
+
+
+def tabulated_temperature_function(function) -> InterpolationTable:
+    """
+    A function of the temperature tabulated between TABLE_MIN_T and TABLE_MAX_T, built on first use and shared by
+    all callers. Its max_relative_error attribute reports the maximum interpolation error inside the table range.
+    """
+    table = _temperature_tables.get(function)
+    if table is None:
+        table = InterpolationTable(function, TABLE_MIN_T, TABLE_MAX_T, TABLE_STEP_T)
+        _temperature_tables[function] = table
+    return table
+
+
+def saturation_vapor_pressure_table() -> InterpolationTable:
+    """
+    The saturation vapor pressure [kPa] tabulated by tabulated_temperature_function
+    """
+    return tabulated_temperature_function(_exact_saturation_vapor_pressure)
+
+
+def saturation_vapor_pressure(t, fast: bool = False):
+    if fast:
+        return saturation_vapor_pressure_table()(t)
+    return _exact_saturation_vapor_pressure(t)
+
+
+def vapor_pressure(rh, t, fast: bool = False):
+    return rh * saturation_vapor_pressure(t, fast)
+
 
 # From below, the unit of rh is [0,1], not %
-def absolute_humidity(rh: float, t: float) -> float:
-    n = vapor_pressure(rh, t) / (GAS_CONSTANT * _kelvin(t))  # ideal gas equation: PV = nRT; V=1
+def absolute_humidity(rh, t, fast: bool = False):
+    n = vapor_pressure(rh, t, fast) / (GAS_CONSTANT * _kelvin(t))  # ideal gas equation: PV = nRT; V=1
     return n * WATER_MOLECULAR_WEIGHT
 
-def relative_humidity(vp: float, t: float) -> float:
-    return vp / saturation_vapor_pressure(t)
 
-def dewpoint(rh: float, t: float) -> float:
+def relative_humidity(vp, t, fast: bool = False):
+    return vp / saturation_vapor_pressure(t, fast)
+
+
+def dewpoint(rh, t):
     """
     Calculate the dewpoint from relative_humidity
     Ref: https://www.omnicalculator.com/physics/dew-point#howto
     """
     a, b = 17.62, 243.12
-    alpha = log(rh) + a * t / (b + t)
+    alpha = np.log(rh) + a * t / (b + t)
     return b * alpha / (a - alpha)
-
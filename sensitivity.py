@@ -0,0 +1,421 @@
+"""Global sensitivity analysis
+
+Screens which coefficients of coefficients.Coefficients and constants of crop.tomato.tomato_constants drive the outputs
+of a model, e.g. the yield and the energy use of a season:
+
+    space = parameter_space(['Roof.roof_PAR_transmission_coefficient', 'Heating.pipe_length',
+                             'tomato.MAX_LEAF_ELECTRON_TRANSPORT_RATE'])
+    morris = morris_analysis(season_outputs, space, n_trajectories=100, workers=8)
+    sobol = sobol_analysis(season_outputs, space, n_samples=2 ** 14, workers=8)
+
+The model is a picklable function model(values, design) -> outputs, values of shape (lanes, n_parameters) and outputs
+of shape (lanes, n_outputs). design is the GreenhouseDesign of the lanes: the default design whose coefficients of the
+space are arrays along the lanes (see design.GreenhouseDesign.sweep), so the model simulates all lanes in one batched
+run with states of shape (lanes, ...), e.g. inside a design.use_design(design) block. The runner never changes
+Coefficients itself. The tomato constants are module constants, they are set as scalars by apply_parameters and the
+lanes of a model with tomato parameters are evaluated one at a time. parameter_space rejects the parameters the
+runner can't vary, see check_parameter.
+
+The samples are generated and evaluated block by block on a process pool, and every finished block is reduced into
+running sums of the elementary effects (Morris) or of the Saltelli estimators (Sobol). The memory does not depend on
+the number of samples.
+"""
+import contextlib
+import importlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import NamedTuple
+
+import numpy as np
+from scipy.stats import qmc
+
+from coefficients import Coefficients
+from design import GreenhouseDesign, coefficients_dict, default_design
+
+# The prefix of the names of the tomato constants in a parameter space
+TOMATO_PREFIX = 'tomato.'
+TOMATO_CONSTANTS_MODULE = 'crop.tomato.tomato_constants'
+
+# The range of the default parameters relative to their value
+DEFAULT_RELATIVE_RANGE = 0.2
+
+# The number of rows of the sample blocks handed to the workers
+DEFAULT_BLOCK_ROWS = 4096
+
+# The number of lanes of one model evaluation
+DEFAULT_LANES = 256
+
+
+class Parameter(NamedTuple):
+    name: str  # 'Group.name' of a coefficient of Coefficients, or 'tomato.NAME' of a tomato constant
+    lower: float
+    upper: float
+
+
+class ParameterSpace(NamedTuple):
+    parameters: tuple
+
+    @property
+    def names(self) -> list:
+        return [parameter.name for parameter in self.parameters]
+
+    @property
+    def n_parameters(self) -> int:
+        return len(self.parameters)
+
+    @property
+    def has_tomato_parameters(self) -> bool:
+        return any(parameter.name.startswith(TOMATO_PREFIX) for parameter in self.parameters)
+
+    def scale(self, unit_samples) -> np.ndarray:
+        """
+        Returns: the parameter values of samples in the unit hypercube, shape (..., n_parameters)
+        """
+        lower = np.array([parameter.lower for parameter in self.parameters])
+        upper = np.array([parameter.upper for parameter in self.parameters])
+        return lower + np.asarray(unit_samples) * (upper - lower)
+
+
+def _tomato_constants():
+    return importlib.import_module(TOMATO_CONSTANTS_MODULE)
+
+
+def check_parameter(name: str):
+    """
+    Raises: ValueError if the runner can't vary the parameter: a coefficient which the default design doesn't have or
+    which isn't a number, or a tomato constant which isn't a float, e.g. the integer sizes of the crop model, which
+    are bound when the crop modules are imported
+    """
+    if name.startswith(TOMATO_PREFIX):
+        constant = name[len(TOMATO_PREFIX):]
+        value = getattr(_tomato_constants(), constant, None)
+        if not constant.isupper() or not isinstance(value, float):
+            raise ValueError(f'{name} is not a float constant of {TOMATO_CONSTANTS_MODULE}')
+        return
+    group, _, coefficient = name.partition('.')
+    values = default_design().to_dict().get(group, {})
+    if not isinstance(values.get(coefficient), float):
+        raise ValueError(f'{name} is not a scalar coefficient of Coefficients')
+
+
+def parameter_value(name: str) -> float:
+    """
+    Returns: the current value of a coefficient 'Group.name' or of a tomato constant 'tomato.NAME'
+    """
+    if name.startswith(TOMATO_PREFIX):
+        return getattr(_tomato_constants(), name[len(TOMATO_PREFIX):])
+    group, _, coefficient = name.partition('.')
+    return getattr(getattr(Coefficients, group), coefficient)
+
+
+def parameter_space(names, relative_range: float = DEFAULT_RELATIVE_RANGE, bounds: dict = None) -> ParameterSpace:
+    """
+    Args:
+        names: the coefficients 'Group.name' and tomato constants 'tomato.NAME'
+        relative_range: the parameters vary by +- relative_range of their current value
+        bounds: (lower, upper) of the parameters whose range is given explicitly, by name
+
+    Returns: the parameter space
+    """
+    bounds = bounds or {}
+    parameters = []
+    for name in names:
+        check_parameter(name)
+        if name in bounds:
+            lower, upper = bounds[name]
+        else:
+            value = float(parameter_value(name))
+            lower, upper = sorted((value * (1 - relative_range), value * (1 + relative_range)))
+        if not upper > lower:
+            raise ValueError(f'The range of {name} is empty, give its bounds explicitly')
+        parameters.append(Parameter(name=name, lower=float(lower), upper=float(upper)))
+    return ParameterSpace(parameters=tuple(parameters))
+
+
+def default_parameter_names(include_tomato: bool = True) -> list:
+    """
+    Returns: the non-zero scalar coefficients of Coefficients and, with include_tomato, the non-zero float tomato
+    constants, the ones a relative range applies to
+    """
+    names = [f'{group}.{name}' for group, values in coefficients_dict(Coefficients).items()
+             for name, value in values.items() if isinstance(value, (int, float)) and value != 0]
+    if include_tomato:
+        names += [TOMATO_PREFIX + name for name, value in vars(_tomato_constants()).items()
+                  if name.isupper() and isinstance(value, float) and value != 0]
+    return names
+
+
+def _set_tomato_constant(name: str, value):
+    # The crop modules import the constants with *, so the modules holding the name get the value too.
+    # The modules are found by their directory, whatever name they were imported under.
+    # The crop functions read the constants when they are called, none of them is a default argument.
+    package_directory = os.path.dirname(os.path.abspath(_tomato_constants().__file__))
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, '__file__', None)
+        if module_file is not None and os.path.dirname(os.path.abspath(module_file)) == package_directory \
+                and hasattr(module, name):
+            setattr(module, name, value)
+
+
+def parameters_design(space: ParameterSpace, values) -> GreenhouseDesign:
+    """
+    Args:
+        space: the parameter space
+        values: the parameter values of each lane, shape (lanes, n_parameters)
+
+    Returns: the default design sweeping the coefficients of the space along the lanes
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    sweeps = {}
+    for parameter, column in zip(space.parameters, values.T):
+        if not parameter.name.startswith(TOMATO_PREFIX):
+            group, _, coefficient = parameter.name.partition('.')
+            sweeps.setdefault(group, {})[coefficient] = column
+    return default_design().sweep(sweeps) if sweeps else default_design()
+
+
+@contextlib.contextmanager
+def apply_parameters(space: ParameterSpace, values):
+    """
+    Set the tomato constants of a block of lanes and restore them on exit
+    Args:
+        space: the parameter space
+        values: the parameter values of each lane, shape (lanes, n_parameters)
+
+    Returns: the design of the lanes, see parameters_design
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    tomato = {}
+    for parameter, column in zip(space.parameters, values.T):
+        if parameter.name.startswith(TOMATO_PREFIX):
+            if np.any(column != column[0]):
+                raise ValueError(f'The tomato constant {parameter.name} must be the same in all lanes')
+            tomato[parameter.name[len(TOMATO_PREFIX):]] = float(column[0])
+    constants = _tomato_constants()
+    previous_tomato = {name: getattr(constants, name) for name in tomato}
+    try:
+        for name, value in tomato.items():
+            _set_tomato_constant(name, value)
+        yield parameters_design(space, values)
+    finally:
+        for name, value in previous_tomato.items():
+            _set_tomato_constant(name, value)
+
+
+def evaluate_samples(model, space: ParameterSpace, values, lanes: int = DEFAULT_LANES) -> np.ndarray:
+    """
+    Evaluate the model for parameter values in blocks of at most lanes lanes
+    Args:
+        model: model(values, design) -> outputs, see the module documentation
+        space: the parameter space
+        values: the parameter values, shape (n, n_parameters)
+        lanes: the number of lanes of one model evaluation, 1 if the space has tomato parameters
+
+    Returns: the outputs, shape (n, n_outputs)
+    """
+    values = np.asarray(values, dtype=float)
+    if space.has_tomato_parameters:
+        lanes = 1
+    outputs = []
+    for start in range(0, len(values), lanes):
+        block = values[start:start + lanes]
+        with apply_parameters(space, block) as design:
+            output = np.asarray(model(block, design), dtype=float)
+        outputs.append(output.reshape(len(block), -1))
+    return np.concatenate(outputs)
+
+
+def _map_blocks(model, space: ParameterSpace, blocks, reduce, workers: int, lanes: int):
+    # Evaluates the blocks (values, context) on a process pool and reduces the outputs in the order they finish.
+    # At most 2 * workers blocks are in flight, so the samples are generated as fast as they are consumed.
+    if workers <= 0:
+        for values, context in blocks:
+            reduce(evaluate_samples(model, space, values, lanes), context)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        for values, context in blocks:
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    reduce(future.result(), pending.pop(future))
+            pending[executor.submit(evaluate_samples, model, space, values, lanes)] = context
+        for future in list(pending):
+            reduce(future.result(), pending.pop(future))
+
+
+class MorrisIndices(NamedTuple):
+    names: list  # the parameters
+    mu: np.ndarray  # mean elementary effect, shape (n_parameters, n_outputs)
+    mu_star: np.ndarray  # mean absolute elementary effect, shape (n_parameters, n_outputs)
+    sigma: np.ndarray  # standard deviation of the elementary effects, shape (n_parameters, n_outputs)
+    n_trajectories: int
+
+
+def morris_trajectories(n_trajectories: int, n_parameters: int, levels: int = 4, rng=None):
+    """
+    One-at-a-time trajectories in the unit hypercube on a grid of levels levels
+    Ref: Campolongo, F., Cariboni, J., Saltelli, A. (2007). An effective screening design for sensitivity analysis
+    of large models. Environmental Modelling & Software, 22(10), 1509-1518
+    Returns: the points of shape (n_trajectories, n_parameters + 1, n_parameters) and the parameter changed at
+    each step with the sign of the change, shapes (n_trajectories, n_parameters)
+    """
+    rng = np.random.default_rng(rng)
+    delta = levels / (2 * (levels - 1))
+    k = n_parameters
+    lower_triangle = np.tril(np.ones((k + 1, k)), -1)
+    # The start points are on the grid, low enough for a step of delta
+    start = rng.integers(0, levels // 2, size=(n_trajectories, 1, k)) / (levels - 1)
+    directions = rng.choice([-1.0, 1.0], size=(n_trajectories, 1, k))
+    orders = np.argsort(rng.random((n_trajectories, k)), axis=-1)
+    steps = (2 * lower_triangle - 1) * directions + 1
+    points = start + delta / 2 * steps
+    # Permute the columns: step j of a trajectory changes parameter orders[j]
+    inverse = np.argsort(orders, axis=-1)
+    points = np.take_along_axis(points, inverse[:, np.newaxis, :], axis=-1)
+    return points, orders, directions[:, 0, :]
+
+
+def morris_analysis(model, space: ParameterSpace, n_trajectories: int, levels: int = 4, workers: int = 0,
+                    lanes: int = DEFAULT_LANES, block_rows: int = DEFAULT_BLOCK_ROWS, seed: int = 0) -> MorrisIndices:
+    """
+    Elementary effects of the parameters on the outputs of the model
+    Ref: Morris, M. D. (1991). Factorial sampling plans for preliminary computational experiments.
+    Technometrics, 33(2), 161-174
+    Args:
+        model: model(values, design) -> outputs, see the module documentation
+        space: the parameter space
+        n_trajectories: the number of trajectories, each costs n_parameters + 1 model evaluations
+        levels: the number of grid levels of each parameter, even
+        workers: the number of worker processes, 0 to evaluate in this process
+        lanes: the number of lanes of one model evaluation
+        block_rows: the number of model evaluations of a block handed to a worker
+        seed: the seed of the trajectories
+
+    Returns: the indices, the elementary effects are relative to the range of each parameter
+    """
+    k = space.n_parameters
+    delta = levels / (2 * (levels - 1))
+    trajectories_per_block = max(1, block_rows // (k + 1))
+    rng = np.random.default_rng(seed)
+    sums = {}
+
+    def blocks():
+        for first in range(0, n_trajectories, trajectories_per_block):
+            count = min(trajectories_per_block, n_trajectories - first)
+            points, orders, signs = morris_trajectories(count, k, levels, rng)
+            yield space.scale(points.reshape(-1, k)), (count, orders, signs)
+
+    def reduce(outputs, context):
+        count, orders, signs = context
+        outputs = outputs.reshape(count, k + 1, -1)
+        # The elementary effect of step j belongs to the parameter orders[j]
+        effects = np.diff(outputs, axis=1) / (delta * signs[..., np.newaxis])
+        ordered = np.zeros_like(effects)
+        np.put_along_axis(ordered, orders[..., np.newaxis], effects, axis=1)
+        if not sums:
+            sums.update(total=np.zeros(ordered.shape[1:]), absolute=np.zeros(ordered.shape[1:]),
+                        square=np.zeros(ordered.shape[1:]))
+        sums['total'] += ordered.sum(axis=0)
+        sums['absolute'] += np.abs(ordered).sum(axis=0)
+        sums['square'] += (ordered ** 2).sum(axis=0)
+
+    _map_blocks(model, space, blocks(), reduce, workers, lanes)
+    mu = sums['total'] / n_trajectories
+    variance = (sums['square'] - n_trajectories * mu ** 2) / max(n_trajectories - 1, 1)
+    return MorrisIndices(names=space.names, mu=mu, mu_star=sums['absolute'] / n_trajectories,
+                         sigma=np.sqrt(np.maximum(variance, 0)), n_trajectories=n_trajectories)
+
+
+class SobolIndices(NamedTuple):
+    names: list  # the parameters
+    first_order: np.ndarray  # shape (n_parameters, n_outputs)
+    total_order: np.ndarray  # shape (n_parameters, n_outputs)
+    first_order_error: np.ndarray  # standard error of first_order, shape (n_parameters, n_outputs)
+    total_order_error: np.ndarray  # standard error of total_order, shape (n_parameters, n_outputs)
+    variance: np.ndarray  # variance of the outputs, shape (n_outputs,)
+    n_samples: int
+
+
+class _RunningSums(object):
+    # Sums of the Saltelli estimators, the mean and variance of the outputs are merged with Chan's formula
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.first = self.first_square = self.total = self.total_square = 0.0
+        self.n_samples = 0
+
+    def add_outputs(self, outputs):
+        count = len(outputs)
+        mean = outputs.mean(axis=0)
+        m2 = ((outputs - mean) ** 2).sum(axis=0)
+        delta = mean - self.mean
+        total = self.count + count
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def add_estimators(self, output_A, output_B, output_AB):
+        # Saltelli et al. (2010) Equation (b) for the first order, Jansen (1999) Equation (f) for the total order
+        first = output_B[:, np.newaxis] * (output_AB - output_A[:, np.newaxis])
+        total = 0.5 * (output_A[:, np.newaxis] - output_AB) ** 2
+        self.first = self.first + first.sum(axis=0)
+        self.first_square = self.first_square + (first ** 2).sum(axis=0)
+        self.total = self.total + total.sum(axis=0)
+        self.total_square = self.total_square + (total ** 2).sum(axis=0)
+        self.n_samples += len(output_A)
+
+
+def sobol_analysis(model, space: ParameterSpace, n_samples: int, workers: int = 0, lanes: int = DEFAULT_LANES,
+                   block_samples: int = 256, seed: int = 0) -> SobolIndices:
+    """
+    First and total order Sobol indices of the parameters on the outputs of the model, estimated from Saltelli samples
+    Ref: Saltelli, A., Annoni, P., Azzini, I., Campolongo, F., Ratto, M., Tarantola, S. (2010). Variance based
+    sensitivity analysis of model output. Design and estimator for the total sensitivity index.
+    Computer Physics Communications, 181(2), 259-270
+    Args:
+        model: model(values, design) -> outputs, see the module documentation
+        space: the parameter space
+        n_samples: the number of base samples, a power of 2, each costs n_parameters + 2 model evaluations
+        workers: the number of worker processes, 0 to evaluate in this process
+        lanes: the number of lanes of one model evaluation
+        block_samples: the number of base samples of a block handed to a worker, a power of 2
+        seed: the seed of the scrambled Sobol sequence
+
+    Returns: the indices
+    """
+    if n_samples & (n_samples - 1) or block_samples & (block_samples - 1):
+        raise ValueError('n_samples and block_samples must be powers of 2 for the balance of the Sobol sequence')
+    k = space.n_parameters
+    block_samples = min(block_samples, n_samples)
+    # The matrices A and B are the two halves of one Sobol sequence of dimension 2k
+    sequence = qmc.Sobol(d=2 * k, scramble=True, seed=seed)
+    sums = _RunningSums()
+
+    def blocks():
+        for _ in range(n_samples // block_samples):
+            samples = sequence.random(block_samples)
+            A, B = samples[:, :k], samples[:, k:]
+            # AB_i is A with the column i of B
+            AB = np.repeat(A[np.newaxis], k, axis=0)
+            AB[np.arange(k), :, np.arange(k)] = B.T
+            yield space.scale(np.concatenate([A, B, AB.reshape(-1, k)])), None
+
+    def reduce(outputs, context):
+        m = len(outputs) // (k + 2)
+        output_A, output_B = outputs[:m], outputs[m:2 * m]
+        output_AB = outputs[2 * m:].reshape(k, m, -1).transpose(1, 0, 2)
+        sums.add_outputs(outputs[:2 * m])
+        sums.add_estimators(output_A, output_B, output_AB)
+
+    _map_blocks(model, space, blocks(), reduce, workers, lanes)
+    n = sums.n_samples
+    variance = sums.m2 / (sums.count - 1)
+    first_mean, total_mean = sums.first / n, sums.total / n
+    first_error = np.sqrt(np.maximum(sums.first_square / n - first_mean ** 2, 0) / n)
+    total_error = np.sqrt(np.maximum(sums.total_square / n - total_mean ** 2, 0) / n)
+    return SobolIndices(names=space.names, first_order=first_mean / variance, total_order=total_mean / variance,
+                        first_order_error=first_error / variance, total_order_error=total_error / variance,
+                        variance=variance, n_samples=n)
@@ -0,0 +1,141 @@
+"""Array-backed states
+
+The NamedTuple states of data_models and crop_model hold one float per field, or a list for the fields with several
+entries like t_Soil. An array-backed state keeps all fields in one contiguous float64 buffer of shape
+(..., size) with a fixed field-to-index layout, and its attributes are views on the buffer:
+
+    states = ClimateStatesArray.zeros()
+    states.t_Air = 20           # writes into the buffer
+    states.t_Soil[0]            # a view of shape (SOIL_LAYERS_NUM,)
+    solver_step(states.buffer)  # the solver works on the buffer in place, the attributes follow
+
+as_tuple() gives the NamedTuple of the states with views as fields, which the model functions accept unchanged.
+The layout is the field order of the NamedTuple, the same as climate_states_from_vector and crop_states_from_vector.
+"""
+import numpy as np
+
+
+class StateLayout(object):
+    """
+    The position of each field of a NamedTuple in the state buffer
+    """
+
+    def __init__(self, tuple_type, sizes: dict = None):
+        """
+        Args:
+            tuple_type: the NamedTuple of the states
+            sizes: the number of entries of the fields with more than one entry
+        """
+        sizes = sizes or {}
+        unknown = set(sizes) - set(tuple_type._fields)
+        if unknown:
+            raise ValueError(f'{tuple_type.__name__} has no fields {sorted(unknown)}')
+        self.tuple_type = tuple_type
+        self.sizes = {name: sizes.get(name, 0) for name in tuple_type._fields}
+        self.slices = {}
+        start = 0
+        for name, size in self.sizes.items():
+            self.slices[name] = slice(start, start + max(size, 1))
+            start += max(size, 1)
+        self.size = start
+
+    def index(self, name: str):
+        """
+        Returns: the index of a scalar field or the slice of a field with several entries in the buffer
+        """
+        return self.slices[name] if self.sizes[name] else self.slices[name].start
+
+
+class StateArray(object):
+    """
+    States in one contiguous float64 buffer, see array_states_class
+    """
+    layout: StateLayout = None
+    __slots__ = ('buffer',)
+
+    def __init__(self, buffer):
+        """
+        Args:
+            buffer: a float64 array of shape (..., layout.size), used without copy when it is C-contiguous
+        """
+        buffer = np.ascontiguousarray(buffer, dtype=np.float64)
+        if buffer.ndim == 0 or buffer.shape[-1] != self.layout.size:
+            raise ValueError(f'The buffer of {type(self).__name__} needs {self.layout.size} entries on the last axis')
+        object.__setattr__(self, 'buffer', buffer)
+
+    @classmethod
+    def zeros(cls, batch_shape: tuple = ()):
+        return cls(np.zeros(tuple(batch_shape) + (cls.layout.size,)))
+
+    @classmethod
+    def from_tuple(cls, states):
+        """
+        Returns: the array-backed copy of NamedTuple states, the fields broadcast to a common batch shape
+        """
+        layout = cls.layout
+        fields = [np.asarray(field, dtype=float) for field in states]
+        batch_shape = np.broadcast_shapes(*(field.shape[:-1] if layout.sizes[name] else field.shape
+                                            for name, field in zip(layout.tuple_type._fields, fields)))
+        array_states = cls.zeros(batch_shape)
+        for name, field in zip(layout.tuple_type._fields, fields):
+            setattr(array_states, name, field)
+        return array_states
+
+    @property
+    def batch_shape(self) -> tuple:
+        return self.buffer.shape[:-1]
+
+    def as_tuple(self):
+        """
+        Returns: the NamedTuple of the states, each field a view on the buffer
+        """
+        return self.layout.tuple_type(*(getattr(self, name) for name in self.layout.tuple_type._fields))
+
+    def copy(self):
+        return type(self)(self.buffer.copy())
+
+    def __setattr__(self, name, value):
+        if name == 'buffer' and value is self.buffer:
+            # In-place arithmetic like states.buffer += dt * slope assigns the same buffer back
+            return
+        if name not in self.layout.slices:
+            raise AttributeError(f'{type(self).__name__} has no field {name}')
+        object.__setattr__(self, name, value)
+
+    def __repr__(self):
+        return f'{type(self).__name__}(batch_shape={self.batch_shape})'
+
+
+def _field_property(field_slice: slice, size: int):
+    if size:
+        def get(self):
+            return self.buffer[..., field_slice]
+    else:
+        def get(self):
+            # A slice of length one keeps the result a view, also for a buffer without batch axes
+            return self.buffer[..., field_slice].reshape(self.buffer.shape[:-1])
+
+    def set(self, value):
+        if size:
+            self.buffer[..., field_slice] = value
+        else:
+            self.buffer[..., field_slice.start] = value
+
+    return property(get, set)
+
+
+def array_states_class(tuple_type, sizes: dict = None, name: str = None) -> type:
+    """
+    Create the array-backed class of a NamedTuple of states
+    Args:
+        tuple_type: the NamedTuple
+        sizes: the number of entries of the fields with more than one entry
+        name: the name of the class, by default the name of the NamedTuple + 'Array'
+
+    Returns: a subclass of StateArray with one property per field
+    """
+    layout = StateLayout(tuple_type, sizes)
+    attributes = {'layout': layout, '__slots__': ()}
+    for field in tuple_type._fields:
+        attributes[field] = _field_property(layout.slices[field], layout.sizes[field])
+    return type(name or tuple_type.__name__ + 'Array', (StateArray,), attributes)
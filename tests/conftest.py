@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The modules import each other from the repository root, e.g. from coefficients import Coefficients
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The coefficients of the active climate control, which the shipped coefficients leave to the configuration files
+CLIMATE_CONTROL = {'ActiveClimateControl': {'cap_Fog': 0., 'ventForced_air_flow': 0., 'perf_MechCool_coef': 3.,
+                                            'HEC_PasAir': 0., 'heat_cap_Blow': 0., 'heat_cap_Boil': 1.E6,
+                                            'heat_cap_Geo': 0., 'heat_cap_Ind': 0., 'ele_cap_MechCool': 0.},
+                   'Ventilation': {'eta_ShScrC_d': 0., 'eta_ShScrC_w': 0.},
+                   'Construction': {'side_wall_roof_vent_distance': 1.},
+                   'Interlight': {'heat_inter_lamp_capacity': 10.}}
+
+
+@pytest.fixture
+def climate_control(monkeypatch):
+    from coefficients import Coefficients
+
+    for group, values in CLIMATE_CONTROL.items():
+        for name, value in values.items():
+            monkeypatch.setattr(getattr(Coefficients, group), name, value, raising=False)
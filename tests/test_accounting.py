@@ -0,0 +1,74 @@
+import numpy as np
+
+from climate.accounting import J_TO_KWH, MG_TO_KG, Tariffs, cumulative_resource_use, resource_costs, \
+    resource_rates, resource_use
+from climate.utils import air_exchange_rates
+from coefficients import Coefficients
+from test_climate_balances import conditions
+
+N_STEPS = 6
+DT = 300.
+
+
+def _trajectories():
+    # Two lanes of N_STEPS steps, the setpoints change along the time axis
+    setpoints, states, weather = conditions()
+
+    def series(values, **changes):
+        fields = {name: np.broadcast_to(np.asarray(value, dtype=float), (2, N_STEPS) + np.shape(value))
+                  for name, value in zip(values._fields, values)}
+        fields.update(changes)
+        return type(values)(**fields)
+
+    time = np.arange(N_STEPS)
+    setpoints = series(setpoints, U_Lamp=np.array([time % 2, np.ones(N_STEPS)], dtype=float),
+                       U_Boil=np.linspace(0, 1, 2 * N_STEPS).reshape(2, N_STEPS),
+                       U_Roof=np.full((2, N_STEPS), 0.3))
+    states = series(states, t_Air=states.t_Air + np.linspace(0, 5, 2 * N_STEPS).reshape(2, N_STEPS))
+    weather = series(weather)
+    return setpoints, states, weather
+
+
+def test_per_step_rates_and_ventilation_losses(climate_control):
+    setpoints, states, weather = _trajectories()
+    rates = resource_rates(setpoints, states, weather)
+    np.testing.assert_allclose(rates.lamp_electricity, Coefficients.Lamp.electrical_capacity_lamp * setpoints.U_Lamp)
+    np.testing.assert_allclose(rates.boiler_heat, setpoints.U_Boil * Coefficients.ActiveClimateControl.heat_cap_Boil
+                               / Coefficients.Construction.floor_area
+                               + setpoints.U_BoilGro * Coefficients.GrowPipe.cap_BoilGro
+                               / Coefficients.Construction.floor_area)
+    for rate in rates:
+        assert rate.shape == (2, N_STEPS)
+    # The ventilation losses computed from the states equal those of the recorded air exchange rates
+    recorded = resource_rates(setpoints, states, weather, air_exchange_rates(setpoints, states, weather))
+    for name in ('ventilation_heat_loss', 'ventilation_co2_loss', 'ventilation_vapor_loss'):
+        np.testing.assert_allclose(getattr(rates, name), getattr(recorded, name))
+    # Warmer greenhouse air loses more heat
+    assert np.all(np.diff(rates.ventilation_heat_loss, axis=-1) > 0)
+
+
+def test_ventilation_losses_need_states_and_weather(climate_control):
+    setpoints, _, _ = _trajectories()
+    rates = resource_rates(setpoints)
+    assert rates.ventilation_heat_loss is None
+    assert rates.lamp_electricity.shape == (2, N_STEPS)
+
+
+def test_cumulative_and_tariff_weighted_totals(climate_control):
+    setpoints, states, weather = _trajectories()
+    use = resource_use(resource_rates(setpoints, states, weather), DT)
+    np.testing.assert_allclose(use.lamp_electricity,
+                               DT * Coefficients.Lamp.electrical_capacity_lamp * setpoints.U_Lamp)
+    cumulative = cumulative_resource_use(use)
+    for amount, total in zip(use, cumulative):
+        np.testing.assert_allclose(total[..., -1], np.sum(amount, axis=-1))
+        np.testing.assert_allclose(np.diff(total, axis=-1), amount[..., 1:])
+
+    electricity_price = np.linspace(0.1, 0.3, N_STEPS)
+    costs = resource_costs(use, Tariffs(electricity=electricity_price, heat=0.05, co2=0.2, water=1.))
+    np.testing.assert_allclose(costs.electricity, use.lamp_electricity * J_TO_KWH * electricity_price)
+    np.testing.assert_allclose(costs.co2, use.co2_dosing * MG_TO_KG * 0.2)
+    np.testing.assert_allclose(np.sum(costs.total, axis=-1),
+                               np.sum(use.lamp_electricity * J_TO_KWH * electricity_price
+                                      + use.boiler_heat * J_TO_KWH * 0.05 + use.co2_dosing * MG_TO_KG * 0.2
+                                      + use.fogging_water, axis=-1))
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from crop.tomato import canopy_layers
+from crop.tomato.canopy_layers import multi_layer_electron_transport
+from crop.tomato.electron_transport import electron_transport
+from crop.tomato.tomato_constants import PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR
+
+LEAF = np.array([1e4, 4e4, 1e5])
+
+
+@pytest.mark.parametrize('direct_fraction', [0., 0.3, 1.])
+def test_absorbed_par_is_conserved_across_the_layers(monkeypatch, direct_fraction):
+    # Without saturation of the light response the electron transport is proportional to the absorbed PAR
+    monkeypatch.setattr(canopy_layers, 'potential_electron_transport', lambda *args: 1e9)
+    PAR_Canopy, PAR_IntLamp = np.array([50., 300., 900.]), np.array([0., 20., 100.])
+    absorbed = multi_layer_electron_transport(LEAF, 20., PAR_Canopy, PAR_IntLamp, layers_num=12,
+                                              direct_fraction=direct_fraction) \
+        / PHOTONS_TO_ELECTRONS_CONVERSION_FACTOR
+    np.testing.assert_allclose(absorbed, PAR_Canopy, rtol=1e-6)
+
+
+def test_uneven_light_transports_fewer_electrons_than_the_big_leaf():
+    # The light response is concave and homogeneous, the big leaf spreads the same PAR evenly over the leaves
+    PAR_Canopy = np.array([50., 300., 900.])
+    big_leaf = electron_transport(LEAF, 20., PAR_Canopy)
+    assert np.all(multi_layer_electron_transport(LEAF, 20., PAR_Canopy) <= big_leaf * (1 + 1e-9))
+    # All light diffuse and hardly attenuated is almost uniform
+    np.testing.assert_allclose(multi_layer_electron_transport(1e2, 20., 1., direct_fraction=0.),
+                               electron_transport(1e2, 20., 1.), rtol=1e-3)
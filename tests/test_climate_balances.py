@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import climate.state_variables as sv
+from data_models import ClimateStates, Setpoints, Weather
+
+
+def conditions():
+    setpoints = Setpoints(U_Blow=0., U_Boil=0.5, U_MechCool=0., U_Fog=0., U_Roof=0.3, U_Side=0., U_VentForced=0.,
+                          U_Extco2=0.5, U_ShScr=0., U_ThScr=0.5, U_Ind=0., U_Geo=0., U_Lamp=1., U_IntLamp=0.,
+                          U_BoilGro=0.5, U_BlScr=0.5)
+    states = ClimateStates(t_Pipe=40., t_Canopy=20., t_Air=19., t_Cov_internal=10., t_Cov_external=8., t_ThScr=15.,
+                           t_AboveThScr=16., t_Floor=18., t_Soil=np.array([17., 16., 15., 14., 13.]), t_BlScr=17.,
+                           t_GrowPipe=30., t_Lamp=25., t_IntLamp=20., co2_Air=700., co2_AboveThScr=600.,
+                           vapor_pressure_Air=1800., vapor_pressure_AboveThScr=1600., leaf_area_index=3.,
+                           t_MechCool=12., mass_co2_flux_AirCanopy=0., PAR_Canopy=300.)
+    weather = Weather(outdoor_global_rad=300., t_Outdoor=5., t_Sky=-5., t_Soil_Out=10., co2_outdoor=420.,
+                      vapor_pressure_outdoor=800., v_Wind=3.)
+    return setpoints, states, weather
+
+
+def balances(setpoints, states, weather):
+    return {
+        't_Canopy': sv.canopy_temperature(setpoints, states, weather),
+        't_Air': sv.greenhouse_air_temperature(setpoints, states, weather),
+        't_Floor': sv.floor_temperature(setpoints, states, weather),
+        't_Soil': np.array([sv.soil_temperature(j, states, weather) for j in range(1, 6)]),
+        't_ThScr': sv.thermal_screen_temperature(setpoints, states, weather),
+        't_AboveThScr': sv.top_compartment_temperature(setpoints, states, weather),
+        't_Cov_internal': sv.internal_cover_temperature(setpoints, states),
+        't_Cov_external': sv.external_cover_temperature(setpoints, states, weather),
+        't_Pipe': sv.heating_pipe_system_surface_temperature(setpoints, states, weather),
+        't_BlScr': sv.blackout_screen_temperature(setpoints, states, weather),
+        't_GrowPipe': sv.grow_pipe_temperature(setpoints, states),
+        't_Lamp': sv.lamps_temperature(setpoints, states, weather),
+        't_IntLamp': sv.inter_lamps_temperature(setpoints, states),
+        'vapor_pressure_Air': sv.greenhouse_air_vapor_pressure(setpoints, states, weather),
+        'vapor_pressure_AboveThScr': sv.top_compartment_vapor_pressure(setpoints, states, weather),
+        'co2_Air': sv.greenhouse_air_co2(setpoints, states, weather),
+        'co2_AboveThScr': sv.top_compartment_air_co2(setpoints, states, weather),
+    }
+
+
+def test_every_balance_evaluates_on_scalar_inputs(climate_control):
+    derivatives = balances(*conditions())
+    for name, derivative in derivatives.items():
+        expected_shape = (5,) if name == 't_Soil' else ()
+        assert np.shape(derivative) == expected_shape, name
+        assert np.all(np.isfinite(derivative)), name
+
+
+def test_screen_and_cover_balances_do_not_need_the_mechanical_cooling():
+    setpoints, states, weather = conditions()
+    for derivative in (sv.thermal_screen_temperature(setpoints, states, weather),
+                       sv.internal_cover_temperature(setpoints, states),
+                       sv.blackout_screen_temperature(setpoints, states, weather)):
+        assert np.isfinite(derivative)
+
+
+def test_condensation_of_a_subset_of_surfaces_matches_all_surfaces(climate_control):
+    setpoints, states, _ = conditions()
+    condensation = sv.condensation_fluxes(setpoints, states)
+    screen = sv.condensation_fluxes(setpoints, states, ('BlScr', 'ThScr'))
+    np.testing.assert_allclose(screen.latent_heat_flux_AirThScr, condensation.latent_heat_flux_AirThScr)
+    np.testing.assert_allclose(screen.mass_vapor_flux_AirBlScr, condensation.mass_vapor_flux_AirBlScr)
+    np.testing.assert_allclose(sv.above_thermal_screen_to_internal_cover_vapor_flux(states),
+                               condensation.mass_vapor_flux_TopCov_in)
+
+
+def _lane(values, index):
+    return type(values)(*[np.asarray(value)[index] if np.ndim(value) > (field == 't_Soil') else value
+                          for field, value in zip(values._fields, values)])
+
+
+def test_batched_balances_match_the_scalar_balances(climate_control):
+    setpoints, states, weather = conditions()
+    offsets = np.array([-4., -0.5, 0., 0.5, 4.])
+    batch_setpoints = setpoints._replace(U_ThScr=np.array([0., 0.5, 1., 0.5, 0.2]), U_Roof=np.linspace(0.1, 1, 5))
+    batch_states = states._replace(t_Air=states.t_Air + offsets, t_ThScr=states.t_Air + offsets[::-1],
+                                   t_Soil=states.t_Soil + offsets[:, np.newaxis],
+                                   vapor_pressure_Air=states.vapor_pressure_Air + 100 * offsets)
+    batch_weather = weather._replace(outdoor_global_rad=np.array([0., 100., 300., 500., 800.]))
+    batched = balances(batch_setpoints, batch_states, batch_weather)
+    for index in range(len(offsets)):
+        scalar = balances(_lane(batch_setpoints, index), _lane(batch_states, index), _lane(batch_weather, index))
+        for name, derivative in scalar.items():
+            np.testing.assert_allclose(batched[name][index] if name != 't_Soil' else batched[name][:, index],
+                                       derivative, rtol=1e-10, err_msg=name)
+
+
+def test_condensation_is_differentiable_at_equal_temperatures():
+    setpoints, states, _ = conditions()
+    states = states._replace(vapor_pressure_Air=2500.)
+    delta = 1e-7
+
+    def latent_heat_flux(t_ThScr):
+        return sv.condensation_fluxes(setpoints, states._replace(t_ThScr=t_ThScr), ('ThScr',)).latent_heat_flux_AirThScr
+
+    right = (latent_heat_flux(states.t_Air + delta) - latent_heat_flux(states.t_Air)) / delta
+    left = (latent_heat_flux(states.t_Air) - latent_heat_flux(states.t_Air - delta)) / delta
+    assert np.isfinite(right) and right == pytest.approx(left, rel=1e-2)
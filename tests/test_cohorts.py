@@ -0,0 +1,57 @@
+import numpy as np
+
+import climate.state_variables as sv
+from coefficients import Coefficients
+from crop.tomato.cohorts import CohortClimateCoupling, cohort_derivatives, cohort_population, cohort_states, \
+    planted_cohorts, total_leaf_area_index
+from crop.tomato.coupling import TomatoClimateCoupling
+from crop.tomato.crop_model import crop_states_to_vector
+from crop.tomato.state_variables import crop_derivatives
+from crop.tomato.utils import leaf_area_index
+from data_models import climate_states_to_vector
+from test_climate_balances import conditions
+from test_crop_coupling import crop_states
+
+
+def _younger_states():
+    return crop_states()._replace(carbohydrate_amount_Leaf=1e4, sum_canopy_t=0., carbohydrate_amount_Buf=1e3)
+
+
+def test_one_cohort_equals_the_single_crop():
+    climate_vec = climate_states_to_vector(conditions()[1])
+    population = cohort_population([crop_states()])
+    np.testing.assert_allclose(cohort_derivatives(population.states, climate_vec)[0],
+                               crop_derivatives(crop_states_to_vector(crop_states()), climate_vec), rtol=1e-12)
+    np.testing.assert_allclose(total_leaf_area_index(population.states, population.floor_fractions),
+                               leaf_area_index(crop_states().carbohydrate_amount_Leaf))
+
+
+def test_cohorts_are_evaluated_separately():
+    climate_vec = climate_states_to_vector(conditions()[1])
+    population = cohort_population([crop_states(), _younger_states()], floor_fractions=[0.25, 0.75],
+                                   planting_times=[0., 3600.])
+    planted = planted_cohorts(population, 0.)
+    np.testing.assert_array_equal(planted, [True, False])
+    derivatives = cohort_derivatives(population.states, climate_vec, planted)
+    np.testing.assert_allclose(derivatives[0], crop_derivatives(population.states[0], climate_vec), rtol=1e-12)
+    np.testing.assert_array_equal(derivatives[1], 0.)
+    np.testing.assert_allclose(cohort_derivatives(population.states, climate_vec, planted_cohorts(population, 3600.))[1],
+                               crop_derivatives(population.states[1], climate_vec), rtol=1e-12)
+    np.testing.assert_allclose(total_leaf_area_index(population.states, population.floor_fractions, planted),
+                               0.25 * leaf_area_index(crop_states().carbohydrate_amount_Leaf))
+
+
+def test_cohort_uptake_is_the_floor_weighted_uptake_of_the_cohorts(climate_control):
+    setpoints, states, weather = conditions()
+    population = cohort_population([crop_states(), _younger_states()], floor_fractions=[0.25, 0.75])
+    single = TomatoClimateCoupling()
+    expected = sum(fraction * single.canopy_co2_uptake(cohort, states)
+                   for fraction, cohort in zip(population.floor_fractions, [crop_states(), _younger_states()]))
+    coupling = CohortClimateCoupling(population.floor_fractions)
+    np.testing.assert_allclose(coupling.canopy_co2_uptake(cohort_states(population.states), states), expected,
+                               rtol=1e-12)
+    states = states._replace(mass_co2_flux_AirCanopy=0.)
+    uncoupled = sv.greenhouse_air_co2(setpoints, states, weather)
+    coupled = sv.greenhouse_air_co2(setpoints, states, weather, crop_coupling=coupling,
+                                    crop_states=cohort_states(population.states))
+    np.testing.assert_allclose(uncoupled - coupled, expected / Coefficients.Construction.air_height, rtol=1e-10)
@@ -0,0 +1,31 @@
+import numpy as np
+
+import climate.state_variables as sv
+from coefficients import Coefficients
+from crop.tomato.coupling import TomatoClimateCoupling
+from crop.tomato.crop_model import CropStates
+from crop.tomato.state_variables import carbohydrate_flow_from_air_to_buffer
+from crop.tomato.tomato_constants import CO2_TO_CH2O_MASS_RATIO, FRUIT_DEVELOPMENT_STAGES_NUM
+from test_climate_balances import conditions
+
+
+def crop_states() -> CropStates:
+    return CropStates(carbohydrate_amount_Buf=5e3,
+                      carbohydrate_amount_Fruits=np.linspace(1e3, 2e3, FRUIT_DEVELOPMENT_STAGES_NUM),
+                      number_Fruits=np.linspace(2, 1, FRUIT_DEVELOPMENT_STAGES_NUM),
+                      carbohydrate_amount_Leaf=4e4,
+                      carbohydrate_amount_Stem=3e4,
+                      dry_matter_Har=0.0,
+                      sum_canopy_t=500.0,
+                      last_24_canopy_t=20.0)
+
+
+def test_air_co2_loses_the_buffer_inflow_of_the_same_evaluation(climate_control):
+    setpoints, states, weather = conditions()
+    states = states._replace(mass_co2_flux_AirCanopy=0.)
+    uncoupled = sv.greenhouse_air_co2(setpoints, states, weather)
+    coupled = sv.greenhouse_air_co2(setpoints, states, weather, crop_coupling=TomatoClimateCoupling(),
+                                    crop_states=crop_states())
+    uptake = CO2_TO_CH2O_MASS_RATIO * carbohydrate_flow_from_air_to_buffer(crop_states(), states)
+    assert uptake > 0
+    np.testing.assert_allclose(uncoupled - coupled, uptake / Coefficients.Construction.air_height, rtol=1e-10)
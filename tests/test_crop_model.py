@@ -0,0 +1,15 @@
+import numpy as np
+
+from crop.tomato.model import TomatoModel
+from crop_model import CropModel, available_crop_models, create_crop_model
+
+
+def test_create_tomato_model():
+    assert 'tomato' in available_crop_models()
+    model = create_crop_model('tomato', layers_num=3)
+    assert isinstance(model, TomatoModel)
+    assert isinstance(model, CropModel)
+    assert model.layers_num == 3
+
+    observations = model.observations(np.ones((2, model.states_size)))
+    assert observations.shape == (2, len(TomatoModel.observation_names))
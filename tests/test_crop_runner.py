@@ -0,0 +1,51 @@
+import numpy as np
+
+from crop.tomato.crop_model import NUMBERS_SLICE, crop_states_to_vector
+from crop.tomato.crop_runner import run_crop
+from crop.tomato.state_variables import crop_derivatives_of_climate
+from crop.tomato.tomato_constants import LAI_Max, PROCESS_GAIN, SPECIFIC_LEAF_AREA_INDEX
+from test_crop_coupling import crop_states
+
+DT = 3600.
+N_STEPS = 24 * 30
+
+
+def _constant_climate(n_steps=N_STEPS, seasons=()):
+    shape = tuple(seasons) + (n_steps,)
+    return np.full(shape, 21.), np.full(shape, 700.), np.full(shape, 300.)
+
+
+def test_first_step_is_an_euler_step():
+    initial = crop_states_to_vector(crop_states())
+    run = run_crop(initial, *_constant_climate(n_steps=2), DT, fast=False)
+    expected = initial + DT * crop_derivatives_of_climate(initial, 21., 700., 300.)
+    leaf = NUMBERS_SLICE.stop
+    np.testing.assert_allclose(np.delete(run.states, leaf), np.delete(expected, leaf), rtol=1e-12)
+    # The implicit pruning only slows the leaves down
+    assert abs(run.states[leaf] - initial[leaf]) <= abs(expected[leaf] - initial[leaf])
+
+
+def test_constant_climate_settles_the_temperatures_and_the_leaves():
+    run = run_crop(crop_states(), *_constant_climate(), DT, record_every=24)
+    assert run.trajectory.shape == (N_STEPS // 24, len(crop_states_to_vector(crop_states())))
+    np.testing.assert_array_equal(run.record_steps, np.arange(0, N_STEPS, 24))
+    np.testing.assert_array_equal(run.trajectory[0], crop_states_to_vector(crop_states()))
+    assert np.all(np.isfinite(run.states))
+    final = run.final_states
+    np.testing.assert_allclose(final.sum_canopy_t, crop_states().sum_canopy_t + (N_STEPS - 1) * DT * 21. / 86400)
+    np.testing.assert_allclose(final.last_24_canopy_t, PROCESS_GAIN * 21., rtol=1e-6)
+    # The semi-implicit pruning holds the leaves at their maximum with steps of an hour
+    leaves = run.trajectory[:, NUMBERS_SLICE.stop]
+    np.testing.assert_allclose(leaves[-5:], final.carbohydrate_amount_Leaf, rtol=1e-6)
+    assert final.carbohydrate_amount_Leaf < 1.1 * LAI_Max / SPECIFIC_LEAF_AREA_INDEX
+
+
+def test_seasons_are_integrated_together():
+    climate = _constant_climate(n_steps=48, seasons=(3,))
+    climate[0][1] += 3.
+    climate[2][2, 12:] = 0.
+    batch = run_crop(crop_states(), *climate, DT)
+    for season in range(3):
+        alone = run_crop(crop_states(), *(series[season] for series in climate), DT)
+        np.testing.assert_allclose(batch.states[season], alone.states, rtol=1e-12)
+    assert not np.allclose(batch.states[0], batch.states[1])
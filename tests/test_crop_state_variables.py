@@ -0,0 +1,41 @@
+import numpy as np
+
+from crop.tomato.crop_model import NUMBERS_SLICE, FRUITS_SLICE, crop_states_to_vector
+from crop.tomato.state_variables import accumulated_harvested_tomato_dry_matter, buffer_carbohydrates_amount, \
+    crop_derivatives_of_climate, fruit_development_stages, leaves_stored_carbohydrates_amount, \
+    stem_and_roots_stored_carbohydrates_amount
+from crop.tomato.utils import smoothed_conditional_function
+from data_models import ClimateStates
+from test_crop_coupling import crop_states
+
+CANOPY_T = 21.0
+CO2_AIR = 700.0
+PAR_CANOPY = 300.0
+
+
+def climate_states() -> ClimateStates:
+    values = dict.fromkeys(ClimateStates._fields, 0.0)
+    values.update(t_Canopy=CANOPY_T, co2_Air=CO2_AIR, PAR_Canopy=PAR_CANOPY)
+    return ClimateStates(**values)
+
+
+def test_state_functions_agree_with_crop_derivatives():
+    states = crop_states()
+    derivatives = crop_derivatives_of_climate(crop_states_to_vector(states), CANOPY_T, CO2_AIR, PAR_CANOPY)
+    tail = NUMBERS_SLICE.stop
+
+    np.testing.assert_allclose(derivatives[0], buffer_carbohydrates_amount(states, climate_states()), rtol=1e-10)
+    np.testing.assert_allclose(derivatives[tail], leaves_stored_carbohydrates_amount(states), rtol=1e-10)
+    np.testing.assert_allclose(derivatives[tail + 1], stem_and_roots_stored_carbohydrates_amount(states), rtol=1e-10)
+    np.testing.assert_allclose(derivatives[tail + 2], accumulated_harvested_tomato_dry_matter(states), rtol=1e-10)
+    stages = fruit_development_stages(states, climate_states())
+    np.testing.assert_allclose(derivatives[FRUITS_SLICE], stages.carbohydrate_amount_Fruits, rtol=1e-10)
+    np.testing.assert_allclose(derivatives[NUMBERS_SLICE], stages.number_Fruits, rtol=1e-10)
+
+
+def test_smoothed_conditional_function_does_not_overflow():
+    state = np.array([-1e6, 9., 10., 11., 1e6])
+    with np.errstate(over='raise'):
+        values = smoothed_conditional_function(state, -0.869, 10)
+    np.testing.assert_allclose(values[1:4], 1 / (1 + np.exp(-0.869 * (state[1:4] - 10))), rtol=1e-12)
+    np.testing.assert_allclose(values[[0, -1]], [0., 1.])
@@ -0,0 +1,35 @@
+import numpy as np
+
+from climate.parameters import design_parameters, model_parameters
+from coefficients import Coefficients
+from design import activate_design, active_design, default_design, design_from_dict
+
+
+def test_config_is_independent_of_the_active_design():
+    config = {'Heating': {'phi_external_pipe': 0.06}}
+    before = design_from_dict(config)
+    previous = activate_design(default_design().replace({'Heating': {'pipe_length': 3.3}}))
+    try:
+        after = design_from_dict(config)
+        assert Coefficients.Heating.pipe_length == 3.3
+        assert active_design().Heating.pipe_length == 3.3
+    finally:
+        activate_design(previous)
+    assert after == before
+    assert after.Heating.pipe_length == default_design().Heating.pipe_length
+    assert active_design() == default_design()
+    assert model_parameters() == design_parameters(default_design())
+
+
+def test_climate_models_evaluate_their_own_design():
+    from climate_model import GreenhouseClimateModel
+    from test_spectral_radiation import _conditions
+
+    states, setpoints, weather = _conditions()
+    design = default_design().replace({'Construction': {'ratio_GlobAir': 0.2}})
+    model = GreenhouseClimateModel(design)
+    default_model = GreenhouseClimateModel(default_design())
+    absorbed = model.shortwave_absorption(states, setpoints, weather).radiation_flux_Glob_SunAir
+    assert active_design() == default_design()
+    default_absorbed = default_model.shortwave_absorption(states, setpoints, weather).radiation_flux_Glob_SunAir
+    assert np.all(absorbed[weather.outdoor_global_rad > 0] > default_absorbed[weather.outdoor_global_rad > 0])
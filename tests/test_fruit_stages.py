@@ -0,0 +1,30 @@
+import numpy as np
+
+from crop.tomato import tomato_constants
+from crop.tomato.fruit_stages import GROWTH_TABLE_MAX_T, GROWTH_TABLE_MIN_T, fruit_growth_rates, fruit_growth_table
+
+T = np.linspace(GROWTH_TABLE_MIN_T, GROWTH_TABLE_MAX_T, 3001)
+# The rates of the late stages hardly change with the temperature, their interpolation error is round-off
+ROUND_OFF = 1e-14
+
+
+def test_fast_rates_are_within_the_table_error():
+    table = fruit_growth_table()
+    fast, exact = fruit_growth_rates(T, fast=True), fruit_growth_rates(T)
+    assert fast.shape == (len(T), tomato_constants.FRUIT_DEVELOPMENT_STAGES_NUM)
+    np.testing.assert_allclose(fast, exact, rtol=table.max_relative_error + ROUND_OFF)
+    outside = np.array([GROWTH_TABLE_MIN_T - 1., GROWTH_TABLE_MAX_T + 1.])
+    np.testing.assert_array_equal(fruit_growth_rates(outside, fast=True), fruit_growth_rates(outside))
+
+
+def test_table_is_rebuilt_when_a_constant_changes(monkeypatch):
+    table = fruit_growth_table()
+    assert fruit_growth_table() is table
+    monkeypatch.setattr(tomato_constants, 'POTENTIAL_FRUIT_DRY_WEIGHT', 2 * tomato_constants.POTENTIAL_FRUIT_DRY_WEIGHT)
+    rebuilt = fruit_growth_table()
+    assert rebuilt is not table
+    np.testing.assert_allclose(fruit_growth_rates(T, fast=True), fruit_growth_rates(T),
+                               rtol=rebuilt.max_relative_error + ROUND_OFF)
+    monkeypatch.undo()
+    np.testing.assert_allclose(fruit_growth_rates(T, fast=True), fruit_growth_rates(T),
+                               rtol=table.max_relative_error + ROUND_OFF)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from climate.ledger import FluxLedger
+from test_climate_balances import balances, conditions
+
+
+def _euler_step(states, derivatives, dt):
+    return states._replace(**{name: getattr(states, name) + dt * derivative
+                              for name, derivative in derivatives.items()})
+
+
+def test_recorded_fluxes_close_over_an_euler_step(climate_control):
+    setpoints, states, weather = conditions()
+    dt = 60.
+    with FluxLedger(n_steps=1, decimation=1) as ledger:
+        derivatives = balances(setpoints, states, weather)
+        ledger.step(dt, states, _euler_step(states, derivatives, dt))
+    assert {compartment for compartment, _ in ledger.names} \
+        == set(derivatives) - {'t_Soil'} | {f't_Soil_{j}' for j in range(1, 6)}
+    assert ledger.check_closure() == {}
+    assert ledger.integral('t_Canopy', 'radiation_flux_PAR_SunCanopy') > 0
+
+
+def test_a_flux_missing_from_the_state_change_is_a_closure_error():
+    ledger = FluxLedger()
+    ledger.record_balance('t_Air', 2., gains=dict(heating=10.), losses=dict(ventilation=4.))
+    states = conditions()[1]
+    # capacity * change = 2 * 1.5 = 3, the fluxes integrate to 6
+    ledger.step(1., states, states._replace(t_Air=states.t_Air + 1.5))
+    assert ledger.check_closure() == pytest.approx({'t_Air': 3. / 14.})
+
+
+def test_batched_fluxes_are_rejected():
+    with FluxLedger() as ledger:
+        with pytest.raises(ValueError, match='one greenhouse at a time'):
+            ledger.record_balance('t_Air', 2., gains=dict(heating=np.ones(3)), losses={})
+
@@ -0,0 +1,14 @@
+import numpy as np
+
+from climate.capacities import remaining_object_heat_capacity
+from climate.parameters import compile_parameters
+from coefficients import Coefficients
+from constants import C_PAIR, M_AIR, M_GAS
+
+
+def test_top_compartment_capacity_at_its_temperature():
+    parameters = compile_parameters(Coefficients)
+    for t_AboveThScr in (-5., 16., 35.):
+        density_Top = M_AIR * parameters.pressure / ((t_AboveThScr + 273.15) * M_GAS)
+        np.testing.assert_allclose(parameters.cap_Top_kelvin / (t_AboveThScr + 273.15),
+                                   remaining_object_heat_capacity(parameters.h_Top, density_Top, C_PAIR), rtol=1e-12)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from crop.tomato.crop_model import crop_states_to_vector
+from crop.tomato.photosynthesis_surrogate import GridAxis, PhotosynthesisSurrogate, SurrogateGrid
+from crop.tomato.state_variables import crop_derivatives_of_climate
+from test_crop_coupling import crop_states
+
+GRID = SurrogateGrid(canopy_t=GridAxis(10, 30, 21), PAR_Canopy=GridAxis(0, 1000, 41),
+                     carbohydrate_amount_Leaf=GridAxis(1e4, 1e5, 19))
+
+
+def test_surrogate_is_exact_on_the_grid_and_outside_it():
+    surrogate = PhotosynthesisSurrogate(GRID)
+    canopy_t, PAR_Canopy, leaf = np.meshgrid(*(axis.points[::4] for axis in GRID), indexing='ij')
+    np.testing.assert_allclose(surrogate(800., canopy_t, PAR_Canopy, leaf),
+                               surrogate.exact(800., canopy_t, PAR_Canopy, leaf), rtol=1e-12, atol=1e-12)
+    # Each input in turn below or above its axis
+    outside = np.array([[5., 500., 5e4], [35., 500., 5e4], [20., -1., 5e4], [20., 1500., 5e4], [20., 500., 5e3],
+                        [20., 500., 2e5]]).T
+    np.testing.assert_array_equal(surrogate(800., *outside), surrogate.exact(800., *outside))
+
+
+def test_error_report_bounds_the_interpolation_error():
+    surrogate = PhotosynthesisSurrogate(GRID)
+    report = surrogate.error_report(samples_num=20000)
+    assert report.samples_num == 20000
+    assert 0 < report.rms_error <= report.max_absolute_error
+    assert report.max_relative_error < 1e-2
+    rng = np.random.default_rng(1)
+    samples = [rng.uniform(300, 2000, 1000)] + [rng.uniform(axis.start, axis.stop, 1000) for axis in GRID]
+    assert np.max(np.abs(surrogate(*samples) - surrogate.exact(*samples))) <= 2 * report.max_absolute_error
+
+
+@pytest.mark.parametrize('layers_num', [0, 3])
+def test_crop_derivatives_with_the_surrogate(layers_num):
+    surrogate = PhotosynthesisSurrogate(GRID, layers_num)
+    # Between the grid points
+    crop_vec = crop_states_to_vector(crop_states()._replace(carbohydrate_amount_Leaf=4.2e4))
+    exact = crop_derivatives_of_climate(crop_vec, 21.3, 700., 310., layers_num=layers_num)
+    approximate = crop_derivatives_of_climate(crop_vec, 21.3, 700., 310., photosynthesis_surrogate=surrogate)
+    np.testing.assert_allclose(approximate, exact, rtol=1e-3, atol=1e-9)
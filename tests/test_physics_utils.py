@@ -0,0 +1,35 @@
+import numpy as np
+
+from physics_utils import TABLE_MAX_T, TABLE_MIN_T, InterpolationTable, _exact_saturation_vapor_pressure, \
+    saturation_vapor_pressure, saturation_vapor_pressure_table
+
+
+def test_max_relative_error_bounds_the_error_on_a_dense_grid():
+    table = saturation_vapor_pressure_table()
+    t = np.linspace(TABLE_MIN_T, TABLE_MAX_T, 200001)
+    exact = _exact_saturation_vapor_pressure(t)
+    error = np.max(np.abs(table(t) - exact) / exact)
+    assert 0 < error <= table.max_relative_error * (1 + 1e-9)
+    assert table.max_relative_error < 4e-6
+    np.testing.assert_allclose(saturation_vapor_pressure(t, fast=True), exact, rtol=table.max_relative_error)
+
+
+def test_out_of_range_inputs_use_the_exact_function():
+    table = saturation_vapor_pressure_table()
+    t = np.array([TABLE_MIN_T - 10, TABLE_MIN_T - 0.01, TABLE_MAX_T + 0.01, TABLE_MAX_T + 30])
+    np.testing.assert_array_equal(table(t), _exact_saturation_vapor_pressure(t))
+    assert table(TABLE_MAX_T + 5.) == _exact_saturation_vapor_pressure(TABLE_MAX_T + 5.)
+
+
+
+def test_vector_valued_table_appends_the_value_axes():
+    def function(x):
+        x = np.asarray(x)
+        return np.stack([np.exp(0.1 * x), np.exp(-0.1 * x)], axis=-1)
+
+    table = InterpolationTable(function, 0., 10., 0.01)
+    x = np.array([[-1., 0.005, 3.3333], [5., 9.999, 12.]])
+    values = table(x)
+    assert values.shape == (2, 3, 2)
+    np.testing.assert_allclose(values, function(x), rtol=table.max_relative_error * (1 + 1e-9))
+    np.testing.assert_array_equal(values[[0, 1], [0, 2]], function(np.array([-1., 12.])))
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from crop.tomato import tomato_constants
+from crop.tomato.canopy_layers import multi_layer_electron_transport
+from sensitivity import evaluate_samples, parameter_space
+
+
+def electron_transport(values, design):
+    return np.atleast_1d(multi_layer_electron_transport(40000., 21., 500.))[:, np.newaxis]
+
+
+def test_tomato_constants_are_perturbed_in_the_crop_functions():
+    space = parameter_space(['tomato.DIRECT_PAR_FRACTION'], bounds={'tomato.DIRECT_PAR_FRACTION': (0., 1.)})
+    outputs = evaluate_samples(electron_transport, space, np.array([[0.], [1.]]))
+    assert outputs[0, 0] != outputs[1, 0]
+    assert tomato_constants.DIRECT_PAR_FRACTION == 0.3
+
+
+def test_parameters_which_cannot_be_varied_are_rejected():
+    for name in ('tomato.CANOPY_LAYERS_NUM', 'tomato.NO_SUCH_CONSTANT', 'Heating.no_such_coefficient',
+                 'Soil.soil_thicknesses'):
+        with pytest.raises(ValueError):
+            parameter_space([name], bounds={name: (1., 2.)})
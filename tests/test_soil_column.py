@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from climate.soil_column import implicit_soil_column_step, soil_column, soil_column_derivatives
+from climate.state_variables import soil_temperature, soil_temperatures
+from data_models import Weather, climate_states_array_class, climate_states_from_vector, climate_states_to_vector
+from design import default_design, use_design
+
+
+def test_implicit_step_needs_the_column_of_a_single_design():
+    swept = soil_column(np.array([[0.04, 0.08, 0.16], [0.05, 0.1, 0.2]]))
+    t_Soil = np.full((2, 3), 12.)
+    assert soil_column_derivatives(swept, t_Soil, 20., 10.).shape == (2, 3)
+    with pytest.raises(ValueError, match='single design'):
+        implicit_soil_column_step(swept, t_Soil, 20., 10., 60.)
+
+
+def test_implicit_step_of_a_sweep_of_one_design():
+    thicknesses = np.array([0.04, 0.08, 0.16])
+    t_Soil = np.array([[15., 12., 11.]])
+    single = implicit_soil_column_step(soil_column(thicknesses), t_Soil, 20., 10., 60.)
+    np.testing.assert_allclose(implicit_soil_column_step(soil_column(thicknesses[np.newaxis]), t_Soil, 20., 10., 60.),
+                               single)
+
+
+def test_states_carry_the_layers_of_the_design():
+    thicknesses = (0.02, 0.04, 0.06, 0.1, 0.15, 0.2, 0.3, 0.4)
+    vector = np.arange(20. + len(thicknesses))
+    states = climate_states_from_vector(vector)
+    assert states.t_Soil.shape == (len(thicknesses),)
+    np.testing.assert_array_equal(climate_states_to_vector(states), vector)
+    assert climate_states_array_class(len(thicknesses)).from_tuple(states).buffer.shape == vector.shape
+
+    weather = Weather(outdoor_global_rad=0., t_Outdoor=5., t_Sky=-10., t_Soil_Out=10., co2_outdoor=700.,
+                      vapor_pressure_outdoor=800., v_Wind=2.)
+    states = states._replace(t_Floor=18., t_Soil=np.linspace(16., 11., len(thicknesses)))
+    with use_design(default_design().replace({'Soil': {'soil_thicknesses': thicknesses}})):
+        layers = [soil_temperature(j, states, weather) for j in range(1, len(thicknesses) + 1)]
+        np.testing.assert_allclose(soil_temperatures(states, weather), layers)
+    with pytest.raises(ValueError, match='layers'):
+        soil_temperature(1, states, weather)
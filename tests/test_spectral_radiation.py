@@ -0,0 +1,40 @@
+import numpy as np
+
+from climate.spectral_radiation import lumped_shortwave_absorption, spectral_shortwave_absorption
+from climate.state_variables import canopy_temperature, floor_temperature, lamps_temperature
+from data_models import ClimateStates, Setpoints, Weather
+
+
+def _conditions():
+    setpoints = Setpoints(U_Blow=0., U_Boil=0.5, U_MechCool=0., U_Fog=0., U_Roof=np.array([0., 0.3, 1.]),
+                          U_Side=0., U_VentForced=0., U_Extco2=0., U_ShScr=0., U_ThScr=np.array([1., 0.5, 0.]),
+                          U_Ind=0., U_Geo=0., U_Lamp=1., U_IntLamp=0., U_BoilGro=0., U_BlScr=0.)
+    states = ClimateStates(t_Pipe=40., t_Canopy=20., t_Air=20., t_Cov_internal=10., t_Cov_external=8.,
+                           t_ThScr=15., t_AboveThScr=15., t_Floor=18., t_Soil=np.full(5, 15.), t_BlScr=18.,
+                           t_GrowPipe=30., t_Lamp=30., t_IntLamp=20., co2_Air=700., co2_AboveThScr=600.,
+                           vapor_pressure_Air=1500., vapor_pressure_AboveThScr=1200.,
+                           leaf_area_index=np.array([0.5, 2., 4.]), t_MechCool=15., mass_co2_flux_AirCanopy=0.,
+                           PAR_Canopy=0.)
+    weather = Weather(outdoor_global_rad=np.array([0., 300., 800.]), t_Outdoor=10., t_Sky=-5., t_Soil_Out=10.,
+                      co2_outdoor=400., vapor_pressure_outdoor=800., v_Wind=3.)
+    return states, setpoints, weather
+
+
+def test_spectral_band_sums_reproduce_lumped_model():
+    states, setpoints, weather = _conditions()
+    lumped = lumped_shortwave_absorption(states, setpoints, weather)
+    spectral = spectral_shortwave_absorption(states, setpoints, weather)
+    for name, lumped_flux, spectral_flux in zip(lumped._fields, lumped, spectral):
+        np.testing.assert_allclose(spectral_flux, np.broadcast_to(lumped_flux, spectral_flux.shape),
+                                   rtol=1e-10, atol=1e-10, err_msg=name)
+
+
+def test_energy_balances_accept_spectral_mode():
+    states, setpoints, weather = _conditions()
+    shortwave = spectral_shortwave_absorption(states, setpoints, weather)
+    np.testing.assert_allclose(canopy_temperature(setpoints, states, weather, shortwave),
+                               canopy_temperature(setpoints, states, weather))
+    np.testing.assert_allclose(floor_temperature(setpoints, states, weather, shortwave),
+                               floor_temperature(setpoints, states, weather))
+    np.testing.assert_allclose(lamps_temperature(setpoints, states, weather, shortwave),
+                               lamps_temperature(setpoints, states, weather))
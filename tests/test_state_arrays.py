@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from crop.tomato.crop_model import CropStatesArray, crop_states_to_vector
+from data_models import ClimateStatesArray, SetpointsArray, climate_states_to_vector
+from test_climate_balances import conditions
+from test_crop_coupling import crop_states
+
+
+def test_fields_are_views_on_the_buffer():
+    states = ClimateStatesArray.zeros((3,))
+    states.t_Air = [18., 19., 20.]
+    states.t_Soil[1, 2] = 12.
+    np.testing.assert_array_equal(states.buffer[:, ClimateStatesArray.layout.index('t_Air')], [18., 19., 20.])
+    assert states.buffer[1, ClimateStatesArray.layout.index('t_Soil')][2] == 12.
+    # The solver writes into the buffer in place, the fields and the tuple follow
+    as_tuple = states.as_tuple()
+    states.buffer += 1.
+    np.testing.assert_array_equal(states.t_Air, [19., 20., 21.])
+    np.testing.assert_array_equal(as_tuple.t_Air, [19., 20., 21.])
+    assert all(np.shares_memory(field, states.buffer) for field in as_tuple)
+    assert as_tuple.t_Soil.shape == (3, 5) and as_tuple.t_Air.shape == (3,)
+
+
+def test_scalar_fields_stay_views_without_batch_axes():
+    setpoints = SetpointsArray.zeros()
+    view = setpoints.U_Boil
+    assert view.shape == ()
+    setpoints.buffer[...] = 0.5
+    assert view == 0.5
+
+
+def test_tuples_round_trip_with_the_vector_layout():
+    states = conditions()[1]
+    array_states = ClimateStatesArray.from_tuple(states)
+    np.testing.assert_array_equal(array_states.buffer, climate_states_to_vector(states))
+    for name, field in zip(states._fields, array_states.as_tuple()):
+        np.testing.assert_array_equal(field, getattr(states, name))
+
+    crop = CropStatesArray.from_tuple(crop_states())
+    np.testing.assert_array_equal(crop.buffer, crop_states_to_vector(crop_states()))
+    copy = crop.copy()
+    copy.carbohydrate_amount_Buf = 0.
+    assert crop.carbohydrate_amount_Buf == crop_states().carbohydrate_amount_Buf
+
+
+def test_batched_tuples_broadcast_to_one_buffer():
+    states = conditions()[1]._replace(t_Air=np.array([18., 19.]))
+    array_states = ClimateStatesArray.from_tuple(states)
+    assert array_states.batch_shape == (2,)
+    np.testing.assert_array_equal(array_states.t_Soil, np.broadcast_to(conditions()[1].t_Soil, (2, 5)))
+    np.testing.assert_array_equal(array_states.co2_Air, [700., 700.])
+
+
+def test_buffers_are_checked_and_used_without_copy():
+    buffer = np.zeros((4, ClimateStatesArray.layout.size))
+    assert ClimateStatesArray(buffer).buffer is buffer
+    with pytest.raises(ValueError):
+        ClimateStatesArray(np.zeros((4, ClimateStatesArray.layout.size + 1)))
+    with pytest.raises(AttributeError):
+        ClimateStatesArray(buffer).t_Unknown = 1.
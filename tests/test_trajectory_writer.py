@@ -0,0 +1,87 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from trajectory_writer import NpySink, TrajectoryWriter
+
+
+class ListSink(object):
+    def __init__(self, gate: threading.Event = None, fail_after: int = None):
+        self.blocks = []
+        self.closed = False
+        self.gate = gate
+        self.fail_after = fail_after
+
+    def write(self, block):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.fail_after is not None and len(self.blocks) >= self.fail_after:
+            raise OSError('disk full')
+        self.blocks.append(block.copy())
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def rows(self):
+        return np.concatenate(self.blocks) if self.blocks else np.empty((0,))
+
+
+def _rows(n_rows):
+    return np.arange(n_rows * 6, dtype=float).reshape(n_rows, 2, 3)
+
+
+def test_npy_sink_round_trip(tmp_path):
+    rows = _rows(11)
+    with TrajectoryWriter(NpySink(tmp_path / 'states.npy', (2, 3)), (2, 3), block_rows=3) as writer:
+        for row in rows:
+            writer.record(row)
+    np.testing.assert_array_equal(np.load(tmp_path / 'states.npy', mmap_mode='r'), rows)
+
+
+def test_flush_writes_the_partial_block():
+    sink = ListSink()
+    writer = TrajectoryWriter(sink, (2, 3), block_rows=4)
+    rows = _rows(6)
+    for row in rows:
+        writer.record(row)
+    writer.flush()
+    np.testing.assert_array_equal(sink.rows, rows)
+    # Recording continues after a flush
+    writer.record(rows[0])
+    writer.close()
+    assert sink.closed
+    np.testing.assert_array_equal(sink.rows, np.concatenate([rows, rows[:1]]))
+
+
+def test_recording_waits_for_a_free_block():
+    gate = threading.Event()
+    sink = ListSink(gate=gate)
+    writer = TrajectoryWriter(sink, (2, 3), block_rows=2, blocks_num=2)
+    rows = _rows(10)
+    recorder = threading.Thread(target=lambda: [writer.record(row) for row in rows])
+    recorder.start()
+    time.sleep(0.2)
+    # One block is being written, the other waits for the writer: the recorder holds at two blocks of rows
+    assert recorder.is_alive()
+    assert writer.n_rows == 4
+    gate.set()
+    recorder.join(timeout=5)
+    writer.close()
+    np.testing.assert_array_equal(sink.rows, rows)
+
+
+def test_sink_errors_are_raised_on_the_recording_thread():
+    sink = ListSink(fail_after=1)
+    writer = TrajectoryWriter(sink, (2, 3), block_rows=2)
+    with pytest.raises(RuntimeError) as raised:
+        for row in _rows(20):
+            writer.record(row)
+            time.sleep(0.005)
+        writer.flush()
+    assert isinstance(raised.value.__cause__, OSError)
+    writer.close()
+    assert sink.closed
+    assert len(sink.blocks) == 1
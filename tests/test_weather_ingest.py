@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from constants import BOLTZMANN
+from weather_ingest import SourceBlock, clear_sky_temperature, fill_gaps, weather_of_source
+
+
+def _blocks(sky_IR, block_rows=10):
+    time = 3600. * np.arange(len(sky_IR))
+    t_Outdoor = 10 + np.sin(time / 86400 * 2 * np.pi)
+    for start in range(0, len(time), block_rows):
+        rows = slice(start, start + block_rows)
+        yield SourceBlock(time=time[rows], quantities={'t_Outdoor': t_Outdoor[rows],
+                                                       'rh_Outdoor': np.full_like(time[rows], 80.),
+                                                       'sky_IR': sky_IR[rows]})
+
+
+def _weather(sky_IR):
+    blocks = list(fill_gaps(_blocks(np.asarray(sky_IR, dtype=float))))
+    time = np.concatenate([block.time for block in blocks])
+    weathers = [weather_of_source(block.quantities) for block in blocks]
+    return time, {field: np.concatenate([getattr(weather, field) for weather in weathers])
+                  for field in ('t_Outdoor', 'vapor_pressure_outdoor', 't_Sky')}
+
+
+def test_missing_sky_IR_falls_back_to_clear_sky_temperature():
+    time, weather = _weather(np.full(48, np.nan))
+    assert len(time) == 48
+    np.testing.assert_allclose(weather['t_Sky'],
+                               clear_sky_temperature(weather['t_Outdoor'], weather['vapor_pressure_outdoor']))
+
+
+def test_long_sky_IR_gap_falls_back_only_inside_the_gap():
+    sky_IR = np.full(48, 300.)
+    sky_IR[2:4] = np.nan  # short gap, interpolated
+    sky_IR[10:30] = np.nan  # long gap, derived from the clear sky
+    time, weather = _weather(sky_IR)
+    clear_sky = clear_sky_temperature(weather['t_Outdoor'], weather['vapor_pressure_outdoor'])
+    measured = (300. / BOLTZMANN) ** 0.25 - 273.15
+    np.testing.assert_allclose(weather['t_Sky'][:10], measured)
+    np.testing.assert_allclose(weather['t_Sky'][10:30], clear_sky[10:30])
+    np.testing.assert_allclose(weather['t_Sky'][30:], measured)
+
+
+def test_long_gap_of_required_quantity_fails():
+    blocks = [SourceBlock(time=3600. * np.arange(24),
+                          quantities={'t_Outdoor': np.where(np.arange(24) < 10, 10., np.nan)}),
+              SourceBlock(time=3600. * np.arange(24, 48), quantities={'t_Outdoor': np.full(24, 10.)})]
+    with pytest.raises(ValueError):
+        list(fill_gaps(blocks))
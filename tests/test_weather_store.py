@@ -0,0 +1,86 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from data_models import Weather
+from weather_store import WeatherStore, WeatherStoreWriter, write_weather_store
+
+N_SAMPLES = 50
+DT = 600.
+
+
+def _records(n_sites=2):
+    time = DT * np.arange(N_SAMPLES)
+    site = np.arange(n_sites)[:, np.newaxis]
+    weather = Weather(outdoor_global_rad=np.maximum(500 * np.sin(time / 86400 * 2 * np.pi), 0) + 10 * site,
+                      t_Outdoor=10 + time / 3600 + site,
+                      t_Sky=np.full(N_SAMPLES, -5.),
+                      t_Soil_Out=np.full(N_SAMPLES, 10.),
+                      co2_outdoor=np.full(N_SAMPLES, 700.),
+                      vapor_pressure_outdoor=800 + site + 0 * time,
+                      v_Wind=3 + 0.01 * time / DT + site)
+    return time, weather
+
+
+def _expected(weather, n_sites=2):
+    return Weather(*(np.broadcast_to(field, (n_sites, N_SAMPLES)) for field in weather))
+
+
+def test_round_trip_of_samples(tmp_path):
+    time, weather = _records()
+    write_weather_store(tmp_path / 'weather.cwx', time, weather, dtype='float64', sites=['north', 'south'])
+    with WeatherStore(tmp_path / 'weather.cwx') as store:
+        assert store.n_sites == 2 and store.n_samples == N_SAMPLES and store.sites == ['north', 'south']
+        np.testing.assert_array_equal(store.time, time)
+        window = store.window(time[3], time[13], DT)
+        for recorded, read in zip(_expected(weather), window):
+            assert read.shape == (2, 10)
+            np.testing.assert_allclose(read, recorded[:, 3:13])
+        at = store.at(time[7], sites=['south'])
+        np.testing.assert_allclose(at.t_Outdoor, weather.t_Outdoor[1, 7:8])
+
+
+def test_window_interpolates_between_samples(tmp_path):
+    time, weather = _records()
+    write_weather_store(tmp_path / 'weather.cwx', time, weather, dtype='float64')
+    with WeatherStore(tmp_path / 'weather.cwx') as store:
+        window = store.window(time[2] + DT / 4, time[6], DT / 2, sites=[1])
+        np.testing.assert_allclose(window.t_Outdoor[0], np.interp(time[2] + DT / 4 + DT / 2 * np.arange(8),
+                                                                  time, weather.t_Outdoor[1]))
+        with pytest.raises(ValueError):
+            store.window(time[-2], time[-1] + 2 * DT, DT)
+
+
+def test_writer_blocks_equal_one_write(tmp_path):
+    time, weather = _records()
+    write_weather_store(tmp_path / 'whole.cwx', time, weather)
+    with WeatherStoreWriter(tmp_path / 'blocks.cwx', n_sites=2, block_samples=7) as writer:
+        for start in range(0, N_SAMPLES, 9):
+            rows = slice(start, start + 9)
+            writer.append(time[rows], Weather(*(np.broadcast_to(field, (2, N_SAMPLES))[:, rows]
+                                                for field in weather)))
+    with WeatherStore(tmp_path / 'whole.cwx') as whole, WeatherStore(tmp_path / 'blocks.cwx') as blocks:
+        np.testing.assert_array_equal(blocks.time, whole.time)
+        for field in Weather._fields:
+            np.testing.assert_array_equal(blocks.columns[field], whole.columns[field])
+
+
+def test_writer_rejects_samples_out_of_order(tmp_path):
+    time, weather = _records(n_sites=1)
+    writer = WeatherStoreWriter(tmp_path / 'weather.cwx')
+    writer.append(time[:10], Weather(*(np.broadcast_to(field, (1, N_SAMPLES))[:, :10] for field in weather)))
+    with pytest.raises(ValueError):
+        writer.append(time[5:10], Weather(*(np.broadcast_to(field, (1, N_SAMPLES))[:, 5:10] for field in weather)))
+    writer.close()
+
+
+def test_pickled_store_reopens_the_file(tmp_path):
+    time, weather = _records()
+    write_weather_store(tmp_path / 'weather.cwx', time, weather)
+    store = WeatherStore(tmp_path / 'weather.cwx')
+    payload = pickle.dumps(store)
+    assert len(payload) < 1000
+    copy = pickle.loads(payload)
+    np.testing.assert_array_equal(copy.at(time[4]).v_Wind, store.at(time[4]).v_Wind)
+    assert copy.sites == store.sites
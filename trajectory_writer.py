@@ -0,0 +1,174 @@
+"""Trajectory writer
+
+Writes recorded states or fluxes to disk on a background thread, so the solver doesn't wait for the I/O.
+The solver copies each recorded row into a preallocated block; a full block is handed to the writer thread and the
+solver continues in the next free block. The blocks circulate between the two threads through bounded queues: when the
+writer falls behind, the solver waits for a free block instead of allocating more memory.
+
+    with TrajectoryWriter(NpySink('states.npy', row_shape), row_shape) as writer:
+        for step in range(n_steps):
+            states = solver_step(states, dt)
+            writer.record(states)
+    np.load('states.npy', mmap_mode='r')  # shape (n_steps,) + row_shape
+
+NumPy releases the GIL while copying blocks to files, so the writes overlap with the solver.
+"""
+import queue
+import struct
+import threading
+
+import numpy as np
+
+# The number of rows of a block
+DEFAULT_BLOCK_ROWS = 1024
+
+# The number of blocks, two for double buffering: the solver fills one while the other is written
+DEFAULT_BLOCKS_NUM = 2
+
+# The size of the header of the files of NpySink, the shape is rewritten in place on close
+NPY_HEADER_SIZE = 256
+
+
+class NpySink(object):
+    """
+    Appends the blocks to a .npy file of shape (n_rows,) + row_shape, which np.load reads after close()
+    """
+
+    def __init__(self, path, row_shape: tuple = (), dtype=np.float64):
+        self.path = path
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.n_rows = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False,
+                       'shape': (self.n_rows,) + self.row_shape})
+        # Format version 1.0: magic, version, header length and the header padded with spaces to the data
+        preamble = b'\x93NUMPY\x01\x00'
+        length = NPY_HEADER_SIZE - len(preamble) - 2
+        if len(header) + 1 > length:
+            raise ValueError(f'The shape {self.row_shape} is too long for the .npy header')
+        self._file.seek(0)
+        self._file.write(preamble + struct.pack('<H', length) + (header.ljust(length - 1) + '\n').encode('latin1'))
+
+    def write(self, block: np.ndarray):
+        self._file.write(np.ascontiguousarray(block, dtype=self.dtype).tobytes())
+        self.n_rows += len(block)
+
+    def close(self):
+        self._write_header()
+        self._file.close()
+
+
+class TrajectoryWriter(object):
+    """
+    Records rows of a fixed shape and writes them to a sink in blocks on a background thread
+    """
+
+    def __init__(self, sink, row_shape: tuple = (), dtype=np.float64, block_rows: int = DEFAULT_BLOCK_ROWS,
+                 blocks_num: int = DEFAULT_BLOCKS_NUM):
+        """
+        Args:
+            sink: an object with write(block) called on the writer thread with blocks of shape (n,) + row_shape,
+                and close() called once all blocks are written, e.g. an NpySink
+            row_shape: the shape of a recorded row, e.g. (n_lanes, n_states)
+            dtype: the type of the recorded values
+            block_rows: the number of rows of a block
+            blocks_num: the number of blocks, at least two
+        """
+        if blocks_num < 2 or block_rows < 1:
+            raise ValueError('The writer needs at least two blocks of at least one row')
+        self.sink = sink
+        self.row_shape = tuple(row_shape)
+        self.n_rows = 0
+        self.closed = False
+        self._free = queue.Queue()
+        for _ in range(blocks_num):
+            self._free.put(np.empty((block_rows,) + self.row_shape, dtype=dtype))
+        # At most blocks_num - 1 full blocks wait for the writer, the solver fills the last one
+        self._full = queue.Queue(maxsize=blocks_num - 1)
+        self._blocks_num = blocks_num
+        self._block = self._free.get()
+        self._rows = 0
+        self._error = None
+        self._thread = threading.Thread(target=self._write_blocks, name='TrajectoryWriter', daemon=True)
+        self._thread.start()
+
+    def _write_blocks(self):
+        while True:
+            block, rows = self._full.get()
+            if block is None:
+                return
+            try:
+                if self._error is None:
+                    self.sink.write(block[:rows])
+            except BaseException as error:
+                # Raised on the solver thread by the next record or close
+                self._error = error
+            self._free.put(block)
+
+    def _check_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError('The trajectory writer failed') from error
+
+    def _hand_over(self):
+        self._full.put((self._block, self._rows))
+        self._block = None
+        self._rows = 0
+
+    def record(self, row):
+        """
+        Copy one row into the current block, a full block is handed to the writer thread.
+        Waits for a free block when all blocks are full or being written.
+        """
+        if self.closed:
+            raise ValueError('The trajectory writer is closed')
+        self._check_error()
+        if self._block is None:
+            self._block = self._free.get()
+        self._block[self._rows] = row
+        self._rows += 1
+        self.n_rows += 1
+        if self._rows == len(self._block):
+            self._hand_over()
+
+    def flush(self):
+        """
+        Hand the partly filled block to the writer thread and wait until all recorded rows are written
+        """
+        self._check_error()
+        if self._rows:
+            self._hand_over()
+        # The writer is idle once all blocks are back in the free queue
+        blocks = [] if self._block is None else [self._block]
+        while len(blocks) < self._blocks_num:
+            blocks.append(self._free.get())
+        self._block = blocks.pop()
+        for block in blocks:
+            self._free.put(block)
+        self._check_error()
+
+    def close(self):
+        """
+        Write the remaining rows, stop the writer thread and close the sink
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._rows:
+                self._hand_over()
+        finally:
+            self._full.put((None, 0))
+            self._thread.join()
+            self.sink.close()
+        self._check_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,401 @@
+"""Weather ingestion
+
+Streams raw weather files into the weather store of weather_store. The source is read in blocks of a fixed number
+of rows, so the memory stays bounded for archives of any size:
+
+    ingest_csv('station.csv', 'station.cwx')
+    ingest_epw('site.epw', 'site.cwx', year=2021)
+
+Each block passes three steps, all array operations over the block:
+ - read_csv_blocks / read_epw_blocks parse the rows into the source quantities of SOURCE_QUANTITIES, NaN if missing
+ - fill_gaps interpolates the missing values linearly in time, also across blocks. The sky quantities of
+   OPTIONAL_QUANTITIES stay missing over gaps longer than max_gap, many EPW files have no infrared data at all
+ - weather_of_source converts the units and derives the missing fields of Weather:
+   - vapor_pressure_outdoor from the relative humidity [%] and the outdoor temperature
+   - t_Sky from the horizontal infrared radiation, or from the clear sky emissivity of the outdoor air where both
+     are missing
+   - co2_outdoor from ppm to mg m^-3
+   - t_Soil_Out from the monthly ground temperatures of an EPW file, or IngestDefaults
+"""
+import csv
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+
+from constants import BOLTZMANN, ETA_MG_PPM
+from data_models import Weather
+from physics_utils import vapor_pressure
+from weather_store import WeatherStoreWriter
+
+# The number of rows parsed at once
+INGEST_BLOCK_ROWS = 1 << 16
+
+# The quantities read from the sources and their units
+SOURCE_QUANTITIES = (
+    'outdoor_global_rad',  # [W m^-2]
+    't_Outdoor',  # [°C]
+    'rh_Outdoor',  # [%]
+    'vapor_pressure_outdoor',  # [Pa]
+    't_Sky',  # [°C]
+    'sky_IR',  # horizontal infrared radiation from the sky [W m^-2]
+    't_Soil_Out',  # [°C]
+    'co2_outdoor',  # [ppm]
+    'v_Wind',  # [m s^-1]
+)
+
+# The quantities derived from the others where they are missing, see weather_of_source
+OPTIONAL_QUANTITIES = ('t_Sky', 'sky_IR')
+
+# Strings of the CSV files read as missing values
+MISSING_TOKENS = ('', 'NA', 'N/A', 'NaN', 'nan', 'null', 'None')
+
+# Seconds from 1970-01-01 of the timestamps of the sources
+EPOCH = np.datetime64('1970-01-01T00:00:00', 's')
+
+
+class IngestDefaults(NamedTuple):
+    # The values of the fields which are neither in the source nor derived from it
+    outdoor_global_rad: float = 0  # [W m^-2]
+    t_Soil_Out: float = 10  # [°C]
+    co2_outdoor: float = 400  # [ppm]
+    v_Wind: float = 0  # [m s^-1]
+
+
+class CSVColumns(NamedTuple):
+    # The header of the CSV column of each quantity, None if the file doesn't have it
+    time: str = 'time'  # seconds or ISO 8601 timestamps
+    outdoor_global_rad: str = 'outdoor_global_rad'
+    t_Outdoor: str = 't_Outdoor'
+    rh_Outdoor: str = 'rh_Outdoor'
+    vapor_pressure_outdoor: str = None
+    t_Sky: str = None
+    sky_IR: str = None
+    t_Soil_Out: str = None
+    co2_outdoor: str = None
+    v_Wind: str = 'v_Wind'
+
+
+class SourceBlock(NamedTuple):
+    time: np.ndarray  # [s]
+    quantities: dict  # the source quantities of the block, arrays of the length of time
+
+
+def _parse_floats(strings) -> np.ndarray:
+    strings = np.char.strip(np.asarray(strings, dtype=str))
+    return np.where(np.isin(strings, MISSING_TOKENS), 'nan', strings).astype(float)
+
+
+def _parse_time(strings) -> np.ndarray:
+    strings = np.char.strip(np.asarray(strings, dtype=str))
+    try:
+        return strings.astype(float)
+    except ValueError:
+        return (strings.astype('datetime64[s]') - EPOCH).astype(float)
+
+
+def read_csv_blocks(file, columns: CSVColumns = CSVColumns(), block_rows: int = INGEST_BLOCK_ROWS,
+                    delimiter: str = ','):
+    """
+    Parse a CSV file with a header row block by block
+    Args:
+        file: an open text file
+        columns: the header of the column of each quantity
+        block_rows: the number of rows of a block
+        delimiter: the delimiter of the columns
+
+    Returns: a generator of SourceBlock
+    """
+    reader = csv.reader(file, delimiter=delimiter)
+    header = [name.strip() for name in next(reader)]
+    selected = {quantity: name for quantity, name in columns._asdict().items() if name is not None}
+    unknown = [name for name in selected.values() if name not in header]
+    if unknown:
+        raise ValueError(f'The CSV file has no columns {unknown}')
+    indices = {quantity: header.index(name) for quantity, name in selected.items()}
+    while True:
+        rows = [row for row in itertools.islice(reader, block_rows) if row]
+        if not rows:
+            return
+        cells = np.array(rows, dtype=str)
+        yield SourceBlock(time=_parse_time(cells[:, indices['time']]),
+                          quantities={quantity: _parse_floats(cells[:, index]) for quantity, index in indices.items()
+                                      if quantity != 'time'})
+
+
+# The columns of the data rows of an EPW file and the values marking missing data
+# Ref: EnergyPlus Auxiliary Programs, Weather Converter Program, EnergyPlus Weather File (EPW) Data Dictionary
+EPW_HEADER_LINES = 8
+EPW_COLUMNS = {'t_Outdoor': (6, 99.9), 'rh_Outdoor': (8, 999), 'sky_IR': (12, 9999),
+               'outdoor_global_rad': (13, 9999), 'v_Wind': (21, 999)}
+
+
+def epw_ground_temperatures(header_lines) -> np.ndarray:
+    """
+    The monthly ground temperatures of the deepest layer of the GROUND TEMPERATURES header line of an EPW file
+    Returns: the temperatures of January to December [°C], None if the file has none
+    """
+    for line in header_lines:
+        cells = [cell.strip() for cell in line.split(',')]
+        if cells[0].upper() != 'GROUND TEMPERATURES' or len(cells) < 2 or not cells[1]:
+            continue
+        # Each depth is given as depth, conductivity, density, specific heat and 12 monthly temperatures
+        depths = int(cells[1])
+        if depths < 1 or len(cells) < 2 + 16 * depths:
+            return None
+        deepest = 2 + 16 * (depths - 1)
+        return _parse_floats(cells[deepest + 4:deepest + 16])
+    return None
+
+
+def read_epw_blocks(file, block_rows: int = INGEST_BLOCK_ROWS, year: int = None):
+    """
+    Parse an EPW file block by block
+    Args:
+        file: an open text file
+        block_rows: the number of rows of a block
+        year: the year of all rows, e.g. for typical meteorological years whose months come from different years
+
+    Returns: a generator of SourceBlock, t_Soil_Out is the ground temperature of the month if the header has one
+    """
+    header_lines = [file.readline() for _ in range(EPW_HEADER_LINES)]
+    ground_temperatures = epw_ground_temperatures(header_lines)
+    reader = csv.reader(file)
+    while True:
+        rows = [row[:EPW_COLUMNS['v_Wind'][0] + 1] for row in itertools.islice(reader, block_rows) if row]
+        if not rows:
+            return
+        cells = np.array(rows, dtype=str)
+        years, months, days, hours, minutes = (cells[:, i].astype(float).astype(int) for i in range(5))
+        if year is not None:
+            years = np.full_like(years, year)
+        first_months = (years - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+        dates = (first_months + (months - 1)).astype('datetime64[D]') + (days - 1)
+        # The hour 1 - 24 ends at the time of the row, a minute of 60 (or 0) marks an hourly record
+        seconds = np.where((minutes == 0) | (minutes == 60), hours * 3600, (hours - 1) * 3600 + minutes * 60)
+        quantities = {}
+        for quantity, (index, missing) in EPW_COLUMNS.items():
+            values = _parse_floats(cells[:, index])
+            quantities[quantity] = np.where(values >= missing, np.nan, values)
+        if ground_temperatures is not None:
+            quantities['t_Soil_Out'] = ground_temperatures[months - 1]
+        yield SourceBlock(time=(dates.astype('datetime64[s]') - EPOCH).astype(float) + seconds,
+                          quantities=quantities)
+
+
+class GapFiller(object):
+    """
+    Linear interpolation in time of the missing values of consecutive blocks.
+    The rows after the last valid value of a quantity are held back until a later block has a valid value,
+    the missing values at the start of the records take the first valid value, those at the end the last one.
+    The quantities of OPTIONAL_QUANTITIES stay NaN over the gaps longer than max_gap instead of failing the records.
+    """
+
+    def __init__(self, max_gap: float):
+        """
+        Args:
+            max_gap: the longest time without a valid value of a quantity [s]
+        """
+        self.max_gap = max_gap
+        self._pending = None
+        self._last = {}
+        self._last_time = None
+        self._first_time = None
+        self._last_valid = {}  # the time and the value of the last valid value of the optional quantities
+
+    def _fill(self, time, quantities: dict, count: int) -> SourceBlock:
+        filled = {}
+        for quantity, values in quantities.items():
+            if quantity in OPTIONAL_QUANTITIES:
+                filled[quantity] = self._fill_optional(quantity, time, values, count)
+                continue
+            valid = ~np.isnan(values)
+            knots_time, knots_value = time[valid], values[valid]
+            if quantity in self._last:
+                knots_time = np.concatenate([[self._last_time], knots_time])
+                knots_value = np.concatenate([[self._last[quantity]], knots_value])
+            if not len(knots_time):
+                raise ValueError(f'{quantity} has no valid value')
+            filled[quantity] = np.interp(time[:count], knots_time, knots_value)
+            if count:
+                self._last[quantity] = filled[quantity][-1]
+        if count:
+            self._last_time = time[count - 1]
+        return SourceBlock(time=time[:count], quantities=filled)
+
+    def _fill_optional(self, quantity: str, time, values, count: int) -> np.ndarray:
+        """
+        Returns: the first count values interpolated, NaN inside the gaps longer than max_gap.
+                 The gaps at the start and the end of the rows reach to the start of the records and the last row.
+        """
+        valid = ~np.isnan(values)
+        knots_time, knots_value = time[valid], values[valid]
+        gap_start = self._first_time
+        if quantity in self._last_valid:
+            gap_start, last_value = self._last_valid[quantity]
+            knots_time = np.concatenate([[gap_start], knots_time])
+            knots_value = np.concatenate([[last_value], knots_value])
+        released = valid[:count]
+        if released.any():
+            self._last_valid[quantity] = (time[:count][released][-1], values[:count][released][-1])
+        if not count or not len(knots_time):
+            return np.full(count, np.nan)
+        following = np.searchsorted(knots_time, time[:count])
+        previous_time = np.where(following > 0, knots_time[np.maximum(following - 1, 0)], gap_start)
+        following_time = np.where(following < len(knots_time),
+                                  knots_time[np.minimum(following, len(knots_time) - 1)], time[-1])
+        filled = np.interp(time[:count], knots_time, knots_value)
+        return np.where(~valid[:count] & (following_time - previous_time > self.max_gap), np.nan, filled)
+
+    def fill(self, block: SourceBlock) -> SourceBlock:
+        """
+        Returns: the pending rows and the rows of the block which can be completed
+        """
+        keep = ~np.isnan(block.time)
+        time = block.time[keep]
+        quantities = {quantity: values[keep] for quantity, values in block.quantities.items()}
+        if self._pending is not None:
+            time = np.concatenate([self._pending.time, time])
+            quantities = {quantity: np.concatenate([self._pending.quantities[quantity], values])
+                          for quantity, values in quantities.items()}
+        if self._first_time is None and len(time):
+            self._first_time = time[0]
+        # The rows up to the last valid value of every quantity are complete,
+        # the rows of a long gap of an optional quantity are complete without it
+        count = len(time)
+        for quantity, values in quantities.items():
+            valid = np.flatnonzero(~np.isnan(values))
+            complete = valid[-1] + 1 if len(valid) else 0
+            if complete == len(time):
+                continue
+            if complete:
+                gap_start = time[complete - 1]
+            elif quantity in OPTIONAL_QUANTITIES:
+                gap_start = self._last_valid[quantity][0] if quantity in self._last_valid else self._first_time
+            else:
+                gap_start = time[0] if self._last_time is None else self._last_time
+            if time[-1] - gap_start <= self.max_gap:
+                count = min(count, complete)
+            elif quantity not in OPTIONAL_QUANTITIES:
+                raise ValueError(f'The records miss values for more than {self.max_gap} s after {gap_start} s')
+        self._pending = SourceBlock(time=time[count:], quantities={quantity: values[count:]
+                                                                   for quantity, values in quantities.items()})
+        return self._fill(time, quantities, count)
+
+    def finish(self) -> SourceBlock:
+        """
+        Returns: the pending rows, the values missing at the end take the last valid value
+        """
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return SourceBlock(time=np.zeros(0), quantities={})
+        return self._fill(pending.time, pending.quantities, len(pending.time))
+
+
+def fill_gaps(blocks, max_gap: float = 6 * 3600):
+    """
+    Interpolate the missing values of a sequence of SourceBlock, see GapFiller
+    Returns: a generator of SourceBlock without missing values
+    """
+    gap_filler = GapFiller(max_gap)
+    for block in blocks:
+        filled = gap_filler.fill(block)
+        if len(filled.time):
+            yield filled
+    filled = gap_filler.finish()
+    if len(filled.time):
+        yield filled
+
+
+def clear_sky_temperature(t_Outdoor, vapor_pressure_outdoor):
+    """
+    The sky temperature of the clear sky emissivity of the outdoor air
+    Ref: Brutsaert, W. (1975). On a derivable formula for long-wave radiation from clear skies.
+    Water Resources Research, 11(5), 742-744
+    Returns: sky temperature [°C]
+    """
+    t_Outdoor_K = t_Outdoor + 273.15
+    emissivity = 1.24 * (vapor_pressure_outdoor / 100 / t_Outdoor_K) ** (1 / 7)
+    return emissivity ** 0.25 * t_Outdoor_K - 273.15
+
+
+def weather_of_source(quantities: dict, defaults: IngestDefaults = IngestDefaults(), fast: bool = False) -> Weather:
+    """
+    Convert the source quantities of a block to the fields and units of Weather
+    Args:
+        quantities: the source quantities of SOURCE_QUANTITIES, the others are derived or taken from defaults
+        defaults: the values of the fields which are neither in the source nor derived from it
+        fast: see physics_utils.saturation_vapor_pressure
+
+    Returns: the weather of the block
+    """
+    unknown = set(quantities) - set(SOURCE_QUANTITIES)
+    if unknown:
+        raise ValueError(f'Unknown source quantities {sorted(unknown)}')
+    if 't_Outdoor' not in quantities:
+        raise ValueError('The source needs t_Outdoor')
+    t_Outdoor = quantities['t_Outdoor']
+
+    def quantity(name, default):
+        return quantities[name] if name in quantities else np.full_like(t_Outdoor, default)
+
+    if 'vapor_pressure_outdoor' in quantities:
+        vapor_pressure_outdoor = quantities['vapor_pressure_outdoor']
+    elif 'rh_Outdoor' in quantities:
+        # physics_utils.vapor_pressure is in kPa
+        vapor_pressure_outdoor = 1000 * vapor_pressure(quantities['rh_Outdoor'] / 100, t_Outdoor, fast)
+    else:
+        raise ValueError('The source needs vapor_pressure_outdoor or rh_Outdoor')
+
+    # t_Sky and sky_IR are NaN over their long gaps, see OPTIONAL_QUANTITIES
+    t_Sky = clear_sky_temperature(t_Outdoor, vapor_pressure_outdoor)
+    if 'sky_IR' in quantities:
+        sky_IR = quantities['sky_IR']
+        t_Sky = np.where(np.isnan(sky_IR), t_Sky, (sky_IR / BOLTZMANN) ** 0.25 - 273.15)
+    if 't_Sky' in quantities:
+        t_Sky = np.where(np.isnan(quantities['t_Sky']), t_Sky, quantities['t_Sky'])
+
+    return Weather(outdoor_global_rad=quantity('outdoor_global_rad', defaults.outdoor_global_rad),
+                   t_Outdoor=t_Outdoor,
+                   t_Sky=t_Sky,
+                   t_Soil_Out=quantity('t_Soil_Out', defaults.t_Soil_Out),
+                   co2_outdoor=quantity('co2_outdoor', defaults.co2_outdoor) / ETA_MG_PPM,
+                   vapor_pressure_outdoor=vapor_pressure_outdoor,
+                   v_Wind=quantity('v_Wind', defaults.v_Wind))
+
+
+def ingest_weather(blocks, path, dtype='float32', defaults: IngestDefaults = IngestDefaults(),
+                   max_gap: float = 6 * 3600, fast: bool = False) -> dict:
+    """
+    Write a sequence of SourceBlock of one site to a weather store
+    Args:
+        blocks: the source blocks, e.g. of read_csv_blocks or read_epw_blocks
+        path: the weather store file
+        dtype: float32 or float64, the type of the weather columns
+        defaults: the values of the fields which are neither in the source nor derived from it
+        max_gap: the longest time without a valid value of a quantity [s]
+        fast: see physics_utils.saturation_vapor_pressure
+
+    Returns: the header of the store
+    """
+    with WeatherStoreWriter(path, dtype=dtype) as writer:
+        for block in fill_gaps(blocks, max_gap):
+            writer.append(block.time, weather_of_source(block.quantities, defaults, fast))
+    return writer.header
+
+
+def ingest_csv(source, path, columns: CSVColumns = CSVColumns(), delimiter: str = ',',
+               block_rows: int = INGEST_BLOCK_ROWS, **kwargs) -> dict:
+    """
+    Write a CSV file of one site to a weather store, see read_csv_blocks and ingest_weather
+    """
+    with open(source, newline='') as file:
+        return ingest_weather(read_csv_blocks(file, columns, block_rows, delimiter), path, **kwargs)
+
+
+def ingest_epw(source, path, year: int = None, block_rows: int = INGEST_BLOCK_ROWS, **kwargs) -> dict:
+    """
+    Write an EPW file to a weather store, see read_epw_blocks and ingest_weather
+    """
+    with open(source, newline='') as file:
+        return ingest_weather(read_epw_blocks(file, block_rows, year), path, **kwargs)
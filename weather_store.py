@@ -0,0 +1,331 @@
+"""Weather store
+
+A compact binary file of weather records for one or more sites, read through a memory map. The file holds a header,
+a float64 time column shared by the sites and one column of shape (n_sites, n_samples) per field of Weather, in
+float32 or float64:
+
+    write_weather_store('weather.cwx', time, weather)   # weather: Weather of arrays of shape (n_sites, n_samples)
+    store = WeatherStore('weather.cwx')
+    weather = store.window(start, stop, dt)             # Weather of arrays of shape (n_sites, n_steps), float64
+
+Records of unknown length, e.g. streamed from a large archive, are appended block by block with WeatherStoreWriter.
+
+The columns are views on the memory map, so only the pages of the samples in the requested window are read and the
+worker processes of a batch of simulations share one copy of the file in the page cache. A WeatherStore is pickled
+as its path and reopened by the receiving process.
+
+The fields are in the units of Weather:
+ - outdoor_global_rad [W m^-2], t_Outdoor, t_Sky, t_Soil_Out [°C], co2_outdoor [mg m^-3],
+   vapor_pressure_outdoor [Pa], v_Wind [m s^-1]
+"""
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from data_models import Weather
+
+# The first bytes of a weather store file, followed by the format version and the length of the JSON header
+WEATHER_STORE_MAGIC = b'CEAOSWX\x00'
+WEATHER_STORE_VERSION = 1
+_PREAMBLE = struct.Struct('<8sII')
+
+# The columns start at multiples of this number of bytes
+COLUMN_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def weather_store_header(n_sites: int, n_samples: int, dtype='float32', sites=None) -> dict:
+    """
+    The header of a weather store with the byte offset of each column
+    Args:
+        n_sites: the number of sites
+        n_samples: the number of samples of each site
+        dtype: float32 or float64, the type of the weather columns
+        sites: the names of the sites, by default their index
+
+    Returns: the header, the data of the columns starts at header['data_offset']
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f'The weather columns are float32 or float64, got {dtype}')
+    sites = [str(site) for site in sites] if sites is not None else [str(site) for site in range(n_sites)]
+    if len(sites) != n_sites:
+        raise ValueError('sites needs one name per site')
+    header = {'dtype': dtype.name, 'n_sites': n_sites, 'n_samples': n_samples, 'sites': sites,
+              'fields': list(Weather._fields), 'columns': {}}
+    # The offsets are relative to data_offset, which depends on the length of the header itself
+    offset = 0
+    for name, size in [('time', 8 * n_samples)] + [(field, dtype.itemsize * n_sites * n_samples)
+                                                  for field in Weather._fields]:
+        header['columns'][name] = offset
+        offset = _aligned(offset + size)
+    header['data_size'] = offset
+    header_size = _PREAMBLE.size + len(json.dumps(header)) + len(json.dumps({'data_offset': 10 ** 12}))
+    header['data_offset'] = _aligned(header_size)
+    return header
+
+
+def write_weather_store_header(file, header: dict):
+    """
+    Write the preamble and the header at the start of an open binary file and size the file for the columns
+    """
+    encoded = json.dumps(header).encode()
+    if _PREAMBLE.size + len(encoded) > header['data_offset']:
+        raise ValueError('The header is longer than its data offset')
+    file.seek(0)
+    file.write(_PREAMBLE.pack(WEATHER_STORE_MAGIC, WEATHER_STORE_VERSION, len(encoded)))
+    file.write(encoded)
+    file.truncate(header['data_offset'] + header['data_size'])
+
+
+def read_weather_store_header(path) -> dict:
+    with open(path, 'rb') as file:
+        magic, version, header_length = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+        if magic != WEATHER_STORE_MAGIC:
+            raise ValueError(f'{path} is not a weather store')
+        if version != WEATHER_STORE_VERSION:
+            raise ValueError(f'{path} has the weather store version {version}, expected {WEATHER_STORE_VERSION}')
+        return json.loads(file.read(header_length))
+
+
+def _check_time(time):
+    if time.ndim != 1 or len(time) < 2:
+        raise ValueError('The time index needs at least two samples')
+    if np.any(np.diff(time) <= 0) or not np.all(np.isfinite(time)):
+        raise ValueError('The time index must be finite and strictly increasing')
+
+
+def write_weather_store(path, time, weather: Weather, dtype='float32', sites=None) -> dict:
+    """
+    Write weather records to a weather store file
+    Args:
+        path: the file
+        time: the time of each sample, strictly increasing, shape (n_samples,) [s]
+        weather: the records, each field of shape (n_samples,) for one site or (n_sites, n_samples)
+        dtype: float32 or float64, the type of the weather columns
+        sites: the names of the sites
+
+    Returns: the header of the file
+    """
+    time = np.asarray(time, dtype=np.float64)
+    _check_time(time)
+    fields = [np.asarray(field, dtype=np.float64) for field in weather]
+    n_sites = max((field.shape[0] for field in fields if field.ndim == 2), default=1)
+    fields = [np.broadcast_to(field, (n_sites, len(time))) for field in fields]
+    header = weather_store_header(n_sites, len(time), dtype, sites)
+    with open(path, 'wb+') as file:
+        write_weather_store_header(file, header)
+        file.seek(header['data_offset'] + header['columns']['time'])
+        file.write(time.tobytes())
+        for name, field in zip(Weather._fields, fields):
+            file.seek(header['data_offset'] + header['columns'][name])
+            file.write(np.ascontiguousarray(field, dtype=header['dtype']).tobytes())
+    return header
+
+
+class WeatherStoreWriter(object):
+    """
+    Writes a weather store from blocks of consecutive samples, e.g. read from an archive larger than the memory.
+    The blocks are appended to one temporary file per column next to the store, and close() copies them into
+    the columns of the store block by block.
+    """
+
+    def __init__(self, path, n_sites: int = 1, dtype='float32', sites=None, block_samples: int = 1 << 16):
+        """
+        Args:
+            path: the weather store file
+            n_sites: the number of sites of each block
+            dtype: float32 or float64, the type of the weather columns
+            sites: the names of the sites
+            block_samples: the number of samples copied at once by close()
+        """
+        self.path = path
+        self.n_sites = n_sites
+        self.dtype = np.dtype(dtype)
+        self.sites = sites
+        self.block_samples = block_samples
+        self.n_samples = 0
+        self.header = None
+        self._last_time = -np.inf
+        directory = os.path.dirname(os.path.abspath(path))
+        self._columns = {name: tempfile.TemporaryFile(dir=directory) for name in ('time',) + Weather._fields}
+
+    def append(self, time, weather: Weather):
+        """
+        Append a block of samples
+        Args:
+            time: the time of each sample, later than the samples before, shape (n,) [s]
+            weather: each field of shape (n,) for one site or (n_sites, n)
+        """
+        time = np.asarray(time, dtype=np.float64)
+        if time.ndim != 1:
+            raise ValueError('time needs the shape (n,)')
+        if not len(time):
+            return
+        if time[0] <= self._last_time or np.any(np.diff(time) <= 0) or not np.all(np.isfinite(time)):
+            raise ValueError('The time index must be finite and strictly increasing')
+        self._columns['time'].write(time.tobytes())
+        for name, field in zip(Weather._fields, weather):
+            # The temporary columns are time-major, (n, n_sites)
+            field = np.broadcast_to(np.asarray(field, dtype=self.dtype), (self.n_sites, len(time)))
+            self._columns[name].write(np.ascontiguousarray(field.T).tobytes())
+        self.n_samples += len(time)
+        self._last_time = time[-1]
+
+    def close(self) -> dict:
+        """
+        Write the store and delete the temporary columns
+        Returns: the header of the store
+        """
+        try:
+            if self.n_samples < 2:
+                raise ValueError('The time index needs at least two samples')
+            header = weather_store_header(self.n_sites, self.n_samples, self.dtype, self.sites)
+            with open(self.path, 'wb+') as file:
+                write_weather_store_header(file, header)
+            store = np.memmap(self.path, dtype=np.uint8, mode='r+')
+            for name, column in self._columns.items():
+                column.flush()
+                column.seek(0)
+                itemsize = 8 if name == 'time' else self.dtype.itemsize
+                offset = header['data_offset'] + header['columns'][name]
+                if name == 'time':
+                    target = np.ndarray((self.n_samples,), dtype=np.float64, buffer=store, offset=offset)
+                else:
+                    target = np.ndarray((self.n_sites, self.n_samples), dtype=self.dtype, buffer=store, offset=offset)
+                width = 1 if name == 'time' else self.n_sites
+                for start in range(0, self.n_samples, self.block_samples):
+                    count = min(self.block_samples, self.n_samples - start)
+                    block = np.frombuffer(column.read(count * width * itemsize), dtype=target.dtype)
+                    target[..., start:start + count] = block if name == 'time' else block.reshape(count, width).T
+            store.flush()
+            del store
+            self.header = header
+            return header
+        finally:
+            for column in self._columns.values():
+                column.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            for column in self._columns.values():
+                column.close()
+
+
+class WeatherStore(object):
+    """
+    The weather records of a weather store file, read through a read-only memory map
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = read_weather_store_header(path)
+        if self.header['fields'] != list(Weather._fields):
+            raise ValueError(f'{path} has the fields {self.header["fields"]}, expected {list(Weather._fields)}')
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        data_offset = self.header['data_offset']
+        columns = self.header['columns']
+        self.time = np.ndarray((self.n_samples,), dtype=np.float64, buffer=self._map,
+                               offset=data_offset + columns['time'])
+        self.columns = {field: np.ndarray((self.n_sites, self.n_samples), dtype=self.header['dtype'],
+                                          buffer=self._map, offset=data_offset + columns[field])
+                        for field in Weather._fields}
+
+    @property
+    def n_sites(self) -> int:
+        return self.header['n_sites']
+
+    @property
+    def n_samples(self) -> int:
+        return self.header['n_samples']
+
+    @property
+    def sites(self) -> list:
+        return self.header['sites']
+
+    @property
+    def start_time(self) -> float:
+        return float(self.time[0])
+
+    @property
+    def end_time(self) -> float:
+        return float(self.time[-1])
+
+    def site_index(self, site) -> int:
+        return self.sites.index(site) if isinstance(site, str) else site
+
+    def interpolate(self, times, sites=None) -> Weather:
+        """
+        The weather at any times between the first and the last sample, linearly interpolated between the samples
+        Args:
+            times: increasing times, shape (n_steps,) [s]
+            sites: the names or indices of the sites, by default all sites
+
+        Returns: the weather, each field of shape (n_sites, n_steps) in float64
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if times.ndim != 1:
+            raise ValueError('times needs the shape (n_steps,)')
+        if len(times) and (times[0] < self.time[0] or times[-1] > self.time[-1]):
+            raise ValueError(f'The times {times[0]} - {times[-1]} are outside the records '
+                             f'{self.start_time} - {self.end_time}')
+        site_rows = slice(None) if sites is None else [self.site_index(site) for site in sites]
+        # Only the samples around the window are read from the file
+        first = max(int(np.searchsorted(self.time, times[0], side='right')) - 1, 0) if len(times) else 0
+        last = min(int(np.searchsorted(self.time, times[-1], side='left')) + 1, self.n_samples) if len(times) else 0
+        window_time = np.asarray(self.time[first:last])
+        index = np.clip(np.searchsorted(window_time, times, side='right') - 1, 0, max(len(window_time) - 2, 0))
+        if len(window_time) > 1:
+            weight = (times - window_time[index]) / (window_time[index + 1] - window_time[index])
+        else:
+            weight = np.zeros_like(times)
+        fields = []
+        for field in Weather._fields:
+            column = np.asarray(self.columns[field][site_rows, first:last], dtype=np.float64)
+            lower = column[:, index]
+            upper = column[:, np.minimum(index + 1, column.shape[1] - 1)]
+            fields.append(lower + weight * (upper - lower))
+        return Weather(*fields)
+
+    def window(self, start: float, stop: float, dt: float, sites=None) -> Weather:
+        """
+        The weather from start to stop, stop excluded, every dt seconds, see interpolate
+        """
+        return self.interpolate(start + dt * np.arange(int(np.ceil((stop - start) / dt - 1e-9))), sites)
+
+    def at(self, t: float, sites=None) -> Weather:
+        """
+        Returns: the weather of the sites at the time t, each field of shape (n_sites,)
+        """
+        return Weather(*(field[:, 0] for field in self.interpolate([t], sites)))
+
+    def close(self):
+        self.time = None
+        self.columns = None
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __repr__(self):
+        return f'WeatherStore({self.path!r}, n_sites={self.n_sites}, n_samples={self.n_samples})'